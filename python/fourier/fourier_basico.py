@@ -6,12 +6,411 @@ Inclui DFT (Discrete Fourier Transform) e FFT (Fast Fourier Transform)
 
 import math
 import cmath
+import operator
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele só o backend 'list' está disponível
+    np = None
+
+
+# Backends de FourierTransform: listas de complexos ou arrays NumPy
+BACKENDS = ('list', 'numpy')
+
+# DFT vetorizada: matrizes até este N ficam em cache (1024² complex128 = 16 MB cada);
+# acima disso o produto é feito em blocos de linhas, sem guardar a matriz
+DFT_CACHE_MAX_SIZE = 1024
+DFT_BLOCK_ELEMENTS = 1 << 20
+
+
+class FFTPlan:
+    """
+    Plano de FFT radix-2 iterativa para um tamanho fixo N (potência de 2)
+    
+    Tudo o que depende só de N é calculado uma vez no construtor:
+    - Permutação de bit-reversal (ordem de entrada do algoritmo iterativo)
+    - Tabela de twiddles e^(-2πjk/N) e suas conjugadas (transformada inversa)
+    - Twiddles de cada estágio (tabela com passo N/tamanho do estágio)
+    
+    Cada execução só faz a permutação e as borboletas, sem recursão,
+    sem listas intermediárias por nível e sem chamar cmath.exp.
+    """
+    
+    def __init__(self, n):
+        """
+        Args:
+            n (int): Tamanho da transformada (potência de 2)
+        """
+        if n < 1 or n & (n - 1) != 0:
+            raise ValueError(f"FFTPlan requer tamanho potência de 2, recebido {n}")
+        
+        self.n = n
+        bits = n.bit_length() - 1
+        self.bit_reversal = [int(format(i, f'0{bits}b')[::-1], 2) if bits else 0 for i in range(n)]
+        
+        twiddles = [cmath.exp(-2j * math.pi * k / n) for k in range(n // 2)]
+        inverse_twiddles = [w.conjugate() for w in twiddles]
+        
+        # Estágio com blocos de tamanho 2·half usa twiddles[::n // (2·half)]
+        self.stages = []
+        half = 1
+        while half < n:
+            stride = n // (2 * half)
+            self.stages.append((half, twiddles[::stride], inverse_twiddles[::stride]))
+            half *= 2
+        
+        self.arrays = None  # Tabelas em NumPy (montadas no primeiro execute_array)
+    
+    def transform_inplace(self, buffer, inverse=False):
+        """
+        Executa a FFT sobre a própria lista (a entrada é sobrescrita)
+        
+        Args:
+            buffer (list): Lista de tamanho n
+            inverse (bool): Se deve calcular a inversa (com divisão por n)
+        
+        Returns:
+            list: O próprio buffer, agora com os coeficientes
+        """
+        n = self.n
+        if len(buffer) != n:
+            raise ValueError(f"Plano de tamanho {n} recebeu sinal de tamanho {len(buffer)}")
+        
+        buffer[:] = [buffer[i] for i in self.bit_reversal]
+        
+        for half, twiddles, inverse_twiddles in self.stages:
+            size = 2 * half
+            stage_twiddles = inverse_twiddles if inverse else twiddles
+            
+            if half < n // size:
+                # Poucos twiddles e muitos blocos: cada k é uma operação
+                # sobre as fatias com passo `size` de todos os blocos
+                for k in range(half):
+                    w = stage_twiddles[k]
+                    top = buffer[k::size]
+                    bottom = [x * w for x in buffer[k + half::size]]
+                    buffer[k::size] = [u + v for u, v in zip(top, bottom)]
+                    buffer[k + half::size] = [u - v for u, v in zip(top, bottom)]
+            else:
+                # Poucos blocos grandes: borboletas de um bloco de uma vez
+                for start in range(0, n, size):
+                    middle, end = start + half, start + size
+                    top = buffer[start:middle]
+                    bottom = [x * w for x, w in zip(buffer[middle:end], stage_twiddles)]
+                    buffer[start:middle] = [u + v for u, v in zip(top, bottom)]
+                    buffer[middle:end] = [u - v for u, v in zip(top, bottom)]
+        
+        if inverse:
+            buffer[:] = [x / n for x in buffer]
+        return buffer
+    
+    def execute(self, signal, inverse=False):
+        """Executa a FFT em uma cópia do sinal (a entrada não é alterada)"""
+        return self.transform_inplace(list(signal), inverse)
+    
+    def execute_array(self, signal, inverse=False):
+        """
+        Versão NumPy da FFT: cada estágio de borboletas é uma única operação
+        
+        O array é visto como (blocos, 2, half): a metade de cima e a de
+        baixo de todos os blocos são combinadas de uma vez com os twiddles
+        do estágio (broadcast sobre os blocos).
+        
+        Returns:
+            np.ndarray: Coeficientes (complex128)
+        """
+        if np is None:
+            raise ImportError("execute_array requer NumPy")
+        n = self.n
+        if len(signal) != n:
+            raise ValueError(f"Plano de tamanho {n} recebeu sinal de tamanho {len(signal)}")
+        if self.arrays is None:
+            self.arrays = (np.array(self.bit_reversal, dtype=np.int64),
+                           [(half, np.array(twiddles), np.array(inverse_twiddles))
+                            for half, twiddles, inverse_twiddles in self.stages])
+        bit_reversal, stages = self.arrays
+        
+        values = np.asarray(signal, dtype=np.complex128)[bit_reversal]
+        for half, twiddles, inverse_twiddles in stages:
+            blocks = values.reshape(-1, 2, half)
+            top = blocks[:, 0, :]
+            bottom = blocks[:, 1, :] * (inverse_twiddles if inverse else twiddles)
+            values = np.stack((top + bottom, top - bottom), axis=1).reshape(n)
+        
+        if inverse:
+            values /= n
+        return values
+
+
+def prime_factors(n):
+    """Fatores primos de n (com repetição), maiores primeiro"""
+    factors = []
+    divisor = 2
+    while divisor * divisor <= n:
+        while n % divisor == 0:
+            factors.append(divisor)
+            n //= divisor
+        divisor += 1
+    if n > 1:
+        factors.append(n)
+    return sorted(factors, reverse=True)
+
+
+class MixedRadixPlan:
+    """
+    Plano de FFT Cooley-Tukey de raiz mista (2, 3, 5, ...) para N composto
+    
+    Iterativa (estilo Stockham): o estado é uma matriz (m, L), em que a
+    coluna c guarda a FFT de tamanho m da subsequência x[c::L]. Começa
+    com m = 1, L = N (as próprias amostras) e, a cada fator p, as p
+    colunas c + r·L/p (r = 0..p-1) são combinadas em uma FFT de tamanho
+    p·m: multiplica pelos twiddles W_{p·m}^(r·k) e aplica uma DFT p×p.
+    
+    Custo O(N·Σp): O(N log N) quando N só tem fatores pequenos
+    (2^a·3^b·5^c), sem zero-padding. Fatores primos grandes ficam caros;
+    get_fft_plan usa Bluestein nesses casos.
+    """
+    
+    def __init__(self, n, factors=None):
+        """
+        Args:
+            n (int): Tamanho da transformada
+            factors (list): Fatores de n, um estágio por fator (primos se omitida)
+        """
+        factors = factors or prime_factors(n)
+        if n < 1 or math.prod(factors) != n:
+            raise ValueError(f"Fatores {factors} não correspondem ao tamanho {n}")
+        
+        self.n = n
+        self.stages = []  # (p, m, twiddles[r][k], DFT p×p)
+        m = 1
+        for p in factors:
+            size = p * m
+            # (r·k) mod size antes da exponencial: preserva a precisão
+            twiddles = [[cmath.exp(-2j * math.pi * (r * k % size) / size) for k in range(m)]
+                        for r in range(p)]
+            dft_matrix = [[cmath.exp(-2j * math.pi * (q * r % p) / p) for r in range(p)]
+                          for q in range(p)]
+            self.stages.append((p, m, twiddles, dft_matrix))
+            m = size
+        
+        self.arrays = None  # Tabelas em NumPy (montadas no primeiro execute_array)
+    
+    def execute(self, signal, inverse=False):
+        """
+        Executa a FFT sobre uma cópia do sinal
+        
+        A inversa usa conj(FFT(conj(X))) / N.
+        """
+        n = self.n
+        if len(signal) != n:
+            raise ValueError(f"Plano de tamanho {n} recebeu sinal de tamanho {len(signal)}")
+        
+        values = [complex(x).conjugate() for x in signal] if inverse else list(signal)
+        columns = n  # L: colunas da matriz (m, L) guardada em values, linha a linha
+        
+        for p, m, twiddles, dft_matrix in self.stages:
+            new_columns = columns // p
+            result = [0j] * n
+            for k in range(m):
+                row_start = k * columns
+                # Colunas c + r·L' da linha k, já multiplicadas pelo twiddle W^(r·k)
+                parts = []
+                for r in range(p):
+                    w = twiddles[r][k]
+                    start = row_start + r * new_columns
+                    parts.append([x * w for x in values[start:start + new_columns]])
+                
+                # DFT p×p sobre as partes: a saída q vai para a linha k + m·q
+                if p == 2:
+                    top, bottom = parts
+                    blocks = ([u + v for u, v in zip(top, bottom)], [u - v for u, v in zip(top, bottom)])
+                else:
+                    columns_p = list(zip(*parts))
+                    blocks = [[sum(column) for column in columns_p]]  # Linha q = 0 da DFT é só de uns
+                    blocks += [[sum(map(operator.mul, coefficients, column)) for column in columns_p]
+                               for coefficients in dft_matrix[1:]]
+                for q, block in enumerate(blocks):
+                    out = (q * m + k) * new_columns
+                    result[out:out + new_columns] = block
+            
+            values, columns = result, new_columns
+        
+        if inverse:
+            return [x.conjugate() / n for x in values]
+        return values
+    
+    def execute_array(self, signal, inverse=False):
+        """Versão NumPy: cada estágio é um produto de twiddles e um einsum com a DFT p×p"""
+        if np is None:
+            raise ImportError("execute_array requer NumPy")
+        n = self.n
+        if len(signal) != n:
+            raise ValueError(f"Plano de tamanho {n} recebeu sinal de tamanho {len(signal)}")
+        if self.arrays is None:
+            self.arrays = [(p, m, np.array(twiddles)[:, :, np.newaxis], np.array(dft_matrix))
+                           for p, m, twiddles, dft_matrix in self.stages]
+        
+        values = np.asarray(signal, dtype=np.complex128)
+        if inverse:
+            values = values.conj()
+        
+        matrix = values.reshape(1, n)
+        for p, m, twiddles, dft_matrix in self.arrays:
+            # (m, p·L') -> (p, m, L'): parte r = colunas r·L'..(r+1)·L'
+            parts = matrix.reshape(m, p, -1).transpose(1, 0, 2) * twiddles
+            matrix = np.einsum('qr,rmc->qmc', dft_matrix, parts).reshape(p * m, -1)
+        
+        values = matrix.reshape(n)
+        if inverse:
+            return values.conj() / n
+        return values
+
+
+class BluesteinPlan:
+    """
+    Plano de FFT de Bluestein (chirp-z) para qualquer N
+    
+    Reescreve k·n = (k² + n² − (k−n)²)/2, transformando a DFT em uma
+    convolução com o chirp w_k = e^(-πj·k²/N):
+    
+        X_k = w_k · Σ_n (x_n·w_n) · conj(w_{k−n})
+    
+    A convolução é feita com FFTs radix-2 de tamanho M ≥ 2N−1; a FFT do
+    chirp é pré-calculada no plano. Custo O(N log N) para N primo.
+    """
+    
+    def __init__(self, n):
+        """
+        Args:
+            n (int): Tamanho da transformada (qualquer)
+        """
+        self.n = n
+        self.inner = get_fft_plan(1 << (2 * n - 2).bit_length())
+        size = self.inner.n
+        
+        # k² mod 2N antes da exponencial: preserva a precisão para k grande
+        self.chirp = [cmath.exp(-1j * math.pi * (k * k % (2 * n)) / n) for k in range(n)]
+        kernel = [0j] * size
+        for k, w in enumerate(self.chirp):
+            kernel[k] = w.conjugate()
+            if k:
+                kernel[size - k] = w.conjugate()
+        self.kernel_fft = self.inner.execute(kernel)
+        
+        self.arrays = None  # (chirp, FFT do kernel) em NumPy
+    
+    def execute(self, signal, inverse=False):
+        """Executa a FFT sobre uma cópia do sinal (inversa via conjugação)"""
+        n = self.n
+        if len(signal) != n:
+            raise ValueError(f"Plano de tamanho {n} recebeu sinal de tamanho {len(signal)}")
+        
+        values = [complex(x).conjugate() for x in signal] if inverse else signal
+        padded = [x * w for x, w in zip(values, self.chirp)] + [0j] * (self.inner.n - n)
+        spectrum = self.inner.transform_inplace(padded)
+        spectrum[:] = [a * b for a, b in zip(spectrum, self.kernel_fft)]
+        convolution = self.inner.transform_inplace(spectrum, inverse=True)
+        result = [x * w for x, w in zip(convolution[:n], self.chirp)]
+        
+        if inverse:
+            return [x.conjugate() / n for x in result]
+        return result
+    
+    def execute_array(self, signal, inverse=False):
+        """Versão NumPy de execute"""
+        if np is None:
+            raise ImportError("execute_array requer NumPy")
+        n = self.n
+        if len(signal) != n:
+            raise ValueError(f"Plano de tamanho {n} recebeu sinal de tamanho {len(signal)}")
+        if self.arrays is None:
+            self.arrays = (np.array(self.chirp), np.array(self.kernel_fft))
+        chirp, kernel_fft = self.arrays
+        
+        values = np.asarray(signal, dtype=np.complex128)
+        if inverse:
+            values = values.conj()
+        
+        padded = np.zeros(self.inner.n, dtype=np.complex128)
+        padded[:n] = values * chirp
+        spectrum = self.inner.execute_array(padded) * kernel_fft
+        result = self.inner.execute_array(spectrum, inverse=True)[:n] * chirp
+        
+        if inverse:
+            return result.conj() / n
+        return result
+
+
+@lru_cache(maxsize=8)
+def dft_matrix(N):
+    """Matriz DFT N×N com W[k, n] = e^(-2πj·(k·n mod N)/N), somente leitura e em cache LRU"""
+    indices = np.arange(N)
+    # Reduz k·n módulo N antes da exponencial: preserva a precisão para N grande
+    exponents = np.outer(indices, indices) % N
+    matrix = np.exp(-2j * np.pi * exponents / N)
+    matrix.flags.writeable = False
+    return matrix
+
+
+@lru_cache(maxsize=32)
+def get_fft_plan(n):
+    """
+    Plano de FFT para o tamanho n, criado uma vez e reutilizado (cache LRU)
+    
+    - Potência de 2: FFTPlan (radix-2 in-place)
+    - Fatores pequenos (2, 3, 5, ...): MixedRadixPlan, custo ~N·Σp
+    - Primos e fatores primos grandes: BluesteinPlan, custo ~3 FFTs de
+      tamanho M ≥ 2N−1 (escolhido quando é a estimativa menor)
+    """
+    if n & (n - 1) == 0:
+        return FFTPlan(n)
+    factors = prime_factors(n)
+    bluestein_size = 1 << (2 * n - 2).bit_length()
+    if n * sum(factors) <= 3 * bluestein_size * bluestein_size.bit_length():
+        return MixedRadixPlan(n, factors)
+    return BluesteinPlan(n)
 
 
 class FourierTransform:
-    def __init__(self):
-        """Inicializa a classe de Transformada de Fourier"""
-        pass
+    def __init__(self, backend='list'):
+        """
+        Inicializa a classe de Transformada de Fourier
+        
+        Args:
+            backend (str): 'list' (listas de complexos, Python puro) ou
+                'numpy' (aceita listas/arrays e devolve np.ndarray, com
+                DFT, FFT, espectros e janelas vetorizados)
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {backend} (use {', '.join(BACKENDS)})")
+        if backend == 'numpy' and np is None:
+            raise ImportError("O backend 'numpy' requer NumPy")
+        self.backend = backend
+    
+    def _dft_array(self, values, inverse=False):
+        """
+        DFT vetorizada (sem divisão por N na inversa)
+        
+        Até DFT_CACHE_MAX_SIZE é um produto com a matriz em cache; acima,
+        as linhas da matriz são geradas em blocos e descartadas, limitando
+        a memória a ~DFT_BLOCK_ELEMENTS elementos.
+        """
+        values = np.asarray(values, dtype=np.complex128)
+        N = len(values)
+        if N <= DFT_CACHE_MAX_SIZE:
+            # conj(W)·x = conj(W·conj(x)): a inversa não copia a matriz
+            return (dft_matrix(N) @ values.conj()).conj() if inverse else dft_matrix(N) @ values
+        
+        result = np.empty(N, dtype=np.complex128)
+        indices = np.arange(N)
+        sign = 2j if inverse else -2j
+        rows = max(1, DFT_BLOCK_ELEMENTS // N)
+        for start in range(0, N, rows):
+            exponents = np.outer(indices[start:start + rows], indices) % N
+            result[start:start + rows] = np.exp(sign * np.pi * exponents / N) @ values
+        return result
     
     def dft(self, signal):
         """
@@ -24,6 +423,10 @@ class FourierTransform:
         Returns:
             list: Coeficientes de Fourier (números complexos)
         """
+        if self.backend == 'numpy':
+            # Produto matriz-vetor
+            return self._dft_array(signal)
+        
         N = len(signal)
         X = []
         
@@ -47,6 +450,10 @@ class FourierTransform:
         Returns:
             list: Sinal reconstruído
         """
+        if self.backend == 'numpy':
+            # W⁻¹ = conj(W) / N (W é simétrica)
+            return self._dft_array(X, inverse=True) / len(X)
+        
         N = len(X)
         signal = []
         
@@ -65,43 +472,24 @@ class FourierTransform:
         Fast Fourier Transform (FFT) - Algoritmo de Cooley-Tukey
         Complexidade: O(N log N)
         
+        Usa o plano em cache para o tamanho N (get_fft_plan): radix-2
+        iterativa, raiz mista 2/3/5 ou Bluestein. Qualquer N é calculado
+        exatamente, sem zero-padding: a saída tem o mesmo tamanho da entrada.
+        
         Args:
-            signal (list): Sinal de entrada (deve ter tamanho potência de 2)
+            signal (list): Sinal de entrada (qualquer tamanho)
         
         Returns:
             list: Coeficientes de Fourier
         """
         N = len(signal)
         
-        # Caso base
         if N <= 1:
-            return signal
-        
-        # Verifica se N é potência de 2
-        if N & (N - 1) != 0:
-            # Preenche com zeros até a próxima potência de 2
-            next_power = 1 << (N - 1).bit_length()
-            signal = signal + [0] * (next_power - N)
-            N = next_power
-        
-        # Divide em partes par e ímpar
-        even = [signal[i] for i in range(0, N, 2)]
-        odd = [signal[i] for i in range(1, N, 2)]
-        
-        # Recursão
-        even_fft = self.fft(even)
-        odd_fft = self.fft(odd)
-        
-        # Combina os resultados
-        X = [0] * N
-        for k in range(N // 2):
-            # Fator de torção (twiddle factor)
-            twiddle = cmath.exp(-2j * math.pi * k / N) * odd_fft[k]
-            
-            X[k] = even_fft[k] + twiddle
-            X[k + N // 2] = even_fft[k] - twiddle
+            return np.asarray(signal, dtype=np.complex128) if self.backend == 'numpy' else signal
         
-        return X
+        if self.backend == 'numpy':
+            return get_fft_plan(N).execute_array(signal)
+        return get_fft_plan(N).execute(signal)
     
     def ifft(self, X):
         """
@@ -114,28 +502,31 @@ class FourierTransform:
             list: Sinal reconstruído
         """
         N = len(X)
+        if N <= 1:
+            return np.asarray(X, dtype=np.complex128) if self.backend == 'numpy' else list(X)
         
-        # Conjuga os coeficientes
-        X_conj = [x.conjugate() for x in X]
-        
-        # Aplica FFT
-        signal_conj = self.fft(X_conj)
-        
-        # Conjuga novamente e normaliza
-        signal = [x.conjugate() / N for x in signal_conj]
-        
-        return signal
+        # Transformada inversa do plano, com divisão por N
+        if self.backend == 'numpy':
+            return get_fft_plan(N).execute_array(X, inverse=True)
+        return get_fft_plan(N).execute(X, inverse=True)
     
     def magnitude_spectrum(self, X):
         """Calcula o espectro de magnitude"""
+        if self.backend == 'numpy':
+            return np.abs(X)
         return [abs(x) for x in X]
     
     def phase_spectrum(self, X):
         """Calcula o espectro de fase"""
+        if self.backend == 'numpy':
+            return np.angle(X)
         return [cmath.phase(x) for x in X]
     
     def power_spectrum(self, X):
         """Calcula o espectro de potência"""
+        if self.backend == 'numpy':
+            X = np.asarray(X)
+            return X.real ** 2 + X.imag ** 2  # |x|² sem a raiz de abs
         return [abs(x)**2 for x in X]
     
     def frequency_bins(self, N, sample_rate=1.0):
@@ -149,6 +540,8 @@ class FourierTransform:
         Returns:
             list: Frequências em Hz
         """
+        if self.backend == 'numpy':
+            return np.arange(N) * sample_rate / N
         return [k * sample_rate / N for k in range(N)]
     
     def apply_window(self, signal, window_type='hann'):
@@ -162,7 +555,14 @@ class FourierTransform:
         Returns:
             list: Sinal com janela aplicada
         """
+        if self.backend == 'numpy':
+            return self._apply_window_array(signal, window_type)
+        
         N = len(signal)
+        if N <= 1:
+            # Janela de um ponto vale 1 (as fórmulas dividiriam por N - 1 = 0)
+            return [x * 1.0 for x in signal]
+        
         windowed_signal = []
         
         for n in range(N):
@@ -178,6 +578,25 @@ class FourierTransform:
             windowed_signal.append(signal[n] * window_value)
         
         return windowed_signal
+    
+    def _apply_window_array(self, signal, window_type):
+        """Versão vetorizada de apply_window (mesmas fórmulas, calculadas sobre n = 0..N-1)"""
+        signal = np.asarray(signal)
+        if len(signal) <= 1:
+            return signal * 1.0  # Janela de um ponto vale 1, como no caminho de listas
+        
+        phase = 2 * np.pi * np.arange(len(signal)) / (len(signal) - 1)
+        
+        if window_type == 'hann':
+            window = 0.5 * (1 - np.cos(phase))
+        elif window_type == 'hamming':
+            window = 0.54 - 0.46 * np.cos(phase)
+        elif window_type == 'blackman':
+            window = 0.42 - 0.5 * np.cos(phase) + 0.08 * np.cos(2 * phase)
+        else:
+            return signal * 1.0  # Janela retangular
+        
+        return signal * window
 
 
 def generate_test_signal(freq, duration, sample_rate, amplitude=1.0, noise_level=0.0):
@@ -354,3 +773,33 @@ if __name__ == "__main__":
     print(f"Resolução em frequência: {sample_rate/len(X):.2f} Hz")
     print(f"Frequência de Nyquist: {sample_rate/2:.1f} Hz")
     print(f"Componentes de frequência: {len(X)//2} (devido à simetria)")
+    
+    # Backend NumPy: mesmos métodos, arrays na entrada e na saída
+    if np is not None:
+        print(f"\n=== Backend NumPy vs Listas ===")
+        
+        ft_numpy = FourierTransform(backend='numpy')
+        signal_array = np.array(combined_signal)
+        
+        checks = {
+            'dft': (ft.dft(small_signal), ft_numpy.dft(small_signal)),
+            'fft': (X, ft_numpy.fft(ft_numpy.apply_window(signal_array, 'hann'))),
+            'ifft': (reconstructed, ft_numpy.ifft(X)),
+            'magnitude': (magnitude, ft_numpy.magnitude_spectrum(X)),
+            'power': (power, ft_numpy.power_spectrum(X)),
+        }
+        for name, (list_result, array_result) in checks.items():
+            max_diff = np.max(np.abs(np.asarray(list_result) - array_result))
+            print(f"  {name}: diferença máxima = {max_diff:.2e}")
+        
+        start_time = time.time()
+        for _ in range(100):
+            ft.fft(combined_signal)
+        list_time = time.time() - start_time
+        
+        start_time = time.time()
+        for _ in range(100):
+            ft_numpy.fft(signal_array)
+        array_time = time.time() - start_time
+        
+        print(f"  100 FFTs: listas {list_time:.4f}s, NumPy {array_time:.4f}s ({list_time/array_time:.1f}x)")
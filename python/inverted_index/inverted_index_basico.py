@@ -3,20 +3,68 @@
 Permite busca rápida de documentos que contêm termos específicos
 """
 
+import os
 import re
+import sys
 import hashlib
+import importlib.util
 from collections import defaultdict, Counter
 import math
 
+# SimHash do diretório vizinho, usado apenas quando a deduplicação está ativa
+SIMHASH_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'simhash', 'simhash_basico.py')
+
+
+def _load_simhash():
+    """Importa simhash_basico sob demanda, pelo caminho do arquivo (sem alterar sys.path)"""
+    module = sys.modules.get('simhash_basico')
+    if module is None:
+        spec = importlib.util.spec_from_file_location('simhash_basico', SIMHASH_PATH)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        sys.modules['simhash_basico'] = module
+    return module
+
 
 class InvertedIndex:
-    def __init__(self):
-        """Inicializa o índice invertido"""
+    def __init__(self, dedup_threshold=None, dedup_action='skip', fingerprint_index=None, hash_bits=64):
+        """
+        Inicializa o índice invertido
+        
+        Args:
+            dedup_threshold (int, optional): Distância de Hamming máxima entre
+                SimHashes para considerar um documento near-duplicado.
+                None desativa a deduplicação.
+            dedup_action (str): 'skip' descarta o duplicado; 'link' guarda o
+                conteúdo e o associa ao original, sem indexar seus termos
+                (conta em total_docs, mas não no IDF)
+            fingerprint_index (optional): Índice de vizinhos com os métodos
+                add(fingerprint, doc_id) e query(fingerprint, max_distance).
+                Padrão: SimHashIndex em memória. Exige dedup_threshold
+            hash_bits (int): Número de bits do SimHash
+        """
+        if dedup_action not in ('skip', 'link'):
+            raise ValueError("dedup_action deve ser 'skip' ou 'link'")
+        if fingerprint_index is not None and dedup_threshold is None:
+            raise ValueError("fingerprint_index requer dedup_threshold")
+        
         self.index = defaultdict(set)  # termo -> conjunto de document_ids
         self.documents = {}  # document_id -> conteúdo original
         self.term_freq = defaultdict(lambda: defaultdict(int))  # doc_id -> {termo: freq}
-        self.doc_lengths = {}  # document_id -> número de termos
-        self.total_docs = 0
+        self.doc_lengths = {}  # document_id -> número de termos (só documentos indexados)
+        self.total_docs = 0  # Documentos guardados, inclusive near-duplicados com 'link'
+        
+        # Deduplicação por SimHash (opcional)
+        self.dedup_threshold = dedup_threshold
+        self.dedup_action = dedup_action
+        self.hash_bits = hash_bits
+        self.simhash = None  # Módulo simhash_basico, carregado só com deduplicação ativa
+        if dedup_threshold is not None:
+            self.simhash = _load_simhash()
+            if fingerprint_index is None:
+                fingerprint_index = self.simhash.SimHashIndex(hash_bits, dedup_threshold)
+        self.fingerprint_index = fingerprint_index
+        self.duplicates = {}  # doc_id duplicado -> doc_id original
     
     def _hash_document_id(self, content):
         """Gera um ID único para o documento baseado em hash"""
@@ -39,16 +87,32 @@ class InvertedIndex:
             doc_id (str, optional): ID personalizado para o documento
         
         Returns:
-            str: ID do documento adicionado
+            str: ID do documento adicionado (com dedup_action='skip', o ID
+                do documento original quando o conteúdo é um near-duplicado)
         """
         if doc_id is None:
             doc_id = self._hash_document_id(content)
         
-        # Armazena o documento
-        self.documents[doc_id] = content
-        
         # Tokeniza e processa termos
         terms = self._tokenize(content)
+        
+        # Deduplicação: o SimHash usa os mesmos termos já tokenizados
+        if self.fingerprint_index is not None:
+            fingerprint = self.simhash.SimHash.from_tokens(terms, self.hash_bits).hash_value
+            matches = self.fingerprint_index.query(fingerprint, self.dedup_threshold)
+            if matches:
+                original_id = matches[0][0]
+                self.duplicates[doc_id] = original_id
+                if self.dedup_action == 'skip':
+                    return original_id
+                # 'link': guarda o conteúdo, mas não indexa os termos
+                self.documents[doc_id] = content
+                self.total_docs += 1
+                return doc_id
+            self.fingerprint_index.add(fingerprint, doc_id)
+        
+        # Armazena o documento
+        self.documents[doc_id] = content
         self.doc_lengths[doc_id] = len(terms)
         
         # Calcula frequência dos termos
@@ -64,6 +128,25 @@ class InvertedIndex:
         self.total_docs += 1
         return doc_id
     
+    def add_documents(self, documents, doc_ids=None):
+        """
+        Adiciona vários documentos ao índice (ingestão em lote)
+        
+        Args:
+            documents (list): Conteúdos dos documentos
+            doc_ids (list, optional): IDs personalizados, na mesma ordem
+        
+        Returns:
+            list: IDs retornados por add_document para cada documento
+        """
+        if doc_ids is None:
+            doc_ids = [None] * len(documents)
+        return [self.add_document(content, doc_id) for content, doc_id in zip(documents, doc_ids)]
+    
+    def get_original(self, doc_id):
+        """Retorna o ID do documento original de um near-duplicado (ou o próprio ID)"""
+        return self.duplicates.get(doc_id, doc_id)
+    
     def search(self, query):
         """
         Busca documentos que contêm os termos da query
@@ -107,9 +190,10 @@ class InvertedIndex:
                 # Term Frequency (TF)
                 tf = self.term_freq[doc_id][term] / self.doc_lengths[doc_id]
                 
-                # Inverse Document Frequency (IDF)
+                # Inverse Document Frequency (IDF): só documentos indexados,
+                # pois near-duplicados com 'link' não entram nas listas de termos
                 docs_with_term = len(self.index[term])
-                idf = math.log(self.total_docs / docs_with_term)
+                idf = math.log(len(self.doc_lengths) / docs_with_term)
                 
                 # TF-IDF Score
                 score += tf * idf
@@ -159,8 +243,10 @@ class InvertedIndex:
         
         return {
             'total_documents': self.total_docs,
+            'indexed_documents': len(self.doc_lengths),
             'total_unique_terms': total_terms,
             'average_docs_per_term': avg_docs_per_term,
+            'duplicates_detected': len(self.duplicates),
             'index_size_bytes': self._estimate_memory_usage()
         }
     
@@ -235,6 +321,18 @@ if __name__ == "__main__":
         results_or = idx.search_boolean_or(query)
         print(f"  Busca OR ({len(results_or)} resultados): {results_or}")
     
+    # Deduplicação com SimHash durante a indexação
+    print(f"\n=== Deduplicação com SimHash ===")
+    dedup_idx = InvertedIndex(dedup_threshold=3)
+    dedup_docs = documents + [
+        "Python é uma linguagem de programação versátil e poderosa!",
+        "Machine learning com Python é muito popular entre os cientistas de dados",
+    ]
+    dedup_idx.add_documents(dedup_docs, [f"doc_{i+1}" for i in range(len(dedup_docs))])
+    for duplicate_id, original_id in dedup_idx.duplicates.items():
+        print(f"  {duplicate_id} é near-duplicado de {original_id} (não indexado)")
+    print(f"Documentos indexados: {dedup_idx.get_stats()['indexed_documents']} de {len(dedup_docs)}")
+    
     # Demonstra eficiência do hash
     print(f"\n=== Demonstração de Hash ===")
     doc_content = "Documento de teste para demonstrar hash"
@@ -16,6 +16,7 @@ Casos de uso:
 - Reconhecimento de padrões
 """
 
+import heapq
 import math
 from typing import List, Tuple, Any
 from collections import Counter
@@ -27,18 +28,25 @@ class KNNBasico:
     
     Esta implementação é focada na clareza e entendimento,
     utilizando estruturas simples e comentários extensos.
+    
+    Com verbose=False usa um caminho rápido em Python puro (sem NumPy):
+    heap limitado, distâncias ao quadrado e abandono antecipado.
     """
     
-    def __init__(self, k: int = 3):
+    def __init__(self, k: int = 3, verbose: bool = True):
         """
         Inicializa o classificador KNN.
         
         Args:
             k (int): Número de vizinhos mais próximos a considerar
+            verbose (bool): Se deve explicar cada passo com prints
+                (False = modo silencioso e rápido)
         """
         self.k = k
+        self.verbose = verbose
         self.dados_treino = []  # Lista para armazenar (ponto, classe)
-        print(f"🎯 KNN Básico inicializado com k={k}")
+        if verbose:
+            print(f"🎯 KNN Básico inicializado com k={k}")
     
     def calcular_distancia_euclidiana(self, ponto1: List[float], ponto2: List[float]) -> float:
         """
@@ -78,6 +86,9 @@ class KNNBasico:
             dados: Lista de tuplas (ponto, classe)
         """
         self.dados_treino = dados.copy()
+        if not self.verbose:
+            return
+        
         print(f"📚 Modelo treinado com {len(self.dados_treino)} exemplos")
         
         # Mostra estatísticas dos dados
@@ -95,6 +106,9 @@ class KNNBasico:
         Returns:
             Lista com os k vizinhos mais próximos (distancia, classe)
         """
+        if not self.verbose:
+            return self._encontrar_k_vizinhos_rapido(ponto_consulta)
+        
         print(f"\n🔍 Buscando {self.k} vizinhos mais próximos para {ponto_consulta}")
         
         # Calcula distância para todos os pontos de treino
@@ -116,6 +130,48 @@ class KNNBasico:
         
         return k_vizinhos
     
+    def _encontrar_k_vizinhos_rapido(self, ponto_consulta: List[float]) -> List[Tuple[float, Any]]:
+        """
+        Versão rápida e silenciosa de encontrar_k_vizinhos (mesmo resultado).
+        
+        - Compara distâncias ao quadrado: a raiz só é calculada para os k vencedores
+        - Mantém um max-heap com os k melhores: O(n log k) em vez de ordenar tudo
+        - Abandona a soma de um ponto assim que ela passa do k-ésimo melhor
+        
+        Args:
+            ponto_consulta: Ponto para o qual queremos encontrar vizinhos
+            
+        Returns:
+            Lista com os k vizinhos mais próximos (distancia, classe)
+        """
+        dimensao = len(ponto_consulta)
+        
+        # Max-heap via valores negados: (-distância², -posição, classe).
+        # Em empates sai primeiro o ponto de treino mais recente, como na ordenação estável.
+        heap = []
+        limite = math.inf  # k-ésima melhor distância² até agora
+        
+        for i, (ponto_treino, classe) in enumerate(self.dados_treino):
+            if len(ponto_treino) != dimensao:
+                raise ValueError("Os pontos devem ter a mesma dimensão")
+            
+            soma_quadrados = 0
+            for a, b in zip(ponto_consulta, ponto_treino):
+                diferenca = a - b
+                soma_quadrados += diferenca * diferenca
+                if soma_quadrados >= limite:
+                    break  # Abandono antecipado: não entra no top-k
+            else:
+                if len(heap) < self.k:
+                    heapq.heappush(heap, (-soma_quadrados, -i, classe))
+                else:
+                    heapq.heapreplace(heap, (-soma_quadrados, -i, classe))
+                if len(heap) == self.k:
+                    limite = -heap[0][0]
+        
+        vizinhos = sorted((-d, -i, classe) for d, i, classe in heap)
+        return [(math.sqrt(d), classe) for d, _, classe in vizinhos]
+    
     def classificar(self, ponto_consulta: List[float]) -> Any:
         """
         Classifica um ponto baseado nos k vizinhos mais próximos.
@@ -136,6 +192,9 @@ class KNNBasico:
         classes = [classe for _, classe in k_vizinhos]
         contador_classes = Counter(classes)
         
+        if not self.verbose:
+            return contador_classes.most_common(1)[0][0]
+        
         print(f"\n📊 Contagem de classes nos vizinhos: {dict(contador_classes)}")
         
         # Retorna a classe mais frequente
@@ -0,0 +1,402 @@
+"""
+Índices Espaciais para KNN - KD-Tree e Ball-Tree
+================================================
+
+Estruturas de particionamento do espaço que evitam comparar a consulta
+com todos os pontos de treino. Cada nó guarda um volume (caixa ou bola)
+que contém seus pontos; se a menor distância possível até esse volume já
+é maior que o k-ésimo melhor vizinho encontrado, o nó inteiro é podado.
+
+- KD-Tree: divide pela mediana da dimensão de maior amplitude e guarda
+  a caixa delimitadora de cada nó. Ótima em baixa dimensão (d ≲ 15).
+- Ball-Tree: divide pela projeção entre os dois pontos mais afastados e
+  guarda uma bola (centro, raio). Usa apenas a desigualdade triangular,
+  degradando menos em dimensões maiores.
+
+As duas árvores usam distância de Minkowski de ordem p (p=1 Manhattan,
+p=2 Euclidiana) e são armazenadas em arrays NumPy planos (um elemento
+por nó), o que facilita salvar e carregar o índice.
+
+Complexidade:
+- Construção: O(n log n)
+- Consulta: O(log n) em média para d baixo; tende a O(n) quando d cresce
+"""
+
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Dict, Tuple
+
+# Consultas percorridas juntas por bloco em `consultar_lote`
+CONSULTAS_POR_LOTE = 256
+
+# Teto do tamanho do nó varrido primeiro por cada consulta (~2^d pontos)
+PONTOS_MAX_NO_INICIAL = 4096
+
+# Máximo de elementos do tensor (pares, pontos da folha, d) de diferenças por passo
+ELEMENTOS_POR_PASSO = 1 << 20
+
+
+def distancia_minkowski(pontos: np.ndarray, x: np.ndarray, p: float,
+                        pesos: np.ndarray = None) -> np.ndarray:
+    """
+    Distância de Minkowski de cada linha de `pontos` até `x`.
+
+    Args:
+        pontos: Matriz (..., d)
+        x: Vetor (d,) ou array que se propaga com `pontos`
+        p: Ordem da distância
+        pesos: Peso positivo por dimensão, aplicado à diferença
+            (‖pesos·(linha - x)‖); None = sem pesos
+
+    Returns:
+        Array (...) de distâncias, na última dimensão
+    """
+    diff = np.abs(pontos - x)
+    if pesos is not None:
+        diff *= pesos
+    if p == 2:
+        return np.sqrt(np.einsum('...j,...j->...', diff, diff))
+    if p == 1:
+        return diff.sum(axis=-1)
+    return np.power(np.power(diff, p).sum(axis=-1), 1 / p)
+
+
+class ArvoreEspacial(ABC):
+    """
+    Base comum das árvores: construção por pilha e busca k-NN em lote.
+
+    Nós são identificados por inteiros; `esquerdo[no] == -1` indica folha.
+    Os pontos do nó são `indices[inicio[no]:fim[no]]`. A árvore guarda uma
+    cópia própria dos pontos na ordem de `indices` (`dados[j]` é o ponto
+    `indices[j]`), de modo que cada nó ocupa linhas contíguas.
+    """
+
+    # Atributos em arrays que descrevem a árvore (usados para salvar/carregar)
+    CAMPOS = ('indices', 'inicio', 'fim', 'esquerdo', 'direito')
+
+    def __init__(self, dados: np.ndarray, tamanho_folha: int = 40, p: float = 2.0):
+        """
+        Constrói a árvore sobre os dados.
+
+        Args:
+            dados: Matriz (n, d) de pontos (copiada na ordem das folhas)
+            tamanho_folha: Número máximo de pontos por folha
+            p: Ordem da distância de Minkowski
+        """
+        if tamanho_folha < 1:
+            raise ValueError("tamanho_folha deve ser pelo menos 1")
+
+        self.dados = dados
+        self.tamanho_folha = tamanho_folha
+        self.p = p
+        self._construir()
+        self._ordenar_dados(dados)
+
+    def _ordenar_dados(self, dados: np.ndarray):
+        """Copia os pontos na ordem das folhas (e suas normas, para p=2)"""
+        self.dados = dados[self.indices]
+        self._normas = np.einsum('ij,ij->i', self.dados, self.dados) if self.p == 2 else None
+
+    def _construir(self):
+        """Constrói os nós iterativamente, dividindo até atingir o tamanho de folha"""
+        n = len(self.dados)
+        self.indices = np.arange(n, dtype=np.int64)
+
+        inicio, fim, esquerdo, direito = [], [], [], []
+        volumes = []
+
+        def novo_no(ini, fi):
+            inicio.append(ini)
+            fim.append(fi)
+            esquerdo.append(-1)
+            direito.append(-1)
+            volumes.append(self._volume(self.indices[ini:fi]))
+            return len(inicio) - 1
+
+        pilha = [novo_no(0, n)]
+        while pilha:
+            no = pilha.pop()
+            ini, fi = inicio[no], fim[no]
+            if fi - ini <= self.tamanho_folha:
+                continue
+
+            # Reordena os índices do nó para que a primeira metade fique à esquerda
+            meio = ini + (fi - ini) // 2
+            self.indices[ini:fi] = self._particionar(self.indices[ini:fi], meio - ini)
+
+            esquerdo[no] = novo_no(ini, meio)
+            direito[no] = novo_no(meio, fi)
+            pilha.extend((esquerdo[no], direito[no]))
+
+        self.inicio = np.array(inicio, dtype=np.int64)
+        self.fim = np.array(fim, dtype=np.int64)
+        self.esquerdo = np.array(esquerdo, dtype=np.int64)
+        self.direito = np.array(direito, dtype=np.int64)
+        self._guardar_volumes(volumes)
+
+    @property
+    def n_nos(self) -> int:
+        return len(self.inicio)
+
+    def consultar(self, x: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encontra os k vizinhos mais próximos de x.
+
+        Args:
+            x: Ponto de consulta (d,)
+            k: Número de vizinhos
+
+        Returns:
+            (distâncias, índices) dos k vizinhos, ordenados por distância
+        """
+        distancias, indices = self.consultar_lote(x[None, :], k)
+        return distancias[0], indices[0]
+
+    def consultar_lote(self, X: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encontra os k vizinhos mais próximos de cada linha de X.
+
+        Todas as consultas percorrem a árvore juntas, nível a nível, como
+        pares (consulta, nó) em arrays:
+        1. Cada consulta desce, pela direção mais próxima, até o nó mais
+           profundo com pelo menos max(k, 2^d) pontos (até
+           PONTOS_MAX_NO_INICIAL); varrer esse nó dá o limite inicial
+           (k-ésima distância).
+        2. Pares cujo volume está mais longe que o limite são podados; os
+           demais descem até as folhas candidatas.
+        3. As folhas candidatas são varridas em rodadas, das mais próximas
+           para as mais distantes (1, 2, 4, ... folhas por consulta), apertando
+           o limite a cada rodada.
+
+        Args:
+            X: Consultas (m, d)
+            k: Número de vizinhos
+
+        Returns:
+            (distâncias (m, k), índices (m, k)), cada linha ordenada por distância
+        """
+        m = len(X)
+        k = min(k, len(self.indices))
+        distancias = np.empty((m, k))
+        indices = np.empty((m, k), dtype=np.int64)
+        for inicio in range(0, m, CONSULTAS_POR_LOTE):
+            fim = min(inicio + CONSULTAS_POR_LOTE, m)
+            distancias[inicio:fim], indices[inicio:fim] = self._consultar_bloco(X[inicio:fim], k)
+        return distancias, indices
+
+    def _consultar_bloco(self, X: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Busca k-NN de um bloco de consultas (ver `consultar_lote`)"""
+        m = len(X)
+        tamanhos = self.fim - self.inicio
+
+        # 1. Descida até o nó inicial e varredura dele. Um nó com ~2^d pontos
+        # costuma cercar a consulta, o que dá um limite inicial apertado
+        minimo = max(k, min(2 ** X.shape[1], PONTOS_MAX_NO_INICIAL))
+        casa = np.zeros(m, dtype=np.int64)
+        descendo = np.arange(m)
+        while len(descendo):
+            nos = casa[descendo]
+            internos = self.esquerdo[nos] != -1
+            descendo, nos = descendo[internos], nos[internos]
+            esquerdos, direitos = self.esquerdo[nos], self.direito[nos]
+            mais_perto_direito = (self._distancias_minimas(direitos, X[descendo])
+                                  < self._distancias_minimas(esquerdos, X[descendo]))
+            filhos = np.where(mais_perto_direito, direitos, esquerdos)
+            cabe = tamanhos[filhos] >= minimo
+            descendo = descendo[cabe]
+            casa[descendo] = filhos[cabe]
+
+        todas = np.arange(m)
+        melhores_d, melhores_pos = self._melhores(*self._varrer(X, todas, casa), k)
+
+        # 2. Descida em largura com poda; nós dentro do nó inicial já foram varridos
+        casa_inicio, casa_fim = self.inicio[casa], self.fim[casa]
+        consultas, nos = todas, np.zeros(m, dtype=np.int64)
+        folhas_q, folhas_no, folhas_limite = [], [], []
+        while len(consultas):
+            limites = self._distancias_minimas(nos, X[consultas])
+            ja_varrido = (self.inicio[nos] >= casa_inicio[consultas]) & (self.fim[nos] <= casa_fim[consultas])
+            vivos = (limites < melhores_d[consultas, -1]) & ~ja_varrido
+            consultas, nos, limites = consultas[vivos], nos[vivos], limites[vivos]
+
+            folha = self.esquerdo[nos] == -1
+            folhas_q.append(consultas[folha])
+            folhas_no.append(nos[folha])
+            folhas_limite.append(limites[folha])
+            consultas, nos = consultas[~folha], nos[~folha]
+            consultas = np.concatenate([consultas, consultas])
+            nos = np.concatenate([self.esquerdo[nos], self.direito[nos]])
+
+        # 3. Folhas candidatas em rodadas crescentes, das mais próximas às mais distantes
+        consultas = np.concatenate(folhas_q)
+        nos = np.concatenate(folhas_no)
+        limites = np.concatenate(folhas_limite)
+        ordem = np.lexsort((limites, consultas))
+        consultas, nos, limites = consultas[ordem], nos[ordem], limites[ordem]
+        posicao = np.arange(len(consultas)) - np.searchsorted(consultas, consultas, side='left')
+
+        largura = 1
+        while len(consultas):
+            rodada = posicao < largura
+            q, no = consultas[rodada], nos[rodada]
+            distancias, pontos = self._varrer(X, q, no)
+
+            # Candidatos da rodada lado a lado, uma linha por consulta
+            unicas, linha = np.unique(q, return_inverse=True)
+            colunas = (posicao[rodada] * distancias.shape[1])[:, None] + np.arange(distancias.shape[1])
+            candidatos_d = np.full((len(unicas), largura * distancias.shape[1]), np.inf)
+            candidatos_pos = np.zeros(candidatos_d.shape, dtype=np.int64)
+            candidatos_d[linha[:, None], colunas] = distancias
+            candidatos_pos[linha[:, None], colunas] = pontos
+            melhores_d[unicas], melhores_pos[unicas] = self._melhores(
+                np.hstack([melhores_d[unicas], candidatos_d]),
+                np.hstack([melhores_pos[unicas], candidatos_pos]), k)
+
+            # Próxima rodada: o dobro de folhas, já podadas pelo limite apertado
+            restantes = ~rodada & (limites < melhores_d[consultas, -1])
+            consultas, nos, limites = consultas[restantes], nos[restantes], limites[restantes]
+            posicao = posicao[restantes] - largura
+            largura *= 2
+
+        if self.p == 2:
+            # Seleção feita com o produto escalar; distâncias finais pela fórmula direta
+            exatas = distancia_minkowski(self.dados[melhores_pos], X[:, None, :], self.p)
+            ordem = np.argsort(exatas, axis=1, kind='stable')
+            melhores_d = np.take_along_axis(exatas, ordem, axis=1)
+            melhores_pos = np.take_along_axis(melhores_pos, ordem, axis=1)
+        return melhores_d, self.indices[melhores_pos]
+
+    @staticmethod
+    def _melhores(distancias: np.ndarray, posicoes: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """As k menores distâncias de cada linha (e suas posições), em ordem crescente"""
+        if distancias.shape[1] > k:
+            selecao = np.argpartition(distancias, k - 1, axis=1)[:, :k]
+            distancias = np.take_along_axis(distancias, selecao, axis=1)
+            posicoes = np.take_along_axis(posicoes, selecao, axis=1)
+        ordem = np.argsort(distancias, axis=1, kind='stable')
+        return np.take_along_axis(distancias, ordem, axis=1), np.take_along_axis(posicoes, ordem, axis=1)
+
+    def _varrer(self, X: np.ndarray, consultas: np.ndarray, nos: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distâncias de cada consulta X[consultas[j]] a todos os pontos do nó nos[j].
+
+        Os pontos de um nó são linhas contíguas de `dados`; os nós são
+        preenchidos até o maior deles e as posições vazias recebem distância
+        infinita. Com p=2 a distância vem do produto escalar com as normas
+        pré-calculadas (‖x‖² + ‖y‖² - 2x·y), sem o tensor de diferenças.
+
+        Returns:
+            (distâncias (P, L), posições dos pontos em `dados` (P, L))
+        """
+        tamanhos = self.fim[nos] - self.inicio[nos]
+        deslocamentos = np.arange(tamanhos.max())
+        validos = deslocamentos < tamanhos[:, None]
+        posicoes = np.minimum(self.inicio[nos][:, None] + deslocamentos, len(self.dados) - 1)
+
+        distancias = np.empty(posicoes.shape)
+        # Passos limitados para que o bloco (pares, L, d) de pontos fique pequeno
+        passo = max(1, ELEMENTOS_POR_PASSO // (posicoes.shape[1] * self.dados.shape[1]))
+        for inicio in range(0, len(nos), passo):
+            fim = min(inicio + passo, len(nos))
+            pontos = self.dados[posicoes[inicio:fim]]
+            x = X[consultas[inicio:fim]]
+            if self.p == 2:
+                quadrados = np.matmul(pontos, x[:, :, None])[:, :, 0]
+                quadrados *= -2
+                quadrados += self._normas[posicoes[inicio:fim]]
+                quadrados += np.einsum('ij,ij->i', x, x)[:, None]
+                distancias[inicio:fim] = np.sqrt(np.maximum(quadrados, 0))
+            else:
+                distancias[inicio:fim] = distancia_minkowski(pontos, x[:, None, :], self.p)
+        distancias[~validos] = np.inf
+        return distancias, posicoes
+
+    def para_arrays(self) -> Dict[str, np.ndarray]:
+        """Exporta a estrutura da árvore (sem os dados) como arrays NumPy"""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    @classmethod
+    def de_arrays(cls, dados: np.ndarray, arrays: Dict[str, np.ndarray],
+                  tamanho_folha: int, p: float) -> 'ArvoreEspacial':
+        """Reconstrói a árvore a partir de arrays exportados, sem reconstruir os nós"""
+        arvore = cls.__new__(cls)
+        arvore.tamanho_folha = tamanho_folha
+        arvore.p = p
+        for campo in cls.CAMPOS:
+            setattr(arvore, campo, arrays[campo])
+        arvore._ordenar_dados(dados)
+        return arvore
+
+    # Métodos específicos de cada árvore
+    @abstractmethod
+    def _volume(self, pontos: np.ndarray):
+        """Volume (caixa ou bola) que contém os pontos de um nó"""
+
+    @abstractmethod
+    def _guardar_volumes(self, volumes: list):
+        """Guarda os volumes de todos os nós em arrays"""
+
+    @abstractmethod
+    def _particionar(self, pontos: np.ndarray, meio: int) -> np.ndarray:
+        """Reordena os pontos para que os `meio` primeiros formem o filho esquerdo"""
+
+    @abstractmethod
+    def _distancias_minimas(self, nos: np.ndarray, X: np.ndarray) -> np.ndarray:
+        """Menor distância possível de X[j] (ou de um único ponto X) até o volume de nos[j]"""
+
+
+class KDTree(ArvoreEspacial):
+    """KD-Tree com caixas delimitadoras por nó."""
+
+    CAMPOS = ArvoreEspacial.CAMPOS + ('caixa_min', 'caixa_max')
+
+    def _volume(self, pontos: np.ndarray):
+        bloco = self.dados[pontos]
+        return bloco.min(axis=0), bloco.max(axis=0)
+
+    def _guardar_volumes(self, volumes: list):
+        self.caixa_min = np.array([v[0] for v in volumes])
+        self.caixa_max = np.array([v[1] for v in volumes])
+
+    def _particionar(self, pontos: np.ndarray, meio: int) -> np.ndarray:
+        # Divide na mediana da dimensão de maior amplitude
+        bloco = self.dados[pontos]
+        dimensao = np.argmax(bloco.max(axis=0) - bloco.min(axis=0))
+        ordem = np.argpartition(bloco[:, dimensao], meio)
+        return pontos[ordem]
+
+    def _distancias_minimas(self, nos: np.ndarray, X: np.ndarray) -> np.ndarray:
+        # Distância até cada caixa (zero nas dimensões em que a consulta está dentro)
+        excesso = np.maximum(self.caixa_min[nos] - X, 0) + np.maximum(X - self.caixa_max[nos], 0)
+        return distancia_minkowski(excesso, 0.0, self.p)
+
+
+class BallTree(ArvoreEspacial):
+    """Ball-Tree com bola (centro, raio) por nó."""
+
+    CAMPOS = ArvoreEspacial.CAMPOS + ('centros', 'raios')
+
+    def _volume(self, pontos: np.ndarray):
+        bloco = self.dados[pontos]
+        centro = bloco.mean(axis=0)
+        raio = distancia_minkowski(bloco, centro, self.p).max()
+        return centro, raio
+
+    def _guardar_volumes(self, volumes: list):
+        self.centros = np.array([v[0] for v in volumes])
+        self.raios = np.array([v[1] for v in volumes])
+
+    def _particionar(self, pontos: np.ndarray, meio: int) -> np.ndarray:
+        # Eixo de divisão: entre o ponto mais distante do centroide (a)
+        # e o ponto mais distante de a (b)
+        bloco = self.dados[pontos]
+        a = bloco[np.argmax(distancia_minkowski(bloco, bloco.mean(axis=0), self.p))]
+        b = bloco[np.argmax(distancia_minkowski(bloco, a, self.p))]
+        projecao = bloco @ (b - a)
+        ordem = np.argpartition(projecao, meio)
+        return pontos[ordem]
+
+    def _distancias_minimas(self, nos: np.ndarray, X: np.ndarray) -> np.ndarray:
+        # Desigualdade triangular: nenhum ponto da bola está mais perto que isso
+        distancia_centro = distancia_minkowski(self.centros[nos], X, self.p)
+        return np.maximum(distancia_centro - self.raios[nos], 0.0)
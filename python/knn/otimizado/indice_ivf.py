@@ -0,0 +1,236 @@
+"""
+Índice IVF (Inverted File) para KNN Aproximado
+==============================================
+
+Busca aproximada de vizinhos em grandes volumes de dados.
+
+1. Um quantizador grosso (k-means) divide o espaço em `n_listas` células
+2. Cada ponto de treino vai para a lista invertida do centroide mais próximo
+3. Na consulta, apenas as `n_probe` listas mais próximas são examinadas
+
+`n_probe` controla o compromisso entre recall e latência: n_probe = 1
+examina ~n/n_listas pontos; n_probe = n_listas equivale à busca exata.
+
+As listas são guardadas em formato CSR: `ids` contém os índices dos pontos
+ordenados por lista e `offsets[l]:offsets[l+1]` delimita a lista l.
+
+O índice trabalha sobre as linhas como estão armazenadas (ex.: códigos
+int8), sem cópia em ponto flutuante: com `escala` por dimensão a distância
+é ‖escala·(x - linha)‖, e a consulta é passada no mesmo espaço das linhas.
+Trocar `escala` (ex.: após o treino incremental mudar a normalização)
+não exige reconstruir as listas.
+
+Complexidade da consulta: O(n_listas·d + n_probe·(n/n_listas)·d)
+"""
+
+import numpy as np
+from typing import Dict, Tuple
+
+from arvores_espaciais import distancia_minkowski
+
+
+def _distancias_quadradas(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Distâncias euclidianas ao quadrado entre linhas de A e B via produto de matrizes."""
+    quadrados = np.einsum('ij,ij->i', A, A)[:, np.newaxis] + np.einsum('ij,ij->i', B, B)[np.newaxis, :]
+    quadrados -= 2 * (A @ B.T)
+    return np.maximum(quadrados, 0, out=quadrados)
+
+
+def _mais_proximo(pontos: np.ndarray, centroides: np.ndarray, escala: np.ndarray = None,
+                  elementos_bloco: int = 1 << 24) -> np.ndarray:
+    """
+    Índice do centroide mais próximo de cada ponto, em blocos de até elementos_bloco distâncias.
+
+    Com `escala`, pontos e centroides são comparados como pontos·escala
+    (cada bloco é convertido sob demanda, sem cópia do conjunto inteiro).
+    """
+    if escala is not None:
+        centroides = centroides * escala
+    atribuicoes = np.empty(len(pontos), dtype=np.int64)
+    bloco = max(1, elementos_bloco // max(len(centroides), pontos.shape[1]))
+    for inicio in range(0, len(pontos), bloco):
+        fim = inicio + bloco
+        linhas = pontos[inicio:fim].astype(np.float64)
+        if escala is not None:
+            linhas *= escala
+        atribuicoes[inicio:fim] = np.argmin(_distancias_quadradas(linhas, centroides), axis=1)
+    return atribuicoes
+
+
+def kmeans(dados: np.ndarray, n_clusters: int, n_iteracoes: int = 20, semente: int = 0) -> np.ndarray:
+    """
+    K-means (algoritmo de Lloyd) vetorizado.
+
+    Args:
+        dados: Pontos (n, d)
+        n_clusters: Número de centroides
+        n_iteracoes: Número máximo de iterações
+        semente: Semente do gerador aleatório
+
+    Returns:
+        Centroides (n_clusters, d)
+    """
+    rng = np.random.default_rng(semente)
+    centroides = dados[rng.choice(len(dados), n_clusters, replace=False)].astype(np.float64)
+
+    for _ in range(n_iteracoes):
+        atribuicoes = _mais_proximo(dados, centroides)
+
+        # Soma e contagem por cluster sem loop Python
+        contagens = np.bincount(atribuicoes, minlength=n_clusters)
+        somas = np.column_stack([
+            np.bincount(atribuicoes, weights=dados[:, j], minlength=n_clusters)
+            for j in range(dados.shape[1])
+        ])
+
+        novos = centroides.copy()
+        ocupados = contagens > 0
+        novos[ocupados] = somas[ocupados] / contagens[ocupados, np.newaxis]
+
+        # Clusters vazios recebem pontos aleatórios
+        vazios = np.flatnonzero(~ocupados)
+        if len(vazios):
+            novos[vazios] = dados[rng.choice(len(dados), len(vazios), replace=False)]
+
+        if np.allclose(novos, centroides):
+            break
+        centroides = novos
+
+    return centroides
+
+
+class IndiceIVF:
+    """
+    Índice de arquivo invertido com quantizador k-means.
+    """
+
+    CAMPOS = ('centroides', 'ids', 'offsets')
+
+    def __init__(self, dados: np.ndarray, n_listas: int, n_probe: int = 8,
+                 p: float = 2.0, n_iteracoes: int = 10,
+                 amostras_por_lista: int = 64, semente: int = 0,
+                 escala: np.ndarray = None):
+        """
+        Treina o quantizador e monta as listas invertidas.
+
+        Args:
+            dados: Pontos (n, d) armazenados, em qualquer dtype (não são copiados)
+            n_listas: Número de células (centroides)
+            n_probe: Número de listas examinadas por consulta
+            p: Ordem da distância de Minkowski usada no ranking final
+            n_iteracoes: Iterações do k-means
+            amostras_por_lista: O k-means é treinado em uma amostra de até
+                n_listas × amostras_por_lista pontos
+            semente: Semente do gerador aleatório
+            escala: Peso positivo por dimensão das distâncias (None = sem pesos)
+        """
+        n_listas = max(1, min(n_listas, len(dados)))
+        self.dados = dados
+        self.n_probe = n_probe
+        self.p = p
+        self.escala = escala
+
+        # K-means em uma amostra (no espaço escalado): o custo não depende de n
+        rng = np.random.default_rng(semente)
+        tamanho_amostra = min(len(dados), n_listas * amostras_por_lista)
+        amostra = dados[np.sort(rng.choice(len(dados), tamanho_amostra, replace=False))].astype(np.float64)
+        if escala is not None:
+            amostra *= escala
+        centroides = kmeans(amostra, n_listas, n_iteracoes, semente)
+        # Centroides guardados no espaço das linhas armazenadas
+        self.centroides = centroides / escala if escala is not None else centroides
+
+        # Listas invertidas em formato CSR
+        atribuicoes = _mais_proximo(dados, self.centroides, escala)
+        self.ids = np.argsort(atribuicoes, kind='stable').astype(np.int64)
+        self.offsets = np.concatenate([[0], np.cumsum(np.bincount(atribuicoes, minlength=n_listas))]).astype(np.int64)
+
+    @property
+    def n_listas(self) -> int:
+        return len(self.centroides)
+
+    def tamanhos_listas(self) -> np.ndarray:
+        """Número de pontos em cada lista invertida"""
+        return np.diff(self.offsets)
+
+    def adicionar(self, dados: np.ndarray):
+        """
+        Acrescenta as linhas novas de `dados` às listas existentes.
+
+        Os centroides não são retreinados: cada linha nova vai para a lista
+        do centroide mais próximo (sob a escala atual).
+
+        Args:
+            dados: Todos os pontos (n_total, d); as linhas a partir de
+                len(self.ids) são as novas
+        """
+        n_antigo = len(self.ids)
+        self.dados = dados
+        if len(dados) == n_antigo:
+            return
+
+        atribuicoes = _mais_proximo(dados[n_antigo:], self.centroides, self.escala)
+        ordem = np.argsort(atribuicoes, kind='stable')
+        novos_ids = np.arange(n_antigo, len(dados), dtype=np.int64)[ordem]
+
+        # Cada id novo entra no fim da sua lista (np.insert preserva a ordem dos empates)
+        self.ids = np.insert(self.ids, self.offsets[atribuicoes[ordem] + 1], novos_ids)
+        contagens = np.bincount(atribuicoes, minlength=self.n_listas)
+        self.offsets = self.offsets + np.concatenate([[0], np.cumsum(contagens)])
+
+    def consultar(self, x: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encontra (aproximadamente) os k vizinhos mais próximos de x.
+
+        Examina as n_probe listas mais próximas; se elas tiverem menos de k
+        pontos, continua pelas listas seguintes até reunir k candidatos.
+
+        Args:
+            x: Ponto de consulta (d,), no espaço das linhas armazenadas
+            k: Número de vizinhos
+
+        Returns:
+            (distâncias, índices) dos k vizinhos, ordenados por distância
+            (distâncias já ponderadas por `escala`)
+        """
+        k = min(k, len(self.ids))
+        if self.escala is None:
+            ordem_listas = np.argsort(_distancias_quadradas(x[np.newaxis, :], self.centroides)[0])
+        else:
+            ordem_listas = np.argsort(_distancias_quadradas((x * self.escala)[np.newaxis, :],
+                                                            self.centroides * self.escala)[0])
+        tamanhos = self.tamanhos_listas()[ordem_listas]
+
+        # Quantas listas são necessárias para ter pelo menos k candidatos
+        acumulado = np.cumsum(tamanhos)
+        n_listas = max(min(self.n_probe, self.n_listas), int(np.searchsorted(acumulado, k)) + 1)
+
+        candidatos = np.concatenate([
+            self.ids[self.offsets[lista]:self.offsets[lista + 1]]
+            for lista in ordem_listas[:n_listas]
+        ])
+        distancias = distancia_minkowski(self.dados[candidatos], x, self.p, self.escala)
+
+        if len(candidatos) > k:
+            selecao = np.argpartition(distancias, k - 1)[:k]
+            candidatos, distancias = candidatos[selecao], distancias[selecao]
+
+        ordem = np.argsort(distancias, kind='stable')
+        return distancias[ordem], candidatos[ordem]
+
+    def para_arrays(self) -> Dict[str, np.ndarray]:
+        """Exporta o índice (sem os dados) como arrays NumPy"""
+        return {campo: getattr(self, campo) for campo in self.CAMPOS}
+
+    @classmethod
+    def de_arrays(cls, dados: np.ndarray, arrays: Dict[str, np.ndarray],
+                  n_probe: int, p: float, escala: np.ndarray = None) -> 'IndiceIVF':
+        """Reconstrói o índice a partir de arrays exportados, sem treinar o k-means"""
+        indice = cls.__new__(cls)
+        indice.dados = dados
+        indice.n_probe = n_probe
+        indice.p = p
+        indice.escala = escala
+        for campo in cls.CAMPOS:
+            setattr(indice, campo, arrays[campo])
+        return indice
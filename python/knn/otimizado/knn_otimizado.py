@@ -15,13 +15,20 @@ Otimizações implementadas:
 """
 
 import numpy as np
+import hashlib
+import json
+import os
 import time
 from typing import List, Tuple, Any, Dict, Union
-from collections import Counter
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
 import warnings
 
+from arvores_espaciais import KDTree, BallTree
+from indice_ivf import IndiceIVF
+
 # Suprime avisos desnecessários
 warnings.filterwarnings('ignore')
 
@@ -34,6 +41,42 @@ class MetricaDistancia(Enum):
     COSENO = "coseno"
 
 
+class TipoIndice(Enum):
+    """Enum para a estrutura usada na busca de vizinhos."""
+    BRUTO = "bruto"
+    KD_TREE = "kd_tree"
+    BALL_TREE = "ball_tree"
+    IVF = "ivf"
+    AUTO = "auto"
+
+
+class TipoArmazenamento(Enum):
+    """Enum para o formato dos dados de treino em memória."""
+    FLOAT64 = "float64"
+    FLOAT32 = "float32"
+    INT8 = "int8"  # Quantização escalar simétrica por dimensão
+
+
+class TipoPeso(Enum):
+    """Enum para o peso de cada vizinho na votação/média."""
+    UNIFORME = "uniforme"
+    DISTANCIA = "distancia"  # 1 / d
+    GAUSSIANO = "gaussiano"  # exp(-d² / 2h²)
+
+
+# AUTO só usa KD-Tree em baixa dimensão e com treino grande; nos demais casos
+# a poda das árvores não compensa a força bruta vetorizada (ver README)
+DIMENSAO_MAX_KD_TREE = 6
+AMOSTRAS_MIN_KD_TREE = 20_000
+
+# Máximo de linhas de treino por passo ao pré-calcular normas (também limitado por memoria_max_mb)
+LINHAS_POR_PASSO = 1 << 16
+
+# Formato do diretório gravado por KNNOtimizado.salvar
+VERSAO_FORMATO = 2
+ARQUIVO_METADADOS = "metadados.json"
+
+
 @dataclass
 class ResultadoClassificacao:
     """Classe para armazenar resultado de classificação com métricas."""
@@ -54,6 +97,16 @@ class EstatisticasPerformance:
     relatorio_classes: Dict
 
 
+@dataclass
+class EstatisticasRegressao:
+    """Classe para armazenar estatísticas de performance da regressão."""
+    mse: float
+    mae: float
+    r2: float
+    tempo_total: float
+    tempo_medio_predicao: float
+
+
 class KNNOtimizado:
     """
     Implementação otimizada do algoritmo K-Nearest Neighbors.
@@ -70,7 +123,13 @@ class KNNOtimizado:
                  k: int = 3,
                  metrica: MetricaDistancia = MetricaDistancia.EUCLIDIANA,
                  normalizar: bool = True,
-                 p: float = 2.0):
+                 p: float = 2.0,
+                 memoria_max_mb: float = 256.0,
+                 armazenamento: TipoArmazenamento = TipoArmazenamento.FLOAT64,
+                 pesos: TipoPeso = TipoPeso.UNIFORME,
+                 largura_kernel: float = 1.0,
+                 tamanho_cache: int = 0,
+                 verbose: bool = True):
         """
         Inicializa o classificador KNN otimizado.
         
@@ -79,22 +138,70 @@ class KNNOtimizado:
             metrica: Métrica de distância a usar
             normalizar: Se deve normalizar os dados
             p: Parâmetro para distância Minkowski
+            memoria_max_mb: Orçamento de memória para os blocos temporários
+                do cálculo de distâncias por força bruta (não inclui as
+                consultas normalizadas nem os vizinhos devolvidos)
+            armazenamento: Formato dos dados de treino (FLOAT64, FLOAT32
+                com metade da memória, ou INT8 quantizado com 1/8)
+            pesos: Peso dos vizinhos (uniforme, 1/d ou kernel gaussiano)
+            largura_kernel: Largura h do kernel gaussiano
+            tamanho_cache: Número máximo de consultas guardadas no cache LRU
+                de vizinhos (0 = sem cache)
+            verbose: Se deve imprimir mensagens de inicialização e treino
         """
         self.k = k
         self.metrica = metrica
         self.normalizar = normalizar
         self.p = p
+        self.memoria_max_mb = memoria_max_mb
+        self.armazenamento = armazenamento
+        self.pesos = pesos
+        self.largura_kernel = largura_kernel
+        self.tamanho_cache = tamanho_cache
+        self.verbose = verbose
         
         self.X_treino = None
         self.y_treino = None
         self.media_treino = None
         self.std_treino = None
         self.classes_unicas = None
+        self.indice = None
+        self.tipo_indice = TipoIndice.BRUTO
+        self._normas_treino = None  # Cache de normas das linhas de treino
+        self._y_codificado = None  # Classes de treino como inteiros (índices em classes_unicas)
+        self._escala_quantizacao = None  # Passo da quantização INT8 por dimensão
+        
+        # Treino incremental: buffers com capacidade extra e estatísticas de Welford
+        self._n_treino = 0
+        self._buffer_X = None
+        self._buffer_y = None
+        self._buffer_codigos = None
+        self._m2_treino = None  # Soma dos quadrados dos desvios por dimensão
+        self._media_referencia = None  # Estatísticas com que as linhas foram armazenadas
+        self._std_referencia = None
+        self._transformacao = None  # (fator, deslocamento) das linhas antigas para a normalização atual
+        self._normas_desatualizadas = False
+        self._indice_desatualizado = False
+        self._parametros_indice = (40, None, 8)
         
-        print(f"🚀 KNN Otimizado inicializado:")
-        print(f"   K: {k}")
-        print(f"   Métrica: {metrica.value}")
-        print(f"   Normalização: {normalizar}")
+        # Cache LRU: hash da consulta normalizada -> (distâncias, índices) dos vizinhos
+        self._cache = OrderedDict()
+        self._acertos_cache = 0
+        self._falhas_cache = 0
+        
+        self._log(f"🚀 KNN Otimizado inicializado:")
+        self._log(f"   K: {k}")
+        self._log(f"   Métrica: {metrica.value}")
+        self._log(f"   Normalização: {normalizar}")
+        if armazenamento != TipoArmazenamento.FLOAT64:
+            self._log(f"   Armazenamento: {armazenamento.value}")
+        if pesos != TipoPeso.UNIFORME:
+            self._log(f"   Pesos: {pesos.value}")
+    
+    def _log(self, mensagem: str):
+        """Imprime mensagens de progresso apenas no modo verbose."""
+        if self.verbose:
+            print(mensagem)
     
     def _normalizar_dados(self, X: np.ndarray, fit: bool = True) -> np.ndarray:
         """
@@ -112,12 +219,19 @@ class KNNOtimizado:
         
         if fit:
             self.media_treino = np.mean(X, axis=0)
-            self.std_treino = np.std(X, axis=0)
-            # Evita divisão por zero
-            self.std_treino[self.std_treino == 0] = 1
+            self._m2_treino = np.var(X, axis=0) * len(X)
+            self._atualizar_std(len(X))
+            self._media_referencia = self.media_treino.copy()
+            self._std_referencia = self.std_treino.copy()
         
         return (X - self.media_treino) / self.std_treino
     
+    def _atualizar_std(self, n: int):
+        """Desvio padrão de n pontos a partir de M2 (soma dos quadrados dos desvios)."""
+        self.std_treino = np.sqrt(self._m2_treino / n)
+        # Evita divisão por zero
+        self.std_treino[self.std_treino == 0] = 1
+    
     def _calcular_distancias(self, X1: np.ndarray, X2: np.ndarray) -> np.ndarray:
         """
         Calcula distâncias entre pontos usando NumPy vetorizado.
@@ -159,180 +273,1235 @@ class KNNOtimizado:
         else:
             raise ValueError(f"Métrica {self.metrica} não implementada")
     
-    def treinar(self, X: np.ndarray, y: np.ndarray):
+    @property
+    def _dtype_calculo(self) -> np.dtype:
+        """Tipo de ponto flutuante usado nas distâncias (float32 para armazenamento compacto)."""
+        if self.armazenamento == TipoArmazenamento.FLOAT64:
+            return np.dtype(np.float64)
+        return np.dtype(np.float32)
+    
+    def _armazenar(self, X_norm: np.ndarray, ajustar: bool = True) -> np.ndarray:
+        """
+        Converte os dados normalizados para o formato de armazenamento.
+        
+        INT8 usa quantização escalar simétrica por dimensão:
+        código = round(x / escala), com escala = max|x| / 127.
+        
+        Args:
+            X_norm: Dados de treino normalizados (n, d)
+            ajustar: Se deve recalcular a escala INT8 (False no treino
+                incremental: valores fora da faixa original saturam)
+            
+        Returns:
+            Matriz armazenada (float64, float32 ou códigos int8)
+        """
+        if self.armazenamento == TipoArmazenamento.FLOAT64:
+            return X_norm
+        if self.armazenamento == TipoArmazenamento.FLOAT32:
+            return X_norm.astype(np.float32)
+        
+        if ajustar:
+            escala = np.abs(X_norm).max(axis=0) / 127
+            escala[escala == 0] = 1
+            self._escala_quantizacao = escala.astype(np.float32)
+        return np.clip(np.rint(X_norm / self._escala_quantizacao), -127, 127).astype(np.int8)
+    
+    def _mapa_linhas(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transformação afim das linhas armazenadas para a normalização atual.
+        
+        linha normalizada = armazenada·escala + deslocamento, por dimensão.
+        `escala` junta o passo da quantização INT8 e o fator σ₀/σ do treino
+        incremental; `deslocamento` é (μ₀ - μ)/σ. Cada termo é None quando
+        não se aplica (FLOAT64/FLOAT32 sem treino incremental: identidade).
+        
+        As distâncias por força bruta e o IVF usam o mapa do lado da
+        consulta, sem reescrever nem decodificar os dados de treino.
+        """
+        escala = deslocamento = None
+        if self.armazenamento == TipoArmazenamento.INT8:
+            escala = self._escala_quantizacao.astype(np.float64)
+        if self._transformacao is not None:
+            fator, deslocamento = self._transformacao
+            escala = fator if escala is None else escala * fator
+        return escala, deslocamento
+    
+    def _decodificar(self, armazenados: np.ndarray) -> np.ndarray:
+        """
+        Converte linhas armazenadas para ponto flutuante na normalização atual.
+        
+        Usado apenas em poucas linhas (vizinhos selecionados) e na cópia
+        das árvores; a busca por força bruta trabalha sobre as linhas
+        armazenadas.
+        """
+        escala, deslocamento = self._mapa_linhas()
+        tipo = self._dtype_calculo
+        if escala is None and deslocamento is None:
+            return armazenados.astype(tipo, copy=False)
+        
+        valores = armazenados.astype(tipo)
+        if escala is not None:
+            valores *= escala.astype(tipo)
+        if deslocamento is not None:
+            valores += deslocamento.astype(tipo)
+        return valores
+    
+    def _atualizar_transformacao(self):
+        """
+        Recalcula a transformação das linhas armazenadas para a normalização atual.
+        
+        Linhas guardadas como (x - μ₀) / σ₀ viram (x - μ) / σ com
+        fator = σ₀ / σ e deslocamento = (μ₀ - μ) / σ.
+        """
+        if (not self.normalizar
+                or (np.array_equal(self.media_treino, self._media_referencia)
+                    and np.array_equal(self.std_treino, self._std_referencia))):
+            self._transformacao = None
+            return
+        
+        fator = self._std_referencia / self.std_treino
+        deslocamento = (self._media_referencia - self.media_treino) / self.std_treino
+        self._transformacao = (fator, deslocamento)
+    
+    def _atualizar_normas_treino(self):
+        """
+        Pré-calcula as normas das linhas de treino usadas pelo motor em blocos.
+        
+        Com linha = s·a + c (ver `_mapa_linhas`), euclidiana guarda a norma
+        ponderada ‖a·s‖² (o termo de c fica do lado da consulta) e cosseno
+        guarda ‖s·a + c‖. As normas são calculadas sobre os valores
+        armazenados (já quantizados), passo a passo para não decodificar
+        tudo de uma vez.
+        """
+        if self.metrica not in (MetricaDistancia.EUCLIDIANA, MetricaDistancia.COSENO):
+            self._normas_treino = None
+            return
+        
+        escala, deslocamento = self._mapa_linhas()
+        if self.metrica == MetricaDistancia.EUCLIDIANA:
+            deslocamento = None
+        
+        # Um único buffer float64 reaproveitado entre os passos; ele e o vetor
+        # de normas cabem no orçamento de memória
+        n, d = self.X_treino.shape
+        livre = int(self.memoria_max_mb * 1024 * 1024) - 8 * n
+        linhas_por_passo = max(1, min(LINHAS_POR_PASSO, n, livre // (8 * d)))
+        normas = np.empty(n)
+        buffer = np.empty((linhas_por_passo, d))
+        for inicio in range(0, n, linhas_por_passo):
+            fim = min(inicio + linhas_por_passo, n)
+            bloco = buffer[:fim - inicio]
+            bloco[...] = self.X_treino[inicio:fim]
+            if escala is not None:
+                bloco *= escala
+            if deslocamento is not None:
+                bloco += deslocamento
+            np.einsum('ij,ij->i', bloco, bloco, out=normas[inicio:fim])
+        del buffer
+        self._normas_treino = normas
+        
+        if self.metrica == MetricaDistancia.COSENO:
+            np.sqrt(self._normas_treino, out=self._normas_treino)
+        self._normas_desatualizadas = False
+    
+    def _garantir_normas(self):
+        """Recalcula as normas adiadas pelo treino incremental, se necessário."""
+        if self._normas_desatualizadas:
+            self._atualizar_normas_treino()
+    
+    def _linhas_treino(self, indices: np.ndarray) -> np.ndarray:
+        """Retorna as linhas de treino normalizadas nas posições indicadas."""
+        return self._decodificar(self.X_treino[indices])
+    
+    def _preparar_consultas(self, consultas: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Leva um bloco de consultas ao espaço das linhas armazenadas.
+        
+        Com linha = s·a + c (ver `_mapa_linhas`):
+        - euclidiana: ‖q - linha‖² = ‖q - c‖² + ‖a·s‖² - 2 (a·(q - c))·s
+        - cosseno: q̂·linha = (a·q̂)·s + q̂·c, com q̂ = q/‖q‖ e ‖linha‖ pré-calculada
+        - Manhattan/Minkowski: Σ |a·((q - c)/a - s)|^p
+        
+        Args:
+            consultas: Bloco de consultas normalizadas (mq, d)
+            
+        Returns:
+            (matriz comparada com as linhas armazenadas (mq, d),
+             termo por consulta somado ao produto (mq,) ou None,
+             peso por dimensão das métricas sem GEMM ou None)
+        """
+        escala, deslocamento = self._mapa_linhas()
+        tipo = self._dtype_calculo
+        
+        if self.metrica == MetricaDistancia.COSENO:
+            unitarias = consultas / np.linalg.norm(consultas, axis=1, keepdims=True)
+            termo = unitarias @ deslocamento if deslocamento is not None else np.zeros(len(consultas))
+            matriz = unitarias * escala if escala is not None else unitarias
+            return matriz.astype(tipo, copy=False), termo, None
+        
+        centradas = consultas - deslocamento if deslocamento is not None else consultas
+        if self.metrica == MetricaDistancia.EUCLIDIANA:
+            termo = np.einsum('ij,ij->i', centradas, centradas)
+            matriz = centradas * escala if escala is not None else centradas
+            return matriz.astype(tipo, copy=False), termo, None
+        
+        matriz = centradas / escala if escala is not None else centradas
+        return matriz.astype(tipo, copy=False), None, escala
+    
+    def _distancias_bloco(self, matriz: np.ndarray, termo: np.ndarray, pesos: np.ndarray,
+                          inicio: int, fim: int) -> np.ndarray:
+        """
+        Calcula a matriz de distâncias de um bloco de consultas contra um bloco de treino.
+        
+        Trabalha direto sobre as linhas armazenadas, com as consultas já
+        preparadas por `_preparar_consultas`. Para a métrica euclidiana
+        retorna a distância ao quadrado (mesma ordenação, sem sqrt),
+        calculada como um produto de matrizes (GEMM).
+        
+        Args:
+            matriz, termo, pesos: Consultas preparadas (ver `_preparar_consultas`)
+            inicio: Primeira linha do bloco de treino
+            fim: Fim (exclusivo) do bloco de treino
+            
+        Returns:
+            Matriz (mq, fim - inicio)
+        """
+        # Sem cópia para FLOAT64/FLOAT32; códigos int8 viram float32 sem aplicar
+        # a escala (que está na consulta), pois o GEMM misto não usa BLAS
+        bloco = self.X_treino[inicio:fim].astype(self._dtype_calculo, copy=False)
+        
+        if self.metrica == MetricaDistancia.EUCLIDIANA:
+            quadrados = termo[:, np.newaxis] + self._normas_treino[np.newaxis, inicio:fim]
+            quadrados -= 2 * (matriz @ bloco.T)
+            return np.maximum(quadrados, 0, out=quadrados)
+        
+        if self.metrica == MetricaDistancia.COSENO:
+            produtos = matriz @ bloco.T
+            produtos += termo[:, np.newaxis]
+            produtos /= self._normas_treino[np.newaxis, inicio:fim]
+            return 1 - produtos
+        
+        diff = np.abs(matriz[:, np.newaxis, :] - bloco[np.newaxis, :, :])
+        if pesos is not None:
+            diff *= pesos
+        if self.metrica == MetricaDistancia.MANHATTAN:
+            return np.sum(diff, axis=2)
+        return np.power(np.sum(np.power(diff, self.p), axis=2), 1/self.p)
+    
+    def _tamanhos_bloco(self, n_consultas: int, n_treino: int, d: int, k: int,
+                        n_jobs: int = 1) -> Tuple[int, int]:
+        """
+        Escolhe o tamanho dos blocos de consultas e de treino dentro do orçamento de memória.
+        
+        O orçamento cobre tudo o que um bloco aloca: a matriz de distâncias
+        e seus temporários, as cópias preparadas das consultas, o top-k
+        corrente, o cálculo final das distâncias dos k vizinhos e a cópia
+        float32 do bloco de códigos int8. Com n_jobs trabalhadores em
+        paralelo, cada um usa 1/n_jobs do orçamento.
+        
+        Returns:
+            (linhas de consulta por bloco, linhas de treino por bloco)
+        """
+        # Bytes por par (consulta, treino): matriz de distâncias, temporários do
+        # GEMM e os índices do argpartition; métricas sem GEMM materializam o
+        # tensor de diferenças (d por par) e a sua potência
+        usa_gemm = self.metrica in (MetricaDistancia.EUCLIDIANA, MetricaDistancia.COSENO)
+        bytes_por_par = 8 * (4 if usa_gemm else 2 * d + 2)
+        
+        # Bytes por consulta: cópias preparadas (d), top-k corrente e candidatos,
+        # vizinhos finais reunidos com suas diferenças (k·d)
+        bytes_por_consulta = 8 * (3 * d + 6 * k + 3 * k * d)
+        
+        # Códigos int8 são convertidos para float32 bloco a bloco (a escala
+        # fica na consulta): a cópia do bloco de treino entra no orçamento
+        bytes_por_linha_treino = 4 * d if self.armazenamento == TipoArmazenamento.INT8 else 0
+        
+        orcamento = int(self.memoria_max_mb * 1024 * 1024 / n_jobs)
+        treino_alvo = min(n_treino, 1024)
+        bloco_consultas = (orcamento - treino_alvo * bytes_por_linha_treino) // (
+            bytes_por_consulta + treino_alvo * bytes_por_par)
+        bloco_consultas = max(1, min(n_consultas, 1024, bloco_consultas))
+        
+        restante = orcamento - bloco_consultas * bytes_por_consulta
+        bloco_treino = restante // (bloco_consultas * bytes_por_par + bytes_por_linha_treino)
+        bloco_treino = max(1, min(n_treino, bloco_treino))
+        return bloco_consultas, bloco_treino
+    
+    def _k_vizinhos_em_blocos(self, X_norm: np.ndarray, k: int,
+                              n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca exata por força bruta em blocos, com memória limitada.
+        
+        Percorre blocos de consultas × blocos de treino mantendo, para cada
+        consulta, os k melhores candidatos vistos até o momento. No final,
+        as distâncias dos k vizinhos são recalculadas pela fórmula direta,
+        de modo que os valores retornados são os mesmos da versão sem blocos.
+        
+        Com armazenamento compacto a distância é assimétrica: a consulta
+        fica em ponto flutuante (com a escala INT8 aplicada a ela) e os
+        dados de treino são lidos como estão armazenados; nenhum bloco é
+        decodificado para float64.
+        
+        Args:
+            X_norm: Consultas normalizadas (m, d)
+            k: Número de vizinhos
+            n_jobs: Número de trabalhadores executando ao mesmo tempo
+                (divide o orçamento de memória)
+            
+        Returns:
+            (distâncias, índices), ambos (m, k), ordenados por distância
+        """
+        X_norm = X_norm.astype(self._dtype_calculo, copy=False)
+        m, d = X_norm.shape
+        n = len(self.X_treino)
+        k = min(k, n)
+        bloco_consultas, bloco_treino = self._tamanhos_bloco(m, n, d, k, n_jobs)
+        
+        distancias = np.empty((m, k))
+        indices = np.empty((m, k), dtype=np.int64)
+        
+        for inicio_q in range(0, m, bloco_consultas):
+            consultas = X_norm[inicio_q:inicio_q + bloco_consultas]
+            preparadas = self._preparar_consultas(consultas)
+            linhas = np.arange(len(consultas))[:, np.newaxis]
+            
+            # Top-k corrente de cada consulta, atualizado a cada bloco de treino
+            melhores_d = np.full((len(consultas), 0), np.inf)
+            melhores_i = np.empty((len(consultas), 0), dtype=np.int64)
+            
+            for inicio_t in range(0, n, bloco_treino):
+                fim_t = min(inicio_t + bloco_treino, n)
+                bloco_d = self._distancias_bloco(*preparadas, inicio_t, fim_t)
+                
+                # Seleciona os k melhores do bloco antes de juntar ao top-k corrente
+                if bloco_d.shape[1] > k:
+                    selecao = np.argpartition(bloco_d, k - 1, axis=1)[:, :k]
+                    bloco_d = bloco_d[linhas, selecao]
+                    bloco_i = selecao + inicio_t
+                else:
+                    bloco_i = np.broadcast_to(np.arange(inicio_t, fim_t), bloco_d.shape)
+                
+                candidatos_d = np.concatenate([melhores_d, bloco_d], axis=1)
+                candidatos_i = np.concatenate([melhores_i, bloco_i], axis=1)
+                
+                if candidatos_d.shape[1] > k:
+                    selecao = np.argpartition(candidatos_d, k - 1, axis=1)[:, :k]
+                    candidatos_d = candidatos_d[linhas, selecao]
+                    candidatos_i = candidatos_i[linhas, selecao]
+                
+                melhores_d, melhores_i = candidatos_d, candidatos_i
+            
+            # Distâncias finais pela fórmula direta (apenas k por consulta)
+            exatas = self._distancias_vizinhos(consultas, melhores_i)
+            ordem = np.argsort(exatas, axis=1, kind='stable')
+            distancias[inicio_q:inicio_q + len(consultas)] = exatas[linhas, ordem]
+            indices[inicio_q:inicio_q + len(consultas)] = melhores_i[linhas, ordem]
+        
+        return distancias, indices
+    
+    def _distancias_vizinhos(self, consultas: np.ndarray, indices: np.ndarray) -> np.ndarray:
+        """
+        Distância direta de cada consulta até os seus vizinhos selecionados.
+        
+        Args:
+            consultas: Consultas normalizadas (mq, d)
+            indices: Índices dos vizinhos (mq, k)
+            
+        Returns:
+            Matriz (mq, k) de distâncias
+        """
+        vizinhos = self._linhas_treino(indices)  # (mq, k, d)
+        
+        if self.metrica == MetricaDistancia.COSENO:
+            consultas_norm = consultas / np.linalg.norm(consultas, axis=1, keepdims=True)
+            vizinhos_norm = vizinhos / self._normas_treino[indices][:, :, np.newaxis]
+            return 1 - np.einsum('qd,qkd->qk', consultas_norm, vizinhos_norm)
+        
+        diff = np.abs(consultas[:, np.newaxis, :] - vizinhos)
+        if self.metrica == MetricaDistancia.EUCLIDIANA:
+            return np.sqrt(np.sum(diff**2, axis=2))
+        if self.metrica == MetricaDistancia.MANHATTAN:
+            return np.sum(diff, axis=2)
+        return np.power(np.sum(np.power(diff, self.p), axis=2), 1/self.p)
+    
+    def _ordem_minkowski(self) -> float:
+        """Ordem p da distância de Minkowski equivalente à métrica configurada."""
+        if self.metrica == MetricaDistancia.MANHATTAN:
+            return 1.0
+        if self.metrica == MetricaDistancia.MINKOWSKI:
+            return self.p
+        # Euclidiana e cosseno (sobre vetores unitários) usam p=2
+        return 2.0
+    
+    def _construir_indice(self, tipo: TipoIndice, tamanho_folha: int,
+                          n_listas: int = None, n_probe: int = 8):
+        """
+        Constrói o índice espacial sobre os dados de treino normalizados.
+        
+        O IVF trabalha sobre as linhas armazenadas (inclusive códigos
+        int8), com o mapa de `_mapa_linhas` do lado da consulta. As árvores
+        mantêm uma cópia normalizada em ponto flutuante dos dados na ordem
+        das folhas (float32 com armazenamento compacto; ver
+        `memoria_indice_mb`), e o IVF com cosseno uma cópia dos vetores
+        unitários, ou seja, não se beneficiam da compressão;
+        para a métrica cosseno a cópia guarda os vetores unitários e a
+        distância é euclidiana, pois 1 - cos = ‖u - v‖² / 2.
+        
+        Args:
+            tipo: Tipo de índice
+            tamanho_folha: Número máximo de pontos por folha (árvores)
+            n_listas: Número de listas do IVF (padrão: 4·√n)
+            n_probe: Listas examinadas por consulta no IVF
+        """
+        if tipo == TipoIndice.AUTO:
+            n, d = self.X_treino.shape
+            arvore_compensa = (d <= DIMENSAO_MAX_KD_TREE and n >= AMOSTRAS_MIN_KD_TREE
+                               and self.metrica != MetricaDistancia.COSENO)
+            tipo = TipoIndice.KD_TREE if arvore_compensa else TipoIndice.BRUTO
+        
+        self.tipo_indice = tipo
+        self._indice_desatualizado = False
+        if tipo == TipoIndice.BRUTO:
+            self.indice = None
+            return
+        
+        inicio = time.time()
+        if tipo == TipoIndice.IVF:
+            if n_listas is None:
+                n_listas = int(4 * np.sqrt(len(self.X_treino)))
+            dados, escala = self._dados_ivf()
+            self.indice = IndiceIVF(dados, n_listas=n_listas, n_probe=n_probe,
+                                    p=self._ordem_minkowski(), escala=escala)
+            self._log(f"🗂️  Índice ivf construído: {self.indice.n_listas} listas, "
+                  f"n_probe={n_probe} ({time.time() - inicio:.2f}s)")
+            return
+        
+        classe_arvore = KDTree if tipo == TipoIndice.KD_TREE else BallTree
+        self.indice = classe_arvore(self._dados_indice(), tamanho_folha=tamanho_folha,
+                                    p=self._ordem_minkowski())
+        
+        self._log(f"🌳 Índice {tipo.value} construído: {self.indice.n_nos} nós, "
+              f"folhas de até {tamanho_folha} pontos, cópia float de "
+              f"{self.memoria_indice_mb():.1f} MB ({time.time() - inicio:.2f}s)")
+    
+    def _dados_indice(self) -> np.ndarray:
+        """
+        Dados sobre os quais as árvores (e o IVF com cosseno) operam.
+        
+        São os dados de treino decodificados na normalização atual (sem
+        cópia para FLOAT64 sem transformação incremental; as árvores copiam
+        na ordem das folhas) e, para cosseno, os vetores unitários.
+        """
+        dados = self._decodificar(self.X_treino)
+        if self.metrica == MetricaDistancia.COSENO:
+            dados = dados / np.linalg.norm(dados, axis=1, keepdims=True)
+        return dados
+    
+    def _dados_ivf(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (dados, escala por dimensão) sobre os quais o IVF opera.
+        
+        Fora do cosseno são as próprias linhas armazenadas (ex.: códigos
+        int8), ponderadas pela escala de `_mapa_linhas`; novas linhas do
+        treino incremental entram nas listas sem reconstruir o índice.
+        """
+        if self.metrica == MetricaDistancia.COSENO:
+            return self._dados_indice(), None
+        return self.X_treino, self._mapa_linhas()[0]
+    
+    def _garantir_indice(self):
+        """Reconstrói o índice marcado como desatualizado pelo treino incremental."""
+        if self._indice_desatualizado:
+            self._construir_indice(self.tipo_indice, *self._parametros_indice)
+    
+    def _atualizar_indice(self):
+        """
+        Leva o índice às linhas acrescentadas pelo treino incremental.
+        
+        O IVF sobre linhas armazenadas recebe as novas linhas nas listas
+        existentes (centroides fixos) e a escala atual das distâncias.
+        Árvores e IVF com cosseno dependem de uma cópia normalizada e são
+        apenas marcados como desatualizados: a reconstrução acontece na
+        próxima consulta, uma vez para vários lotes seguidos.
+        """
+        if self.indice is None:
+            return
+        if isinstance(self.indice, IndiceIVF) and self.metrica != MetricaDistancia.COSENO:
+            self.indice.escala = self._mapa_linhas()[0]
+            self.indice.adicionar(self.X_treino)
+        else:
+            self._indice_desatualizado = True
+    
+    def _k_vizinhos(self, X_norm: np.ndarray, n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Encontra os k vizinhos de um lote de pontos já normalizados.
+        
+        Com n_jobs > 1 o lote é dividido entre threads. Todas compartilham
+        o mesmo X_treino (nenhuma cópia por trabalhador) e o NumPy libera o
+        GIL durante BLAS/ufuncs/partições, então a força bruta escala com
+        os núcleos; a busca em árvores/IVF é limitada pelo GIL.
+        
+        Args:
+            X_norm: Pontos normalizados (m, d)
+            n_jobs: Número de threads (-1 = todos os núcleos)
+            
+        Returns:
+            (distâncias, índices), ambos (m, k), ordenados por distância
+        """
+        self._garantir_normas()
+        self._garantir_indice()
+        n_jobs = self._resolver_n_jobs(n_jobs, len(X_norm))
+        if n_jobs > 1:
+            partes = np.array_split(X_norm, n_jobs)
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                resultados = list(executor.map(lambda parte: self._k_vizinhos_lote(parte, n_jobs), partes))
+            return (np.concatenate([d for d, _ in resultados]),
+                    np.concatenate([i for _, i in resultados]))
+        
+        return self._k_vizinhos_lote(X_norm)
+    
+    def _chave_cache(self, linha: np.ndarray) -> Tuple:
+        """Chave do cache: hash dos bytes da consulta normalizada + parâmetros da busca."""
+        resumo = hashlib.blake2b(np.ascontiguousarray(linha).tobytes(), digest_size=16).digest()
+        return resumo, self.k, getattr(self.indice, 'n_probe', None)
+    
+    def _k_vizinhos_com_cache(self, X_norm: np.ndarray, n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca de vizinhos consultando antes o cache LRU.
+        
+        Consultas repetidas (dentro do lote ou entre chamadas) não
+        recalculam distâncias; apenas as ausentes do cache vão para
+        `_k_vizinhos`, em um único sub-lote.
+        
+        Args:
+            X_norm: Pontos normalizados (m, d)
+            n_jobs: Número de threads para as consultas ausentes do cache
+            
+        Returns:
+            (distâncias, índices), ambos (m, k), ordenados por distância
+        """
+        if self.tamanho_cache <= 0:
+            return self._k_vizinhos(X_norm, n_jobs)
+        
+        m, k = len(X_norm), min(self.k, len(self.X_treino))
+        distancias = np.empty((m, k))
+        indices = np.empty((m, k), dtype=np.int64)
+        
+        # Linhas ausentes do cache, agrupadas por chave (repetições calculadas uma vez)
+        pendentes = {}
+        for linha, x in enumerate(X_norm):
+            chave = self._chave_cache(x)
+            if chave in self._cache:
+                self._cache.move_to_end(chave)
+                distancias[linha], indices[linha] = self._cache[chave]
+                self._acertos_cache += 1
+            elif chave in pendentes:
+                # Repetição dentro do lote: reutiliza a busca já agendada
+                pendentes[chave].append(linha)
+                self._acertos_cache += 1
+            else:
+                pendentes[chave] = [linha]
+                self._falhas_cache += 1
+        
+        if pendentes:
+            primeiras = [linhas[0] for linhas in pendentes.values()]
+            novas_d, novos_i = self._k_vizinhos(X_norm[primeiras], n_jobs)
+            for (chave, linhas), d, i in zip(pendentes.items(), novas_d, novos_i):
+                distancias[linhas] = d
+                indices[linhas] = i
+                self._cache[chave] = (d.copy(), i.copy())
+                if len(self._cache) > self.tamanho_cache:
+                    self._cache.popitem(last=False)
+        
+        return distancias, indices
+    
+    def limpar_cache(self):
+        """Esvazia o cache de consultas (chamado sempre que os dados de treino mudam)."""
+        self._cache.clear()
+    
+    def estatisticas_cache(self) -> Dict:
+        """
+        Métricas do cache de consultas.
+        
+        Returns:
+            Dicionário com acertos, falhas, taxa de acerto, tamanho atual e capacidade
+        """
+        total = self._acertos_cache + self._falhas_cache
+        return {
+            'acertos': self._acertos_cache,
+            'falhas': self._falhas_cache,
+            'taxa_acerto': self._acertos_cache / total if total else 0.0,
+            'tamanho': len(self._cache),
+            'capacidade': self.tamanho_cache,
+        }
+    
+    @staticmethod
+    def _resolver_n_jobs(n_jobs: int, n_consultas: int) -> int:
+        """Converte n_jobs (-1 = todos os núcleos) no número efetivo de trabalhadores."""
+        if n_jobs is None or n_jobs == 0:
+            n_jobs = 1
+        elif n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
+        return max(1, min(n_jobs, n_consultas))
+    
+    def _k_vizinhos_lote(self, X_norm: np.ndarray, n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Busca dos k vizinhos de um lote em um único trabalhador."""
+        if self.indice is None:
+            # Força bruta em blocos (memória limitada)
+            return self._k_vizinhos_em_blocos(X_norm, self.k, n_jobs)
+        
+        consultas = X_norm
+        if self.metrica == MetricaDistancia.COSENO:
+            consultas = X_norm / np.linalg.norm(X_norm, axis=1, keepdims=True)
+        elif self.tipo_indice == TipoIndice.IVF:
+            # IVF sobre as linhas armazenadas: consulta levada ao espaço delas
+            escala, deslocamento = self._mapa_linhas()
+            if deslocamento is not None:
+                consultas = consultas - deslocamento
+            if escala is not None:
+                consultas = consultas / escala
+        
+        if self.tipo_indice == TipoIndice.IVF:
+            resultados = [self.indice.consultar(x, self.k) for x in consultas]
+            distancias = np.array([d for d, _ in resultados]).reshape(len(X_norm), -1)
+            indices = np.array([i for _, i in resultados], dtype=np.int64).reshape(len(X_norm), -1)
+        else:
+            # Árvores percorrem o lote inteiro de uma vez
+            distancias, indices = self.indice.consultar_lote(consultas, self.k)
+        
+        if self.metrica == MetricaDistancia.COSENO:
+            distancias = distancias ** 2 / 2
+        return distancias, indices
+    
+    def _pesos_vizinhos(self, distancias: np.ndarray) -> np.ndarray:
+        """
+        Peso de cada vizinho a partir da matriz de distâncias.
+        
+        Com pesos 1/d, vizinhos a distância zero recebem todo o peso
+        da linha (os demais ficam com zero).
+        
+        Args:
+            distancias: Distâncias dos vizinhos (m, k)
+            
+        Returns:
+            Matriz (m, k) de pesos
+        """
+        if self.pesos == TipoPeso.UNIFORME:
+            return np.ones_like(distancias, dtype=np.float64)
+        
+        if self.pesos == TipoPeso.GAUSSIANO:
+            return np.exp(-distancias ** 2 / (2 * self.largura_kernel ** 2))
+        
+        zeros = distancias == 0
+        with np.errstate(divide='ignore'):
+            pesos = 1 / distancias
+        linhas_exatas = zeros.any(axis=1)
+        pesos[linhas_exatas] = zeros[linhas_exatas]
+        return pesos
+    
+    def _votar(self, indices: np.ndarray, distancias: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Votação vetorizada (majoritária ou ponderada) sobre a matriz de vizinhos.
+        
+        Empates são resolvidos a favor da classe que aparece primeiro entre
+        os vizinhos ordenados por distância (mesmo critério de Counter.most_common).
+        
+        Args:
+            indices: Índices dos vizinhos (m, k), ordenados por distância
+            distancias: Distâncias dos vizinhos (m, k); obrigatórias com pesos
+                não uniformes
+            
+        Returns:
+            (códigos das classes previstas (m,), confiança (m,))
+        """
+        m, k = indices.shape
+        n_classes = len(self.classes_unicas)
+        codigos = self._y_codificado[indices]
+        linhas = np.arange(m)
+        
+        if self.pesos == TipoPeso.UNIFORME:
+            pesos = np.ones((m, k))
+        else:
+            pesos = self._pesos_vizinhos(distancias)
+        
+        # Votos por classe via bincount ponderado sobre (linha, classe) achatados
+        achatados = (linhas[:, np.newaxis] * n_classes + codigos).ravel()
+        votos = np.bincount(achatados, weights=pesos.ravel(),
+                            minlength=m * n_classes).reshape(m, n_classes)
+        
+        # Posição do vizinho mais próximo de cada classe (k = ausente)
+        primeira_posicao = np.full((m, n_classes), k)
+        for posicao in range(k - 1, -1, -1):
+            primeira_posicao[linhas, codigos[:, posicao]] = posicao
+        
+        # Entre as classes com mais votos, a de vizinho mais próximo
+        empatadas = votos == votos.max(axis=1, keepdims=True)
+        previstos = np.argmin(np.where(empatadas, primeira_posicao, k + 1), axis=1)
+        
+        total = pesos.sum(axis=1)
+        confianca = np.divide(votos[linhas, previstos], total,
+                              out=np.zeros(m), where=total > 0)
+        return previstos, confianca
+    
+    def _agregar(self, indices: np.ndarray, distancias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Combina os vizinhos de cada ponto na predição final.
+        
+        Returns:
+            (classes previstas (m,), confiança (m,))
+        """
+        previstos, confianca = self._votar(indices, distancias)
+        return self.classes_unicas[previstos], confianca
+    
+    def _predizer_lote(self, X: Union[np.ndarray, List],
+                       n_jobs: int = 1) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Predição vetorizada de um lote inteiro.
+        
+        Args:
+            X: Pontos a classificar
+            n_jobs: Número de threads para a busca de vizinhos
+            
+        Returns:
+            (previsões, confiança, distâncias dos vizinhos, índices dos vizinhos)
+        """
+        X = np.array(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        
+        # Normaliza o lote inteiro de uma vez
+        X_norm = self._normalizar_dados(X, fit=False)
+        
+        distancias, indices = self._k_vizinhos_com_cache(X_norm, n_jobs)
+        previstos, confianca = self._agregar(indices, distancias)
+        return previstos, confianca, distancias, indices
+    
+    def treinar(self, X: np.ndarray, y: np.ndarray,
+                indice: TipoIndice = TipoIndice.BRUTO,
+                tamanho_folha: int = 40,
+                n_listas: int = None,
+                n_probe: int = 8):
         """
         Treina o modelo KNN (armazena dados normalizados).
         
         Args:
             X: Características dos dados de treino
             y: Classes dos dados de treino
+            indice: Estrutura de busca (força bruta, KD-Tree, Ball-Tree,
+                IVF aproximado ou AUTO: KD-Tree em baixa dimensão com treino
+                grande, força bruta nos demais casos)
+            tamanho_folha: Pontos por folha do índice espacial
+            n_listas: Número de listas do índice IVF (padrão: 4·√n)
+            n_probe: Listas examinadas por consulta no índice IVF
         """
-        print(f"📚 Treinando com {len(X)} exemplos, {X.shape[1]} características")
+        self._log(f"📚 Treinando com {len(X)} exemplos, {X.shape[1]} características")
         
         # Converte para NumPy se necessário
         X = np.array(X)
         y = np.array(y)
         
-        # Normaliza os dados
-        self.X_treino = self._normalizar_dados(X, fit=True)
-        self.y_treino = y
-        self.classes_unicas = np.unique(y)
+        # Normaliza os dados e converte para o formato de armazenamento
+        self.limpar_cache()
+        self._transformacao = None
+        self._buffer_X = self._armazenar(self._normalizar_dados(X, fit=True))
+        self._registrar_rotulos(y)
+        self._definir_tamanho(len(X))
+        self._atualizar_normas_treino()
+        
+        if self.normalizar:
+            self._log(f"🔧 Dados normalizados (média≈0, std≈1)")
+        
+        self._parametros_indice = (tamanho_folha, n_listas, n_probe)
+        self._construir_indice(indice, tamanho_folha, n_listas, n_probe)
+    
+    def _registrar_rotulos(self, y: np.ndarray):
+        """Guarda os rótulos de treino e os codifica como índices em classes_unicas."""
+        self._buffer_y = y
+        self.classes_unicas, self._buffer_codigos = np.unique(y, return_inverse=True)
         
         # Estatísticas dos dados
         contador_classes = Counter(y)
-        print(f"📊 Classes encontradas: {list(self.classes_unicas)}")
-        print(f"📈 Distribuição: {dict(contador_classes)}")
+        self._log(f"📊 Classes encontradas: {list(self.classes_unicas)}")
+        self._log(f"📈 Distribuição: {dict(contador_classes)}")
+    
+    def _acrescentar_rotulos(self, y: np.ndarray, n_antigo: int, n_total: int):
+        """Escreve novos rótulos nos buffers (já com capacidade para n_total)."""
+        # Classes novas: recodifica os códigos antigos para a nova ordenação
+        classes = np.union1d(self.classes_unicas, y)
+        if len(classes) != len(self.classes_unicas):
+            mapa = np.searchsorted(classes, self.classes_unicas)
+            self._buffer_codigos[:n_antigo] = mapa[self._buffer_codigos[:n_antigo]]
+            self.classes_unicas = classes
+        
+        self._buffer_y[n_antigo:n_total] = y
+        self._buffer_codigos[n_antigo:n_total] = np.searchsorted(self.classes_unicas, y)
+    
+    def _definir_tamanho(self, n: int):
+        """Expõe as n primeiras linhas dos buffers como dados de treino (views, sem cópia)."""
+        self._n_treino = n
+        self.X_treino = self._buffer_X[:n]
+        self.y_treino = self._buffer_y[:n]
+        if self._buffer_codigos is not None:
+            self._y_codificado = self._buffer_codigos[:n]
+    
+    def _garantir_capacidade(self, n_total: int):
+        """Realoca os buffers com folga (dobrando) quando não cabem n_total linhas."""
+        capacidade = len(self._buffer_X)
+        if n_total <= capacidade:
+            return
         
+        nova_capacidade = max(n_total, 2 * capacidade)
+        n = self._n_treino
+        for nome in ('_buffer_X', '_buffer_y', '_buffer_codigos'):
+            antigo = getattr(self, nome)
+            if antigo is None:
+                continue
+            novo = np.empty((nova_capacidade,) + antigo.shape[1:], dtype=antigo.dtype)
+            novo[:n] = antigo[:n]
+            setattr(self, nome, novo)
+    
+    def treinar_incremental(self, X: np.ndarray, y: np.ndarray):
+        """
+        Acrescenta novos exemplos sem reprocessar os já treinados.
+        
+        - Os dados vão para buffers pré-alocados que dobram de capacidade
+          (custo amortizado O(1) por linha)
+        - Média e variância são atualizadas pela fórmula paralela de
+          Chan (generalização de Welford para lotes)
+        - As linhas antigas não são renormalizadas: a transformação afim
+          por dimensão é aplicada às consultas (ver `_mapa_linhas`), e as
+          normas ponderadas são refeitas na próxima predição
+        - O IVF recebe as novas linhas nas listas existentes; árvores são
+          reconstruídas na próxima consulta
+        
+        Se o modelo ainda não foi treinado, equivale a `treinar`. Lotes
+        vazios são ignorados.
+        
+        Args:
+            X: Características dos novos exemplos
+            y: Classes dos novos exemplos
+        """
+        X = np.array(X)
+        y = np.array(y)
+        if len(X) == 0:
+            return
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        
+        if self.X_treino is None:
+            self.treinar(X, y)
+            return
+        
+        n_antigo, n_novo = self._n_treino, len(X)
+        n_total = n_antigo + n_novo
+        
+        # Novas linhas usam as estatísticas de referência, como as antigas
+        X_armazenado = X
         if self.normalizar:
-            print(f"🔧 Dados normalizados (média≈0, std≈1)")
+            X_armazenado = (X - self._media_referencia) / self._std_referencia
+        X_armazenado = self._armazenar(X_armazenado, ajustar=False)
+        
+        # Rótulos mais largos (ex.: strings maiores) promovem o tipo do buffer
+        tipo_y = np.promote_types(self._buffer_y.dtype, y.dtype)
+        if tipo_y != self._buffer_y.dtype:
+            self._buffer_y = self._buffer_y.astype(tipo_y)
+        
+        self._garantir_capacidade(n_total)
+        self._buffer_X[n_antigo:n_total] = X_armazenado
+        self._acrescentar_rotulos(y, n_antigo, n_total)
+        self._definir_tamanho(n_total)
+        
+        if self.normalizar:
+            # Chan et al.: combina (n_a, μ_a, M2_a) com (n_b, μ_b, M2_b)
+            media_lote = np.mean(X, axis=0)
+            delta = media_lote - self.media_treino
+            self.media_treino = self.media_treino + delta * n_novo / n_total
+            self._m2_treino = (self._m2_treino + np.var(X, axis=0) * n_novo
+                               + delta ** 2 * n_antigo * n_novo / n_total)
+            self._atualizar_std(n_total)
+            self._atualizar_transformacao()
+        
+        self._normas_desatualizadas = True
+        self.limpar_cache()
+        self._log(f"➕ {n_novo} exemplos adicionados ({n_total} no total)")
+        self._atualizar_indice()
     
-    def _predizer_ponto(self, x: np.ndarray) -> ResultadoClassificacao:
+    # Nome usual em outras bibliotecas
+    partial_fit = treinar_incremental
+    
+    # Arrays gravados por salvar (None quando não se aplicam, ex.: sem normalização)
+    ARRAYS_MODELO = ('X_treino', 'y_treino', '_y_codificado', 'classes_unicas',
+                     'media_treino', 'std_treino', '_m2_treino',
+                     '_media_referencia', '_std_referencia',
+                     '_escala_quantizacao', '_normas_treino')
+    
+    def salvar(self, caminho: str):
         """
-        Prediz a classe para um único ponto.
+        Salva o modelo treinado em um diretório de arquivos .npy.
+        
+        Cada array (dados armazenados, classes, estatísticas de
+        normalização, normas pré-calculadas e arrays do índice) vai para
+        o seu próprio .npy, e os parâmetros para um JSON. Arquivos .npy
+        separados (e não um .npz) permitem carregar com mmap.
         
         Args:
-            x: Ponto a classificar
+            caminho: Diretório de destino (criado se não existir)
+        """
+        if self.X_treino is None:
+            raise ValueError("Modelo não treinado")
+        
+        self._garantir_normas()
+        self._garantir_indice()
+        os.makedirs(caminho, exist_ok=True)
+        
+        arrays = {nome: getattr(self, nome) for nome in self.ARRAYS_MODELO}
+        if self.indice is not None:
+            for campo, valores in self.indice.para_arrays().items():
+                arrays[f"indice_{campo}"] = valores
+        
+        salvos = []
+        for nome, valores in arrays.items():
+            if valores is None:
+                continue
+            np.save(os.path.join(caminho, f"{nome}.npy"), np.ascontiguousarray(valores),
+                    allow_pickle=False)
+            salvos.append(nome)
+        
+        tamanho_folha, n_listas, n_probe = self._parametros_indice
+        metadados = {
+            'versao': VERSAO_FORMATO,
+            'k': self.k,
+            'metrica': self.metrica.value,
+            'normalizar': self.normalizar,
+            'p': self.p,
+            'memoria_max_mb': self.memoria_max_mb,
+            'armazenamento': self.armazenamento.value,
+            'pesos': self.pesos.value,
+            'largura_kernel': self.largura_kernel,
+            'tamanho_cache': self.tamanho_cache,
+            'tipo_indice': self.tipo_indice.value,
+            'tamanho_folha': tamanho_folha,
+            'n_listas': n_listas,
+            'n_probe': getattr(self.indice, 'n_probe', n_probe),
+            'arrays': salvos,
+        }
+        with open(os.path.join(caminho, ARQUIVO_METADADOS), 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo, indent=2)
+        
+        self._log(f"💾 Modelo salvo em {caminho} ({len(salvos)} arrays)")
+    
+    @classmethod
+    def carregar(cls, caminho: str, mmap: bool = True, verbose: bool = True) -> 'KNNOtimizado':
+        """
+        Carrega um modelo gravado por `salvar`, sem retreinar nem reconstruir índices.
+        
+        Com mmap=True os arrays são mapeados em memória somente leitura
+        (`np.load(mmap_mode='r')`): a carga é quase instantânea e vários
+        processos que carregam o mesmo diretório compartilham as páginas
+        do cache do sistema operacional. Treino incremental sobre um
+        modelo mapeado copia os dados para buffers próprios.
+        
+        Args:
+            caminho: Diretório gravado por salvar
+            mmap: Se deve mapear os arrays em vez de lê-los para a memória
+            verbose: Se deve imprimir mensagens do modelo carregado
             
         Returns:
-            Resultado da classificação com métricas
+            Modelo pronto para predição
         """
-        inicio = time.time()
+        with open(os.path.join(caminho, ARQUIVO_METADADOS), encoding='utf-8') as arquivo:
+            metadados = json.load(arquivo)
+        if metadados['versao'] != VERSAO_FORMATO:
+            raise ValueError(f"Versão de formato não suportada: {metadados['versao']}")
         
-        # Normaliza o ponto de consulta
-        x_norm = self._normalizar_dados(x.reshape(1, -1), fit=False).flatten()
+        modelo = cls(k=metadados['k'],
+                     metrica=MetricaDistancia(metadados['metrica']),
+                     normalizar=metadados['normalizar'],
+                     p=metadados['p'],
+                     memoria_max_mb=metadados['memoria_max_mb'],
+                     armazenamento=TipoArmazenamento(metadados['armazenamento']),
+                     pesos=TipoPeso(metadados.get('pesos', TipoPeso.UNIFORME.value)),
+                     largura_kernel=metadados.get('largura_kernel', 1.0),
+                     tamanho_cache=metadados.get('tamanho_cache', 0),
+                     verbose=verbose)
         
-        # Calcula distâncias para todos os pontos de treino
-        distancias = self._calcular_distancias(
-            x_norm.reshape(1, -1), 
-            self.X_treino
-        ).flatten()
+        modo = 'r' if mmap else None
+        arrays = {nome: np.load(os.path.join(caminho, f"{nome}.npy"), mmap_mode=modo, allow_pickle=False)
+                  for nome in metadados['arrays']}
         
-        # Encontra os k vizinhos mais próximos
-        indices_vizinhos = np.argpartition(distancias, self.k)[:self.k]
+        for nome in cls.ARRAYS_MODELO:
+            if nome in arrays:
+                setattr(modelo, nome, arrays[nome])
         
-        # Ordena os k vizinhos por distância
-        indices_ordenados = indices_vizinhos[np.argsort(distancias[indices_vizinhos])]
+        modelo._buffer_X = modelo.X_treino
+        modelo._buffer_y = modelo.y_treino
+        modelo._buffer_codigos = modelo._y_codificado
+        modelo._definir_tamanho(len(modelo.X_treino))
+        if modelo.normalizar:
+            modelo._atualizar_transformacao()
         
-        distancias_vizinhos = distancias[indices_ordenados]
-        classes_vizinhos = self.y_treino[indices_ordenados]
+        modelo.tipo_indice = TipoIndice(metadados['tipo_indice'])
+        modelo._parametros_indice = (metadados['tamanho_folha'], metadados['n_listas'], metadados['n_probe'])
+        if modelo.tipo_indice != TipoIndice.BRUTO:
+            arrays_indice = {nome[len('indice_'):]: valores for nome, valores in arrays.items()
+                             if nome.startswith('indice_')}
+            if modelo.tipo_indice == TipoIndice.IVF:
+                dados, escala = modelo._dados_ivf()
+                modelo.indice = IndiceIVF.de_arrays(dados, arrays_indice, metadados['n_probe'],
+                                                    modelo._ordem_minkowski(), escala)
+            else:
+                classe_arvore = KDTree if modelo.tipo_indice == TipoIndice.KD_TREE else BallTree
+                modelo.indice = classe_arvore.de_arrays(modelo._dados_indice(), arrays_indice,
+                                                        metadados['tamanho_folha'], modelo._ordem_minkowski())
         
-        # Vota na classe mais frequente
-        contador_classes = Counter(classes_vizinhos)
-        classe_prevista = contador_classes.most_common(1)[0][0]
-        confianca = contador_classes[classe_prevista] / self.k
-        
-        tempo_predicao = time.time() - inicio
+        modelo._log(f"📂 Modelo carregado de {caminho}: {modelo._n_treino} exemplos, "
+                    f"índice {modelo.tipo_indice.value}{' (mmap)' if mmap else ''}")
+        return modelo
+    
+    def _predizer_ponto(self, x: np.ndarray) -> ResultadoClassificacao:
+        """
+        Prediz a classe para um único ponto.
         
-        return ResultadoClassificacao(
-            classe_prevista=classe_prevista,
-            confianca=confianca,
-            distancias_vizinhos=distancias_vizinhos.tolist(),
-            classes_vizinhos=classes_vizinhos.tolist(),
-            tempo_predicao=tempo_predicao
-        )
+        Args:
+            x: Ponto a classificar
+            
+        Returns:
+            Resultado da classificação com métricas
+        """
+        return self.predizer_com_metricas(x.reshape(1, -1))[0]
     
-    def predizer(self, X: Union[np.ndarray, List]) -> List[Any]:
+    def predizer(self, X: Union[np.ndarray, List], n_jobs: int = 1) -> List[Any]:
         """
         Prediz classes para múltiplos pontos.
         
         Args:
             X: Pontos a classificar
+            n_jobs: Número de threads (-1 = todos os núcleos)
             
         Returns:
             Lista de classes previstas
         """
-        X = np.array(X)
-        if X.ndim == 1:
-            X = X.reshape(1, -1)
-        
-        predicoes = []
-        for x in X:
-            resultado = self._predizer_ponto(x)
-            predicoes.append(resultado.classe_prevista)
-        
-        return predicoes
+        previstos, _, _, _ = self._predizer_lote(X, n_jobs)
+        return list(previstos)
     
-    def predizer_com_metricas(self, X: Union[np.ndarray, List]) -> List[ResultadoClassificacao]:
+    def predizer_com_metricas(self, X: Union[np.ndarray, List],
+                              n_jobs: int = 1) -> List[ResultadoClassificacao]:
         """
         Prediz com métricas detalhadas para cada ponto.
         
+        O lote é processado de uma vez; o tempo de predição de cada
+        resultado é o tempo do lote dividido pelo número de pontos.
+        
         Args:
             X: Pontos a classificar
+            n_jobs: Número de threads (-1 = todos os núcleos)
             
         Returns:
             Lista de resultados detalhados
         """
-        X = np.array(X)
-        if X.ndim == 1:
-            X = X.reshape(1, -1)
+        inicio = time.time()
+        previstos, confianca, distancias, indices = self._predizer_lote(X, n_jobs)
+        tempo_medio = (time.time() - inicio) / max(1, len(previstos))
+        
+        classes_vizinhos = self.y_treino[indices]
         
-        resultados = []
-        for x in X:
-            resultado = self._predizer_ponto(x)
-            resultados.append(resultado)
+        return [
+            ResultadoClassificacao(
+                classe_prevista=previstos[i],
+                confianca=float(confianca[i]),
+                distancias_vizinhos=distancias[i].tolist(),
+                classes_vizinhos=classes_vizinhos[i].tolist(),
+                tempo_predicao=tempo_medio
+            )
+            for i in range(len(previstos))
+        ]
+    
+    def avaliar_recall(self, X_consulta: np.ndarray,
+                       n_probes: List[int] = (1, 2, 4, 8, 16, 32)) -> Dict:
+        """
+        Mede recall@k e latência do índice aproximado contra a força bruta exata.
+        
+        recall@k = fração dos k vizinhos exatos que o índice encontrou.
+        Para o índice IVF, cada valor de n_probe é avaliado; o n_probe
+        original é restaurado no final.
+        
+        Args:
+            X_consulta: Consultas de avaliação (não normalizadas)
+            n_probes: Valores de n_probe a testar (apenas IVF)
+            
+        Returns:
+            Dicionário {n_probe: {'recall': float, 'tempo_medio_ms': float}}
+            (chave None para índices sem n_probe)
+        """
+        X_norm = self._normalizar_dados(np.array(X_consulta), fit=False)
+        self._garantir_normas()
+        self._garantir_indice()
+        
+        inicio = time.time()
+        _, exatos = self._k_vizinhos_em_blocos(X_norm, self.k)
+        tempo_exato = (time.time() - inicio) / len(X_norm) * 1000
+        print(f"🎯 Recall@{self.k} em {len(X_norm)} consultas "
+              f"(força bruta: {tempo_exato:.3f} ms/consulta)")
+        
+        if self.indice is None:
+            return {None: {'recall': 1.0, 'tempo_medio_ms': tempo_exato}}
+        
+        n_probe_original = getattr(self.indice, 'n_probe', None)
+        configuracoes = n_probes if n_probe_original is not None else [None]
+        
+        resultados = {}
+        for n_probe in configuracoes:
+            if n_probe is not None:
+                self.indice.n_probe = n_probe
+            
+            inicio = time.time()
+            _, aproximados = self._k_vizinhos(X_norm)
+            tempo_medio = (time.time() - inicio) / len(X_norm) * 1000
+            
+            acertos = sum(len(np.intersect1d(a, e)) for a, e in zip(aproximados, exatos))
+            recall = acertos / exatos.size
+            resultados[n_probe] = {'recall': recall, 'tempo_medio_ms': tempo_medio}
+            
+            rotulo = f"n_probe={n_probe:3d}" if n_probe is not None else self.tipo_indice.value
+            print(f"   {rotulo}: recall={recall:.3f}, {tempo_medio:.3f} ms/consulta")
+        
+        if n_probe_original is not None:
+            self.indice.n_probe = n_probe_original
         
         return resultados
     
+    def memoria_treino_mb(self) -> float:
+        """Memória ocupada pelos dados de treino armazenados, em MB."""
+        return self.X_treino.nbytes / (1024 * 1024)
+    
+    def memoria_indice_mb(self) -> float:
+        """
+        Memória da cópia em ponto flutuante mantida pelo índice, em MB.
+        
+        Zero para força bruta e para o IVF sobre as linhas armazenadas.
+        Árvores guardam sempre uma cópia decodificada na ordem das folhas;
+        o IVF com cosseno guarda os vetores unitários.
+        """
+        dados = getattr(self.indice, 'dados', None)
+        if dados is None or np.may_share_memory(dados, self.X_treino):
+            return 0.0
+        return dados.nbytes / (1024 * 1024)
+    
+    def _copiar_configuracao(self, **alteracoes) -> 'KNNOtimizado':
+        """Modelo vazio da mesma classe e configuração deste (silencioso), com alterações."""
+        config = dict(k=self.k, metrica=self.metrica, normalizar=self.normalizar,
+                      p=self.p, memoria_max_mb=self.memoria_max_mb,
+                      armazenamento=self.armazenamento, pesos=self.pesos,
+                      largura_kernel=self.largura_kernel, verbose=False)
+        config.update(alteracoes)
+        return type(self)(**config)
+    
+    def _medir_armazenamento(self, X_treino: np.ndarray, y_treino: np.ndarray,
+                             X_teste: np.ndarray, tipos: List[TipoArmazenamento]) -> Dict:
+        """
+        Treina um modelo por formato e mede predições, memória, tempo e
+        recall dos vizinhos contra o FLOAT64 (sempre medido primeiro).
+        
+        Returns:
+            Dicionário {formato: {'previstos', 'memoria_mb', 'tempo_medio_ms',
+            'recall_vizinhos'}}
+        """
+        medidas = {}
+        for tipo in [TipoArmazenamento.FLOAT64] + [t for t in tipos if t != TipoArmazenamento.FLOAT64]:
+            modelo = self._copiar_configuracao(armazenamento=tipo)
+            modelo.treinar(X_treino, y_treino)
+            
+            inicio = time.time()
+            previstos, _, _, indices = modelo._predizer_lote(X_teste)
+            tempo_medio = (time.time() - inicio) / len(indices) * 1000
+            
+            medidas[tipo] = {
+                'previstos': previstos,
+                'indices': indices,
+                'memoria_mb': modelo.memoria_treino_mb(),
+                'tempo_medio_ms': tempo_medio,
+            }
+        
+        referencia = medidas[TipoArmazenamento.FLOAT64]['indices']
+        for medida in medidas.values():
+            acertos = sum(len(np.intersect1d(a, e)) for a, e in zip(medida.pop('indices'), referencia))
+            medida['recall_vizinhos'] = acertos / referencia.size
+        return medidas
+    
+    def comparar_armazenamento(self, X_treino: np.ndarray, y_treino: np.ndarray,
+                               X_teste: np.ndarray, y_teste: np.ndarray,
+                               tipos: List[TipoArmazenamento] = tuple(TipoArmazenamento)) -> Dict:
+        """
+        Compara cada formato de armazenamento contra a precisão completa (FLOAT64).
+        
+        Para cada formato treina um modelo com a mesma configuração deste
+        e mede acurácia, memória dos dados de treino, concordância das
+        predições e recall dos vizinhos em relação ao modelo FLOAT64.
+        
+        Args:
+            X_treino: Dados de treino
+            y_treino: Classes de treino
+            X_teste: Dados de teste
+            y_teste: Classes verdadeiras do teste
+            tipos: Formatos a comparar
+            
+        Returns:
+            Dicionário {formato: {'acuracia', 'memoria_mb', 'reducao_memoria',
+            'concordancia', 'recall_vizinhos', 'tempo_medio_ms'}}
+        """
+        y_teste = np.array(y_teste)
+        medidas = self._medir_armazenamento(X_treino, y_treino, X_teste, tipos)
+        
+        referencia = medidas[TipoArmazenamento.FLOAT64]
+        print(f"\n💾 Comparação de armazenamento (referência: float64)")
+        
+        relatorio = {}
+        for tipo, medida in medidas.items():
+            relatorio[tipo.value] = {
+                'acuracia': float(np.mean(medida['previstos'] == y_teste)),
+                'memoria_mb': medida['memoria_mb'],
+                'reducao_memoria': referencia['memoria_mb'] / medida['memoria_mb'],
+                'concordancia': float(np.mean(medida['previstos'] == referencia['previstos'])),
+                'recall_vizinhos': medida['recall_vizinhos'],
+                'tempo_medio_ms': medida['tempo_medio_ms'],
+            }
+            r = relatorio[tipo.value]
+            print(f"   {tipo.value:8s}: acurácia={r['acuracia']:.3f}, "
+                  f"memória={r['memoria_mb']:.2f} MB ({r['reducao_memoria']:.0f}x menor), "
+                  f"concordância={r['concordancia']:.3f}, recall vizinhos={r['recall_vizinhos']:.3f}, "
+                  f"{r['tempo_medio_ms']:.3f} ms/consulta")
+        
+        return relatorio
+    
     def validacao_cruzada(self, X: np.ndarray, y: np.ndarray, 
                          k_folds: int = 5, 
-                         k_range: range = range(1, 16)) -> Dict:
+                         k_range: range = range(1, 16),
+                         n_jobs: int = 1) -> Dict:
         """
         Realiza validação cruzada para encontrar o melhor k.
         
+        Cada fold é treinado e consultado uma única vez: os vizinhos de
+        cada ponto de teste são ordenados até max(k_range) e cada k é
+        avaliado votando sobre o prefixo dessa ordenação. O custo é uma
+        predição por fold, e não uma por combinação (k, fold).
+        
         Args:
             X: Dados de entrada
             y: Classes verdadeiras
             k_folds: Número de folds para validação cruzada
             k_range: Range de valores k para testar
+            n_jobs: Número de folds processados em paralelo (-1 = todos os núcleos)
             
         Returns:
             Dicionário com resultados da validação
         """
         print(f"🔍 Validação cruzada: testando k de {min(k_range)} a {max(k_range)}")
         
-        X = np.array(X)
-        y = np.array(y)
-        n_amostras = len(X)
-        
-        # Mistura os dados
-        indices = np.random.permutation(n_amostras)
-        X_shuffled = X[indices]
-        y_shuffled = y[indices]
-        
+        acuracias_por_fold = self._pontuacoes_por_fold(X, y, k_folds, k_range, n_jobs)
         resultados = {}
         
         for k in k_range:
-            acuracias_fold = []
-            
-            # Divide em k_folds
-            fold_size = n_amostras // k_folds
-            
-            for fold in range(k_folds):
-                # Define indices de teste
-                inicio_teste = fold * fold_size
-                fim_teste = (fold + 1) * fold_size if fold < k_folds - 1 else n_amostras
-                
-                # Separa treino e teste
-                X_teste_fold = X_shuffled[inicio_teste:fim_teste]
-                y_teste_fold = y_shuffled[inicio_teste:fim_teste]
-                
-                X_treino_fold = np.concatenate([
-                    X_shuffled[:inicio_teste],
-                    X_shuffled[fim_teste:]
-                ])
-                y_treino_fold = np.concatenate([
-                    y_shuffled[:inicio_teste],
-                    y_shuffled[fim_teste:]
-                ])
-                
-                # Treina modelo temporário
-                modelo_temp = KNNOtimizado(k=k, metrica=self.metrica, normalizar=self.normalizar)
-                modelo_temp.treinar(X_treino_fold, y_treino_fold)
-                
-                # Testa
-                predicoes = modelo_temp.predizer(X_teste_fold)
-                acuracia = np.mean(predicoes == y_teste_fold)
-                acuracias_fold.append(acuracia)
+            acuracias_fold = [acuracias[k] for acuracias in acuracias_por_fold]
             
             acuracia_media = np.mean(acuracias_fold)
             acuracia_std = np.std(acuracias_fold)
@@ -357,13 +1526,82 @@ class KNNOtimizado:
             'melhor_acuracia': resultados[melhor_k]['acuracia_media']
         }
     
-    def avaliar_performance(self, X_teste: np.ndarray, y_teste: np.ndarray) -> EstatisticasPerformance:
+    def _pontuar(self, previstos: np.ndarray, y_verdadeiro: np.ndarray) -> float:
+        """Pontuação de um k na validação cruzada (acurácia)."""
+        return float(np.mean(previstos == y_verdadeiro))
+    
+    def _pontuacoes_por_fold(self, X: np.ndarray, y: np.ndarray, k_folds: int,
+                             k_range: range, n_jobs: int) -> List[Dict[int, float]]:
+        """
+        Pontuação (`_pontuar`) de cada k em cada fold.
+        
+        Cada fold é treinado e consultado uma única vez com k = max(k_range);
+        cada k agrega o prefixo da matriz de vizinhos ordenada.
+        
+        Returns:
+            Lista (um item por fold) de {k: pontuação}
+        """
+        X = np.array(X)
+        y = np.array(y)
+        n_amostras = len(X)
+        
+        # Mistura os dados
+        indices = np.random.permutation(n_amostras)
+        X_shuffled = X[indices]
+        y_shuffled = y[indices]
+        
+        # Divide em k_folds
+        fold_size = n_amostras // k_folds
+        k_max = max(k_range)
+        n_jobs = self._resolver_n_jobs(n_jobs, k_folds)
+        
+        def avaliar_fold(fold: int) -> Dict[int, float]:
+            # Define indices de teste
+            inicio_teste = fold * fold_size
+            fim_teste = (fold + 1) * fold_size if fold < k_folds - 1 else n_amostras
+            
+            # Separa treino e teste
+            X_teste_fold = X_shuffled[inicio_teste:fim_teste]
+            y_teste_fold = y_shuffled[inicio_teste:fim_teste]
+            
+            X_treino_fold = np.concatenate([
+                X_shuffled[:inicio_teste],
+                X_shuffled[fim_teste:]
+            ])
+            y_treino_fold = np.concatenate([
+                y_shuffled[:inicio_teste],
+                y_shuffled[fim_teste:]
+            ])
+            
+            # Treina um único modelo temporário com o maior k
+            modelo_temp = self._copiar_configuracao(k=k_max, memoria_max_mb=self.memoria_max_mb / n_jobs)
+            modelo_temp.treinar(X_treino_fold, y_treino_fold)
+            
+            # Vizinhos ordenados até k_max, calculados uma vez
+            X_norm = modelo_temp._normalizar_dados(X_teste_fold, fit=False)
+            distancias, vizinhos = modelo_temp._k_vizinhos(X_norm)
+            
+            # Cada k agrega o prefixo da ordenação
+            pontuacoes = {}
+            for k in k_range:
+                previstos, _ = modelo_temp._agregar(vizinhos[:, :k], distancias[:, :k])
+                pontuacoes[k] = modelo_temp._pontuar(previstos, y_teste_fold)
+            return pontuacoes
+        
+        if n_jobs > 1:
+            with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+                return list(executor.map(avaliar_fold, range(k_folds)))
+        return [avaliar_fold(fold) for fold in range(k_folds)]
+    
+    def avaliar_performance(self, X_teste: np.ndarray, y_teste: np.ndarray,
+                            n_jobs: int = 1) -> EstatisticasPerformance:
         """
         Avalia performance do modelo em dados de teste.
         
         Args:
             X_teste: Dados de teste
             y_teste: Classes verdadeiras
+            n_jobs: Número de threads para a predição (-1 = todos os núcleos)
             
         Returns:
             Estatísticas completas de performance
@@ -371,7 +1609,7 @@ class KNNOtimizado:
         print(f"📊 Avaliando performance em {len(X_teste)} exemplos de teste...")
         
         inicio = time.time()
-        resultados = self.predizer_com_metricas(X_teste)
+        resultados = self.predizer_com_metricas(X_teste, n_jobs)
         tempo_total = time.time() - inicio
         
         y_pred = [r.classe_prevista for r in resultados]
@@ -414,6 +1652,203 @@ class KNNOtimizado:
         )
 
 
+class KNNRegressor(KNNOtimizado):
+    """
+    KNN para regressão: a previsão é a média (ponderada) dos alvos dos vizinhos.
+    
+    Reaproveita toda a busca de vizinhos do KNNOtimizado (blocos,
+    índices, paralelismo, armazenamento compacto, treino incremental,
+    persistência); apenas a agregação dos vizinhos muda. A "confiança"
+    de cada previsão é o desvio padrão ponderado dos alvos dos vizinhos.
+    
+    Validação cruzada e comparação de armazenamento usam MSE (e R²) no
+    lugar da acurácia.
+    """
+    
+    def _registrar_rotulos(self, y: np.ndarray):
+        """Guarda os alvos contínuos (sem codificação em classes)."""
+        self._buffer_y = y.astype(np.float64)
+        self._buffer_codigos = None
+        self._y_codificado = None
+        self.classes_unicas = None
+        self._log(f"📊 Alvo: média {np.mean(y):.3f}, desvio {np.std(y):.3f}")
+    
+    def _acrescentar_rotulos(self, y: np.ndarray, n_antigo: int, n_total: int):
+        """Escreve novos alvos no buffer (já com capacidade para n_total)."""
+        self._buffer_y[n_antigo:n_total] = y
+    
+    def _agregar(self, indices: np.ndarray, distancias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Média ponderada vetorizada dos alvos dos vizinhos.
+        
+        Args:
+            indices: Índices dos vizinhos (m, k)
+            distancias: Distâncias dos vizinhos (m, k)
+            
+        Returns:
+            (valores previstos (m,), desvio padrão ponderado dos vizinhos (m,))
+        """
+        pesos = self._pesos_vizinhos(distancias)
+        alvos = self.y_treino[indices]
+        
+        total = pesos.sum(axis=1)
+        # Pesos gaussianos podem zerar a linha inteira: cai para a média simples
+        sem_peso = total == 0
+        pesos[sem_peso] = 1
+        total[sem_peso] = pesos.shape[1]
+        
+        media = np.einsum('mk,mk->m', pesos, alvos) / total
+        variancia = np.einsum('mk,mk->m', pesos, (alvos - media[:, np.newaxis]) ** 2) / total
+        return media, np.sqrt(variancia)
+    
+    def predizer(self, X: Union[np.ndarray, List], n_jobs: int = 1) -> np.ndarray:
+        """
+        Prediz valores para múltiplos pontos.
+        
+        Args:
+            X: Pontos a avaliar
+            n_jobs: Número de threads (-1 = todos os núcleos)
+            
+        Returns:
+            Array de valores previstos
+        """
+        previstos, _, _, _ = self._predizer_lote(X, n_jobs)
+        return previstos
+    
+    def avaliar_performance(self, X_teste: np.ndarray, y_teste: np.ndarray,
+                            n_jobs: int = 1) -> EstatisticasRegressao:
+        """
+        Avalia o regressor em dados de teste (MSE, MAE e R²).
+        
+        Args:
+            X_teste: Dados de teste
+            y_teste: Valores verdadeiros
+            n_jobs: Número de threads para a predição (-1 = todos os núcleos)
+            
+        Returns:
+            Estatísticas de regressão
+        """
+        print(f"📊 Avaliando regressão em {len(X_teste)} exemplos de teste...")
+        
+        inicio = time.time()
+        y_pred = self.predizer(X_teste, n_jobs)
+        tempo_total = time.time() - inicio
+        
+        y_teste = np.asarray(y_teste, dtype=np.float64)
+        erros = y_pred - y_teste
+        
+        return EstatisticasRegressao(
+            mse=float(np.mean(erros ** 2)),
+            mae=float(np.mean(np.abs(erros))),
+            r2=self._r2(y_pred, y_teste),
+            tempo_total=tempo_total,
+            tempo_medio_predicao=tempo_total / len(y_teste)
+        )
+    
+    @staticmethod
+    def _r2(y_pred: np.ndarray, y_verdadeiro: np.ndarray) -> float:
+        """Coeficiente de determinação (0 quando o alvo é constante)."""
+        soma_total = np.sum((y_verdadeiro - y_verdadeiro.mean()) ** 2)
+        if soma_total == 0:
+            return 0.0
+        return float(1 - np.sum((y_pred - y_verdadeiro) ** 2) / soma_total)
+    
+    def _pontuar(self, previstos: np.ndarray, y_verdadeiro: np.ndarray) -> float:
+        """Pontuação de um k na validação cruzada (MSE, menor é melhor)."""
+        return float(np.mean((previstos - y_verdadeiro) ** 2))
+    
+    def validacao_cruzada(self, X: np.ndarray, y: np.ndarray,
+                         k_folds: int = 5,
+                         k_range: range = range(1, 16),
+                         n_jobs: int = 1) -> Dict:
+        """
+        Validação cruzada para encontrar o k de menor erro quadrático médio.
+        
+        Mesma estratégia da classificação: uma busca de vizinhos por fold
+        com max(k_range) e cada k avaliado sobre o prefixo da ordenação.
+        
+        Args:
+            X: Dados de entrada
+            y: Valores verdadeiros
+            k_folds: Número de folds para validação cruzada
+            k_range: Range de valores k para testar
+            n_jobs: Número de folds processados em paralelo (-1 = todos os núcleos)
+            
+        Returns:
+            Dicionário com resultados da validação
+        """
+        print(f"🔍 Validação cruzada: testando k de {min(k_range)} a {max(k_range)}")
+        
+        mses_por_fold = self._pontuacoes_por_fold(X, np.asarray(y, dtype=np.float64),
+                                                  k_folds, k_range, n_jobs)
+        resultados = {}
+        
+        for k in k_range:
+            mses_fold = [mses[k] for mses in mses_por_fold]
+            resultados[k] = {
+                'mse_medio': np.mean(mses_fold),
+                'mse_std': np.std(mses_fold),
+                'mses_fold': mses_fold
+            }
+            print(f"   k={k:2d}: MSE {resultados[k]['mse_medio']:.4f} ± {resultados[k]['mse_std']:.4f}")
+        
+        melhor_k = min(resultados.keys(), key=lambda k: resultados[k]['mse_medio'])
+        
+        print(f"\n🎯 Melhor k encontrado: {melhor_k}")
+        print(f"📊 MSE: {resultados[melhor_k]['mse_medio']:.4f}")
+        
+        return {
+            'resultados': resultados,
+            'melhor_k': melhor_k,
+            'melhor_mse': resultados[melhor_k]['mse_medio']
+        }
+    
+    def comparar_armazenamento(self, X_treino: np.ndarray, y_treino: np.ndarray,
+                               X_teste: np.ndarray, y_teste: np.ndarray,
+                               tipos: List[TipoArmazenamento] = tuple(TipoArmazenamento)) -> Dict:
+        """
+        Compara cada formato de armazenamento contra a precisão completa (FLOAT64).
+        
+        Args:
+            X_treino: Dados de treino
+            y_treino: Alvos de treino
+            X_teste: Dados de teste
+            y_teste: Valores verdadeiros do teste
+            tipos: Formatos a comparar
+            
+        Returns:
+            Dicionário {formato: {'mse', 'r2', 'memoria_mb', 'reducao_memoria',
+            'desvio_referencia', 'recall_vizinhos', 'tempo_medio_ms'}}, onde
+            desvio_referencia é a raiz do erro quadrático médio contra as
+            previsões do modelo FLOAT64
+        """
+        y_teste = np.asarray(y_teste, dtype=np.float64)
+        medidas = self._medir_armazenamento(X_treino, y_treino, X_teste, tipos)
+        
+        referencia = medidas[TipoArmazenamento.FLOAT64]
+        print(f"\n💾 Comparação de armazenamento (referência: float64)")
+        
+        relatorio = {}
+        for tipo, medida in medidas.items():
+            previstos = medida['previstos']
+            relatorio[tipo.value] = {
+                'mse': float(np.mean((previstos - y_teste) ** 2)),
+                'r2': self._r2(previstos, y_teste),
+                'memoria_mb': medida['memoria_mb'],
+                'reducao_memoria': referencia['memoria_mb'] / medida['memoria_mb'],
+                'desvio_referencia': float(np.sqrt(np.mean((previstos - referencia['previstos']) ** 2))),
+                'recall_vizinhos': medida['recall_vizinhos'],
+                'tempo_medio_ms': medida['tempo_medio_ms'],
+            }
+            r = relatorio[tipo.value]
+            print(f"   {tipo.value:8s}: MSE={r['mse']:.4f}, R²={r['r2']:.3f}, "
+                  f"memória={r['memoria_mb']:.2f} MB ({r['reducao_memoria']:.0f}x menor), "
+                  f"desvio vs float64={r['desvio_referencia']:.4f}, recall vizinhos={r['recall_vizinhos']:.3f}, "
+                  f"{r['tempo_medio_ms']:.3f} ms/consulta")
+        
+        return relatorio
+
+
 def demonstracao_knn_otimizado():
     """Demonstração completa do KNN otimizado."""
     print("=" * 70)
@@ -527,15 +1962,75 @@ def demonstracao_knn_otimizado():
         print(f"   Suporte:  {metricas['suporte']}")
 
 
+
+def demonstracao_recursos_avancados():
+    """Índices espaciais, IVF, pesos, regressão, treino incremental e cache."""
+    print("\n" + "=" * 70)
+    print("🧰 RECURSOS AVANÇADOS")
+    print("=" * 70)
+    
+    rng = np.random.default_rng(7)
+    n = 20000
+    y = rng.integers(0, 3, n)
+    X = rng.normal(size=(n, 3)) + 2.5 * y[:, np.newaxis]
+    X_treino, y_treino = X[:-500], y[:-500]
+    X_teste, y_teste = X[-500:], y[-500:]
+    
+    # Índices exatos (KD-Tree/Ball-Tree) e aproximado (IVF) contra a força bruta
+    print(f"\n🌳 ÍNDICES DE BUSCA ({len(X_treino)} pontos, 3 dimensões)")
+    print("-" * 40)
+    for tipo in (TipoIndice.BRUTO, TipoIndice.KD_TREE, TipoIndice.BALL_TREE):
+        knn = KNNOtimizado(k=5, verbose=False)
+        knn.treinar(X_treino, y_treino, indice=tipo)
+        inicio = time.time()
+        acuracia = np.mean(knn.predizer(X_teste) == y_teste)
+        print(f"   {tipo.value:10s}: acurácia={acuracia:.3f}, {time.time() - inicio:.3f}s")
+    
+    knn_ivf = KNNOtimizado(k=5, verbose=False)
+    knn_ivf.treinar(X_treino, y_treino, indice=TipoIndice.IVF, n_probe=4)
+    knn_ivf.avaliar_recall(X_teste[:200], n_probes=[1, 4, 16])
+    
+    # Pesos por distância e gaussianos
+    print(f"\n⚖️  PESOS DOS VIZINHOS (k=15)")
+    print("-" * 40)
+    for pesos in TipoPeso:
+        knn = KNNOtimizado(k=15, pesos=pesos, largura_kernel=0.5, verbose=False)
+        knn.treinar(X_treino, y_treino)
+        print(f"   {pesos.value:10s}: acurácia={np.mean(knn.predizer(X_teste) == y_teste):.3f}")
+    
+    # Regressão: k escolhido pelo MSE
+    print(f"\n📈 REGRESSÃO")
+    print("-" * 40)
+    X_reg = rng.uniform(0, 2 * np.pi, (2000, 1))
+    y_reg = np.sin(X_reg[:, 0]) + rng.normal(0, 0.2, len(X_reg))
+    regressor = KNNRegressor(pesos=TipoPeso.DISTANCIA, verbose=False)
+    melhor_k = regressor.validacao_cruzada(X_reg[:1500], y_reg[:1500], k_range=range(1, 31, 5))['melhor_k']
+    regressor.k = melhor_k
+    regressor.treinar(X_reg[:1500], y_reg[:1500])
+    stats_reg = regressor.avaliar_performance(X_reg[1500:], y_reg[1500:])
+    print(f"   k={melhor_k}: MSE={stats_reg.mse:.4f}, MAE={stats_reg.mae:.4f}, R²={stats_reg.r2:.3f}")
+    
+    # Treino incremental com cache de consultas repetidas
+    print(f"\n🔄 TREINO INCREMENTAL + CACHE")
+    print("-" * 40)
+    knn = KNNOtimizado(k=5, tamanho_cache=1000, verbose=False)
+    knn.treinar(X_treino[:10000], y_treino[:10000])
+    knn.treinar_incremental(X_treino[10000:], y_treino[10000:])
+    leituras = np.tile(X_teste[:50], (10, 1))
+    knn.predizer(leituras)
+    cache = knn.estatisticas_cache()
+    print(f"   {len(knn.X_treino)} pontos após o incremento; cache: "
+          f"{cache['acertos']} acertos, {cache['falhas']} falhas "
+          f"(taxa {cache['taxa_acerto']:.0%})")
+
+
 if __name__ == "__main__":
     demonstracao_knn_otimizado()
+    demonstracao_recursos_avancados()
     
     print("\n" + "=" * 70)
     print("🎓 EXERCÍCIOS AVANÇADOS:")
     print("=" * 70)
-    print("1. Implemente KNN com pesos baseados na distância")
-    print("2. Adicione suporte para busca aproximada (LSH)")
-    print("3. Implemente KD-Tree para datasets de baixa dimensão")
-    print("4. Adicione detecção de outliers")
-    print("5. Crie visualizações interativas dos resultados")
-    print("6. Implemente KNN incremental para dados em streaming")
+    print("1. Adicione LSH como alternativa ao IVF em alta dimensão")
+    print("2. Adicione detecção de outliers pela distância ao k-ésimo vizinho")
+    print("3. Crie visualizações interativas dos resultados")
@@ -0,0 +1,258 @@
+"""
+Testes do KNN otimizado
+Executar: python -m unittest test_knn_otimizado (a partir deste diretório)
+"""
+
+import contextlib
+import io
+import tracemalloc
+import unittest
+
+import numpy as np
+
+from knn_otimizado import (KNNOtimizado, KNNRegressor, MetricaDistancia, TipoIndice,
+                           TipoArmazenamento, AMOSTRAS_MIN_KD_TREE, DIMENSAO_MAX_KD_TREE)
+
+
+class TestCacheConsultas(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(size=(200, 2))
+        self.y = rng.integers(0, 2, 200)
+        # 50 linhas com apenas 10 pontos distintos
+        self.consultas = np.tile(self.X[:10], (5, 1))
+
+    def test_repeticoes_no_lote_contam_como_acertos(self):
+        knn = KNNOtimizado(k=3, tamanho_cache=100, verbose=False)
+        knn.treinar(self.X, self.y)
+        knn.predizer(self.consultas)
+
+        stats = knn.estatisticas_cache()
+        self.assertEqual(stats['falhas'], 10)
+        self.assertEqual(stats['acertos'], 40)
+        self.assertEqual(stats['tamanho'], 10)
+
+    def test_cache_nao_altera_predicoes(self):
+        com_cache = KNNOtimizado(k=3, tamanho_cache=100, verbose=False)
+        sem_cache = KNNOtimizado(k=3, verbose=False)
+        com_cache.treinar(self.X, self.y)
+        sem_cache.treinar(self.X, self.y)
+        self.assertEqual(com_cache.predizer(self.consultas), sem_cache.predizer(self.consultas))
+
+
+class TestIndiceAuto(unittest.TestCase):
+    # Limites medidos no benchmark do README: fora deles a força bruta vence
+    def _indice_auto(self, n_amostras, n_caracteristicas, **kwargs):
+        # A escolha depende só da forma dos dados e da métrica
+        X = np.random.default_rng(1).normal(size=(n_amostras, n_caracteristicas))
+        knn = KNNOtimizado(k=3, verbose=False, **kwargs)
+        knn.treinar(X, np.zeros(n_amostras, dtype=int), indice=TipoIndice.AUTO)
+        return knn.tipo_indice
+
+    def test_baixa_dimensao_com_treino_grande_usa_kd_tree(self):
+        tipo = self._indice_auto(AMOSTRAS_MIN_KD_TREE, DIMENSAO_MAX_KD_TREE)
+        self.assertEqual(tipo, TipoIndice.KD_TREE)
+
+    def test_acima_do_limite_de_dimensao_usa_forca_bruta(self):
+        tipo = self._indice_auto(AMOSTRAS_MIN_KD_TREE, DIMENSAO_MAX_KD_TREE + 1)
+        self.assertEqual(tipo, TipoIndice.BRUTO)
+
+    def test_treino_pequeno_usa_forca_bruta(self):
+        self.assertEqual(self._indice_auto(1000, 2), TipoIndice.BRUTO)
+
+    def test_cosseno_usa_forca_bruta(self):
+        tipo = self._indice_auto(AMOSTRAS_MIN_KD_TREE, 2, metrica=MetricaDistancia.COSENO)
+        self.assertEqual(tipo, TipoIndice.BRUTO)
+
+
+class TestArvores(unittest.TestCase):
+    def test_busca_em_lote_igual_a_forca_bruta(self):
+        rng = np.random.default_rng(6)
+        X = rng.normal(size=(3000, 5))
+        y = rng.integers(0, 2, 3000)
+        consultas = rng.normal(size=(300, 5))
+        for metrica in MetricaDistancia:
+            bruto = KNNOtimizado(k=7, metrica=metrica, p=3.0, verbose=False)
+            bruto.treinar(X, y)
+            X_norm = bruto._normalizar_dados(consultas, fit=False)
+            d_bruto, i_bruto = bruto._k_vizinhos(X_norm)
+            for indice in (TipoIndice.KD_TREE, TipoIndice.BALL_TREE):
+                arvore = KNNOtimizado(k=7, metrica=metrica, p=3.0, verbose=False)
+                arvore.treinar(X, y, indice=indice, tamanho_folha=8)
+                d_arvore, i_arvore = arvore._k_vizinhos(X_norm)
+                np.testing.assert_array_equal(i_arvore, i_bruto, err_msg=f"{metrica} {indice}")
+                np.testing.assert_allclose(d_arvore, d_bruto, rtol=1e-9, atol=1e-12)
+
+
+class TestTreinoIncremental(unittest.TestCase):
+    def setUp(self):
+        # Segundo lote com outra média e escala: a normalização muda bastante
+        rng = np.random.default_rng(3)
+        self.X_inicial = rng.normal(size=(1500, 4)) * [1, 2, 3, 4]
+        self.y_inicial = rng.integers(0, 3, 1500)
+        self.X_novo = rng.normal(size=(700, 4)) * 3 + 5
+        self.y_novo = rng.integers(0, 3, 700)
+        self.consultas = rng.normal(size=(100, 4)) * 3 + 2
+
+    def _vizinhos(self, knn):
+        return knn._k_vizinhos(knn._normalizar_dados(self.consultas, fit=False))
+
+    def test_lote_vazio_nao_altera_o_modelo(self):
+        knn = KNNOtimizado(k=5, verbose=False)
+        knn.treinar(self.X_inicial, self.y_inicial)
+        media, std = knn.media_treino.copy(), knn.std_treino.copy()
+        antes = knn.predizer(self.consultas)
+
+        knn.treinar_incremental(np.empty((0, 4)), np.empty(0))
+
+        np.testing.assert_array_equal(knn.media_treino, media)
+        np.testing.assert_array_equal(knn.std_treino, std)
+        self.assertEqual(len(knn.X_treino), len(self.X_inicial))
+        self.assertEqual(knn.predizer(self.consultas), antes)
+
+    def test_concorda_com_retreino_completo(self):
+        X_total = np.vstack([self.X_inicial, self.X_novo])
+        y_total = np.concatenate([self.y_inicial, self.y_novo])
+        for metrica in MetricaDistancia:
+            for indice in (TipoIndice.BRUTO, TipoIndice.KD_TREE):
+                incremental = KNNOtimizado(k=5, metrica=metrica, verbose=False)
+                incremental.treinar(self.X_inicial, self.y_inicial, indice=indice)
+                incremental.partial_fit(self.X_novo[:300], self.y_novo[:300])
+                incremental.partial_fit(self.X_novo[300:], self.y_novo[300:])
+
+                retreino = KNNOtimizado(k=5, metrica=metrica, verbose=False)
+                retreino.treinar(X_total, y_total, indice=indice)
+
+                d_inc, i_inc = self._vizinhos(incremental)
+                d_ret, i_ret = self._vizinhos(retreino)
+                np.testing.assert_array_equal(i_inc, i_ret, err_msg=f"{metrica} {indice}")
+                np.testing.assert_allclose(d_inc, d_ret, rtol=1e-9, atol=1e-12)
+
+    def test_arvore_reconstruida_apenas_na_proxima_consulta(self):
+        knn = KNNOtimizado(k=5, verbose=False)
+        knn.treinar(self.X_inicial, self.y_inicial, indice=TipoIndice.KD_TREE)
+        arvore = knn.indice
+        for inicio in range(0, len(self.X_novo), 100):
+            knn.partial_fit(self.X_novo[inicio:inicio + 100], self.y_novo[inicio:inicio + 100])
+        self.assertIs(knn.indice, arvore)
+
+        knn.predizer(self.consultas[:1])
+        self.assertIsNot(knn.indice, arvore)
+        self.assertEqual(len(knn.indice.indices), len(self.X_inicial) + len(self.X_novo))
+
+    def test_ivf_recebe_linhas_novas_sem_retreinar_centroides(self):
+        for armazenamento in TipoArmazenamento:
+            knn = KNNOtimizado(k=5, armazenamento=armazenamento, verbose=False)
+            knn.treinar(self.X_inicial, self.y_inicial, indice=TipoIndice.IVF, n_listas=16, n_probe=16)
+            centroides = knn.indice.centroides
+            knn.partial_fit(self.X_novo, self.y_novo)
+
+            self.assertIs(knn.indice.centroides, centroides)
+            n_total = len(self.X_inicial) + len(self.X_novo)
+            np.testing.assert_array_equal(np.sort(knn.indice.ids), np.arange(n_total))
+            # n_probe = n_listas: busca exata, igual à força bruta
+            _, aproximados = self._vizinhos(knn)
+            _, exatos = knn._k_vizinhos_em_blocos(knn._normalizar_dados(self.consultas, fit=False), knn.k)
+            np.testing.assert_array_equal(aproximados, exatos)
+
+
+class TestArmazenamentoInt8(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        self.X = rng.normal(size=(3000, 8)) * np.arange(1, 9)
+        self.y = rng.integers(0, 2, 3000)
+        self.consultas = rng.normal(size=(64, 8)) * np.arange(1, 9)
+
+    def test_distancia_assimetrica_igual_a_decodificar_tudo(self):
+        for metrica in MetricaDistancia:
+            knn = KNNOtimizado(k=7, metrica=metrica, p=3.0, memoria_max_mb=0.05,
+                               armazenamento=TipoArmazenamento.INT8, verbose=False)
+            knn.treinar(self.X, self.y)
+            X_norm = knn._normalizar_dados(self.consultas, fit=False)
+            distancias, indices = knn._k_vizinhos(X_norm)
+
+            # Referência: todas as linhas decodificadas e distância direta
+            decodificados = knn._decodificar(knn.X_treino).astype(np.float64)
+            referencia = knn._distancias_vizinhos(
+                X_norm, np.broadcast_to(np.arange(len(decodificados)), (len(X_norm), len(decodificados))))
+            esperados = np.argsort(referencia, axis=1, kind='stable')[:, :knn.k]
+            np.testing.assert_array_equal(indices, esperados, err_msg=str(metrica))
+            np.testing.assert_allclose(distancias, np.take_along_axis(referencia, esperados, axis=1),
+                                       rtol=1e-5, atol=1e-6)
+
+    def test_ivf_usa_os_codigos_e_arvores_uma_copia_float(self):
+        ivf = KNNOtimizado(k=5, armazenamento=TipoArmazenamento.INT8, verbose=False)
+        ivf.treinar(self.X, self.y, indice=TipoIndice.IVF)
+        self.assertEqual(ivf.indice.dados.dtype, np.int8)
+        self.assertEqual(ivf.memoria_indice_mb(), 0.0)
+
+        arvore = KNNOtimizado(k=5, armazenamento=TipoArmazenamento.INT8, verbose=False)
+        arvore.treinar(self.X, self.y, indice=TipoIndice.KD_TREE)
+        self.assertAlmostEqual(arvore.memoria_indice_mb(), 4 * arvore.memoria_treino_mb())
+
+
+class TestOrcamentoMemoria(unittest.TestCase):
+    def test_pico_da_busca_dentro_do_orcamento(self):
+        rng = np.random.default_rng(5)
+        X = rng.normal(size=(20000, 32))
+        y = rng.integers(0, 2, 20000)
+        consultas = rng.normal(size=(50, 32))
+        orcamento_mb = 1.0
+        for metrica in MetricaDistancia:
+            for armazenamento in TipoArmazenamento:
+                knn = KNNOtimizado(k=5, metrica=metrica, memoria_max_mb=orcamento_mb,
+                                   armazenamento=armazenamento, verbose=False)
+                knn.treinar(X[:-500], y[:-500])
+                # Normas adiadas pelo partial_fit são recalculadas na busca medida
+                knn.partial_fit(X[-500:] + 1, y[-500:])
+                X_norm = knn._normalizar_dados(consultas, fit=False)
+
+                tracemalloc.start()
+                try:
+                    knn._k_vizinhos(X_norm)
+                    _, pico = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+                # Folga de 20% para objetos Python e arredondamentos dos blocos
+                self.assertLess(pico / 2**20, 1.2 * orcamento_mb, msg=f"{metrica} {armazenamento}")
+
+
+class TestKNNRegressor(unittest.TestCase):
+    def setUp(self):
+        # Alvo contínuo sen(x) com ruído Gaussiano
+        rng = np.random.default_rng(0)
+        self.X = rng.uniform(0, 2 * np.pi, (400, 1))
+        self.y = np.sin(self.X[:, 0]) + rng.normal(0, 0.3, 400)
+
+    def test_validacao_cruzada_escolhe_k_pelo_mse(self):
+        regressor = KNNRegressor(verbose=False)
+        np.random.seed(0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = regressor.validacao_cruzada(self.X, self.y, k_range=range(1, 21))
+
+        mses = {k: r['mse_medio'] for k, r in resultado['resultados'].items()}
+        self.assertEqual(resultado['melhor_k'], min(mses, key=mses.get))
+        self.assertEqual(resultado['melhor_mse'], mses[resultado['melhor_k']])
+        # Com ruído, k=1 ajusta o ruído e perde para vizinhanças maiores
+        self.assertGreater(resultado['melhor_k'], 1)
+        self.assertLess(resultado['melhor_mse'], mses[1])
+
+    def test_comparar_armazenamento_reporta_mse_e_r2(self):
+        X, y = self.X, self.y
+        regressor = KNNRegressor(k=5, verbose=False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            relatorio = regressor.comparar_armazenamento(X[:300], y[:300], X[300:], y[300:])
+            regressor.treinar(X[:300], y[:300])
+            stats = regressor.avaliar_performance(X[300:], y[300:])
+
+        self.assertEqual(set(relatorio), {'float64', 'float32', 'int8'})
+        referencia = relatorio['float64']
+        self.assertAlmostEqual(referencia['mse'], stats.mse)
+        self.assertAlmostEqual(referencia['r2'], stats.r2)
+        self.assertEqual(referencia['desvio_referencia'], 0.0)
+        self.assertEqual(referencia['recall_vizinhos'], 1.0)
+        self.assertGreater(relatorio['int8']['r2'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
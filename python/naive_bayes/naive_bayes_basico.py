@@ -4,122 +4,506 @@ Algoritmo de classificação probabilística baseado no Teorema de Bayes
 Suporta dados categóricos e contínuos (usando distribuição Gaussiana)
 """
 
+import csv
+import json
 import math
+import os
+import re
+import zlib
 from collections import defaultdict, Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele predict_batch usa o laço em Python
+    np = None
+
+
+# Menor likelihood considerada (evita log(0)), já em log-space
+MIN_LOG_LIKELIHOOD = math.log(1e-10)
+
+# Formato de save/load: um .npy por array (inclusive as classes) + metadados e vocabulários em JSON
+FORMAT_VERSION = 2
+METADATA_FILE = 'metadata.json'
+VOCABULARY_FILE = 'vocabulary.json'
+CLASS_LIST_FILE = 'class_list.npy'
+
+# Tipos de valor categórico que voltam idênticos de JSON (tipo exato: subclasses como np.float64 mudariam)
+JSON_VALUE_TYPES = (str, int, float, bool, type(None))
+
+FEATURE_TYPES = ('categorical', 'continuous')
 
 
 class NaiveBayesClassifier:
-    def __init__(self):
-        """Inicializa o classificador Naive Bayes"""
+    # Arrays de self.arrays gravados diretamente por save()
+    SAVED_ARRAYS = ('log_priors', 'means', 'double_variances', 'log_coefficients', 'has_data')
+    
+    def __init__(self, schema=None, type_sample_size=1000, max_categories=10000):
+        """
+        Inicializa o classificador Naive Bayes
+        
+        Args:
+            schema (dict | list): Tipos fixos das features ('categorical' ou
+                'continuous'), por índice; as demais são inferidas
+            type_sample_size (int): Linhas amostradas para decidir se uma
+                feature fora do schema é numérica
+            max_categories (int): Máximo de valores distintos rastreados por
+                feature numérica indecisa; acima disso ela é contínua
+        
+        Features inferidas como numéricas ficam em período de prova até o
+        fim do treino: guardam as contagens por valor mesmo depois de
+        decididas contínuas, para que um valor não numérico em qualquer
+        lote as rebaixe a categóricas sem perder os lotes anteriores.
+        Declare no schema as colunas sabidamente contínuas para não pagar
+        essa memória.
+        """
+        if isinstance(schema, (list, tuple)):
+            schema = dict(enumerate(schema))
+        self.schema = dict(schema or {})
+        invalid = {feature_type for feature_type in self.schema.values() if feature_type not in FEATURE_TYPES}
+        if invalid:
+            raise ValueError(f"Tipos de feature inválidos no schema: {sorted(invalid)}")
+        self.type_sample_size = type_sample_size
+        self.max_categories = max_categories
+        
         self.classes = set()
         self.class_counts = defaultdict(int)
         self.feature_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
-        self.feature_stats = defaultdict(lambda: defaultdict(lambda: {'sum': 0, 'sum_sq': 0, 'count': 0}))
+        # Estatísticas suficientes de Welford: contagem, média e M2 (soma dos quadrados dos desvios)
+        self.feature_stats = defaultdict(lambda: defaultdict(lambda: {'count': 0, 'mean': 0.0, 'm2': 0.0}))
         self.total_samples = 0
         self.feature_types = {}  # 'categorical' ou 'continuous'
+        # Features numéricas ainda indecisas -> valores distintos vistos (limitado a max_categories)
+        self.distinct_values = {}
+        # Features numéricas inferidas que ainda contam valores (podem virar categóricas)
+        self.probation = set()
         self.trained = False
+        
+        # Tabelas de predição montadas por finalize()
+        self.finalized = False
+        self.class_list = []
+        self.log_priors = {}
+        self.vocabulary_sizes = {}  # feature categórica -> número de valores distintos
+        self.log_likelihood_tables = {}  # feature -> classe -> {valor: log P(valor|classe)}
+        self.log_unseen = {}  # feature -> classe -> log P(valor não visto|classe)
+        self.gaussian_tables = {}  # feature -> classe -> (média, 2·variância, log do coeficiente)
+        self.arrays = None  # Versão NumPy das tabelas (montada sob demanda por predict_batch)
+        self.loaded_arrays = None  # Contagens de um modelo carregado, ainda não convertidas (ver load)
     
-    def _determine_feature_type(self, values):
-        """Determina automaticamente se uma feature é categórica ou contínua"""
-        # Se todos os valores são números e há muitos valores únicos, trata como contínuo
+    def _determine_feature_type(self, num_unique, num_values):
+        """Determina se uma feature numérica é categórica ou contínua"""
+        # Se mais de 50% dos valores são únicos, trata como contínuo
+        unique_ratio = num_unique / num_values if num_values else 0.0
+        return 'continuous' if unique_ratio > 0.5 else 'categorical'
+    
+    @staticmethod
+    def _is_numeric(values):
+        """Se todos os valores podem ser convertidos para float"""
         try:
-            numeric_values = [float(v) for v in values]
-            unique_ratio = len(set(numeric_values)) / len(numeric_values)
-            # Se mais de 50% dos valores são únicos, trata como contínuo
-            return 'continuous' if unique_ratio > 0.5 else 'categorical'
+            for value in values:
+                float(value)
+            return True
         except (ValueError, TypeError):
-            return 'categorical'
+            return False
+    
+    def _infer_feature_types(self, X_chunk):
+        """
+        Define o tipo das features ainda sem tipo
+        
+        Usa o schema quando houver. Senão, até type_sample_size linhas
+        espaçadas uniformemente decidem apenas se a feature é numérica:
+        não numérica é categórica; numérica fica indecisa e acumula
+        contagens e estatísticas Gaussianas ao mesmo tempo. A escolha
+        categórica × contínua (razão de valores únicos) é feita em
+        _resolve_feature_types sobre todas as linhas vistas, pois a razão
+        em uma amostra pequena é sempre maior que na coluna inteira.
+        """
+        if not X_chunk:
+            return
+        
+        step = max(1, len(X_chunk) // self.type_sample_size)
+        sample_rows = X_chunk[::step][:self.type_sample_size]
+        for feature_idx in range(len(X_chunk[0])):
+            if feature_idx in self.feature_types:
+                continue
+            if feature_idx in self.schema:
+                self.feature_types[feature_idx] = self.schema[feature_idx]
+            elif self._is_numeric(sample[feature_idx] for sample in sample_rows):
+                self.feature_types[feature_idx] = 'continuous'  # Provisório até _resolve_feature_types
+                self.distinct_values[feature_idx] = set()
+                self.probation.add(feature_idx)
+            else:
+                self.feature_types[feature_idx] = 'categorical'
+    
+    def _resolve_feature_types(self):
+        """
+        Decide o tipo efetivo das features indecisas
+        
+        Compara os valores distintos com o total de linhas vistas (não com
+        uma amostra), então o resultado não depende do tamanho dos lotes.
+        As duas estatísticas continuam sendo acumuladas: lotes futuros
+        podem mudar a decisão.
+        """
+        for feature_idx, distinct in list(self.distinct_values.items()):
+            if len(distinct) > self.max_categories:  # Possível após merge de várias partes
+                self._decide_continuous(feature_idx)
+                continue
+            num_values = sum(stats['count'] for stats in self.feature_stats[feature_idx].values())
+            self.feature_types[feature_idx] = self._determine_feature_type(len(distinct), num_values)
+    
+    def _decide_continuous(self, feature_idx):
+        """
+        Feature indecisa passou de max_categories valores distintos: fica contínua
+        
+        Deixa de rastrear os valores distintos, mas continua em período de
+        prova (as contagens por valor seguem sendo acumuladas).
+        """
+        del self.distinct_values[feature_idx]
+        self.feature_types[feature_idx] = 'continuous'
+    
+    def _demote_to_categorical(self, feature_idx):
+        """
+        Converte uma feature numérica em categórica ao encontrar um valor não numérico
+        
+        Só é possível em período de prova, quando as contagens de todos os
+        lotes já existem; as estatísticas Gaussianas são descartadas.
+        Features declaradas contínuas no schema ou de um modelo carregado
+        (tipos fixos) não guardam contagens.
+        """
+        if feature_idx in self.schema:
+            raise ValueError(f"Feature {feature_idx} declarada contínua no schema tem valor não numérico")
+        if feature_idx not in self.probation:
+            raise ValueError(f"Feature {feature_idx} tem tipo contínuo fixo (modelo carregado) e valor não numérico")
+        
+        self.feature_types[feature_idx] = 'categorical'
+        self.feature_stats.pop(feature_idx, None)
+        self.distinct_values.pop(feature_idx, None)
+        self.probation.discard(feature_idx)
     
     def fit(self, X, y):
         """
         Treina o classificador com os dados
         
+        Descarta qualquer treino anterior; para acumular dados use partial_fit.
+        
         Args:
             X (list): Lista de amostras, onde cada amostra é uma lista de features
             y (list): Lista de classes correspondentes
         """
-        self.classes = set(y)
-        self.total_samples = len(y)
+        self.__init__(self.schema, self.type_sample_size, self.max_categories)
+        self.partial_fit(X, y)
+        self.finalize()
+    
+    def partial_fit(self, X_chunk, y_chunk):
+        """
+        Acrescenta um lote de dados ao modelo (treino incremental / out-of-core)
+        
+        Atualiza contagens de classes, contagens categóricas e as
+        estatísticas Gaussianas com o algoritmo de Welford, que é
+        numericamente estável (não subtrai somas de quadrados grandes).
+        Os tipos das features vêm do schema ou de _infer_feature_types no
+        primeiro lote em que aparecem; a acumulação é uma única passada
+        sobre o lote. As tabelas de predição são refeitas na próxima predição.
+        
+        Args:
+            X_chunk (list): Lote de amostras
+            y_chunk (list): Classes correspondentes
+        """
+        self._materialize()
+        self.classes.update(y_chunk)
+        self.total_samples += len(y_chunk)
         
         # Conta classes
-        for label in y:
+        for label in y_chunk:
             self.class_counts[label] += 1
         
-        # Determina tipos de features analisando a primeira amostra
-        if X:
-            num_features = len(X[0])
-            for feature_idx in range(num_features):
-                feature_values = [sample[feature_idx] for sample in X]
-                self.feature_types[feature_idx] = self._determine_feature_type(feature_values)
+        # Tipos de features ainda não vistas (schema ou amostra do lote)
+        self._infer_feature_types(X_chunk)
+        num_features = len(X_chunk[0]) if X_chunk else 0
+        # Indecisas são numéricas (não categóricas), mesmo que o tipo efetivo atual seja categórico
+        is_categorical = [self.feature_types[feature_idx] == 'categorical' and feature_idx not in self.probation
+                          for feature_idx in range(num_features)]
+        counted = [feature_idx in self.probation for feature_idx in range(num_features)]
+        distinct = [self.distinct_values.get(feature_idx) for feature_idx in range(num_features)]
         
-        # Processa cada amostra
-        for sample, label in zip(X, y):
+        # Processa cada amostra (única passada sobre os dados)
+        for sample, label in zip(X_chunk, y_chunk):
             for feature_idx, feature_value in enumerate(sample):
-                if self.feature_types[feature_idx] == 'categorical':
+                if is_categorical[feature_idx]:
                     # Feature categórica: conta ocorrências
                     self.feature_counts[feature_idx][label][feature_value] += 1
-                else:
-                    # Feature contínua: acumula estatísticas para distribuição Gaussiana
-                    try:
-                        numeric_value = float(feature_value)
-                        stats = self.feature_stats[feature_idx][label]
-                        stats['sum'] += numeric_value
-                        stats['sum_sq'] += numeric_value ** 2
-                        stats['count'] += 1
-                    except (ValueError, TypeError):
-                        # Se não conseguir converter para número, trata como categórico
-                        self.feature_types[feature_idx] = 'categorical'
-                        self.feature_counts[feature_idx][label][feature_value] += 1
-        
-        self.trained = True
-    
-    def _calculate_prior(self, class_label):
-        """Calcula a probabilidade a priori de uma classe"""
-        return self.class_counts[class_label] / self.total_samples
-    
-    def _calculate_categorical_likelihood(self, feature_idx, feature_value, class_label):
-        """Calcula likelihood para feature categórica usando suavização de Laplace"""
-        # Conta de ocorrências da feature_value na classe
-        feature_count = self.feature_counts[feature_idx][class_label][feature_value]
-        
-        # Total de amostras na classe
-        class_total = self.class_counts[class_label]
-        
-        # Número de valores únicos para esta feature
-        all_values = set()
-        for label in self.classes:
-            all_values.update(self.feature_counts[feature_idx][label].keys())
-        num_unique_values = len(all_values)
-        
-        # Suavização de Laplace para evitar probabilidade zero
-        return (feature_count + 1) / (class_total + num_unique_values)
-    
-    def _calculate_gaussian_likelihood(self, feature_idx, feature_value, class_label):
-        """Calcula likelihood para feature contínua usando distribuição Gaussiana"""
+                    continue
+                
+                try:
+                    numeric_value = float(feature_value)
+                except (ValueError, TypeError):
+                    # Se não conseguir converter para número, trata como categórico
+                    self._demote_to_categorical(feature_idx)
+                    is_categorical[feature_idx] = True
+                    counted[feature_idx] = False
+                    distinct[feature_idx] = None
+                    self.feature_counts[feature_idx][label][feature_value] += 1
+                    continue
+                
+                if counted[feature_idx]:
+                    # Período de prova: também conta como categórica
+                    self.feature_counts[feature_idx][label][feature_value] += 1
+                values = distinct[feature_idx]
+                if values is not None:
+                    values.add(numeric_value)
+                    if len(values) > self.max_categories:
+                        self._decide_continuous(feature_idx)
+                        distinct[feature_idx] = None
+                
+                # Feature contínua: atualização de Welford
+                stats = self.feature_stats[feature_idx][label]
+                stats['count'] += 1
+                delta = numeric_value - stats['mean']
+                stats['mean'] += delta / stats['count']
+                stats['m2'] += delta * (numeric_value - stats['mean'])
+        
+        if y_chunk:
+            self.trained = True
+            self.finalized = False
+    
+    def fit_parallel(self, X, y, workers=4):
+        """
+        Treina em paralelo no estilo map-reduce
+        
+        Os tipos das features são inferidos uma vez (schema ou amostra);
+        as linhas são divididas em blocos contíguos, cada processo treina
+        estatísticas parciais (map) e elas são somadas com
+        NaiveBayesStatistics.merge (reduce). O resultado equivale a fit:
+        features em período de prova guardam as contagens em todos os
+        blocos, então podem acabar categóricas depois do merge.
+        
+        Args:
+            X (list): Lista de amostras
+            y (list): Lista de classes correspondentes
+            workers (int): Número de processos
+        """
+        self.__init__(self.schema, self.type_sample_size, self.max_categories)
+        self._infer_feature_types(X)
+        
+        workers = max(1, min(workers, len(y)))
+        shard_size = -(-len(y) // workers)
+        shards = [(X[start:start + shard_size], y[start:start + shard_size], dict(self.feature_types),
+                   list(self.distinct_values), self.schema, self.max_categories)
+                  for start in range(0, len(y), shard_size)]
+        
+        if workers == 1:
+            partials = [_fit_shard(*shard) for shard in shards]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                partials = list(executor.map(_fit_shard, *zip(*shards)))
+        
+        merged = NaiveBayesStatistics()
+        for partial in partials:
+            merged.merge(partial)
+        merged.apply_to(self)
+        self.finalize()
+    
+    def finalize(self):
+        """
+        Pré-calcula as tabelas usadas na predição
+        
+        Depois do treino, predict_proba passa a fazer apenas consultas a
+        dicionários e somas: log-priors, tamanho do vocabulário e
+        log-likelihoods de cada valor categórico (já com Laplace), e
+        média/variância/log-coeficiente de cada feature contínua.
+        """
+        if not self.trained:
+            raise ValueError("Modelo deve ser treinado antes de ser finalizado")
+        self._materialize()
+        self._resolve_feature_types()
+        
+        self.class_list = list(self.classes)
+        self.log_priors = {
+            label: math.log(self.class_counts[label] / self.total_samples)
+            for label in self.class_list
+        }
+        
+        self.vocabulary_sizes = {}
+        self.log_likelihood_tables = {}
+        self.log_unseen = {}
+        self.gaussian_tables = {}
+        
+        for feature_idx, feature_type in self.feature_types.items():
+            if feature_type == 'categorical':
+                # Vocabulário calculado uma única vez por feature
+                all_values = set()
+                for label in self.class_list:
+                    all_values.update(self.feature_counts[feature_idx][label].keys())
+                num_unique_values = len(all_values)
+                self.vocabulary_sizes[feature_idx] = num_unique_values
+                
+                tables, unseen = {}, {}
+                for label in self.class_list:
+                    log_denominator = math.log(self.class_counts[label] + num_unique_values)
+                    tables[label] = {
+                        value: max(math.log(count + 1) - log_denominator, MIN_LOG_LIKELIHOOD)
+                        for value, count in self.feature_counts[feature_idx][label].items()
+                    }
+                    unseen[label] = max(-log_denominator, MIN_LOG_LIKELIHOOD)
+                self.log_likelihood_tables[feature_idx] = tables
+                self.log_unseen[feature_idx] = unseen
+            else:
+                tables = {}
+                for label in self.class_list:
+                    params = self._gaussian_params(feature_idx, label)
+                    if params is None:
+                        tables[label] = None
+                    else:
+                        mean, variance = params
+                        log_coefficient = -0.5 * math.log(2 * math.pi * variance)
+                        tables[label] = (mean, 2 * variance, log_coefficient)
+                self.gaussian_tables[feature_idx] = tables
+        
+        self.finalized = True
+        self.arrays = None
+    
+    def _build_arrays(self):
+        """
+        Converte as tabelas finalizadas em arrays NumPy (colunas na ordem de class_list)
+        
+        - Categóricas: índice valor -> código e matriz (V + 1, classes) de
+          log-likelihoods; a última linha é a dos valores não vistos
+        - Contínuas: matrizes (features, classes) de média, 2σ² e log do
+          coeficiente, com máscara para classes sem dados
+        """
+        if not self.finalized:
+            self.finalize()
+        
+        categorical, continuous = [], []
+        for feature_idx, feature_type in sorted(self.feature_types.items()):
+            if feature_type == 'categorical':
+                tables = self.log_likelihood_tables[feature_idx]
+                unseen = self.log_unseen[feature_idx]
+                vocabulary = {}
+                for label in self.class_list:
+                    for value in tables[label]:
+                        vocabulary.setdefault(value, len(vocabulary))
+                
+                log_likelihoods = np.empty((len(vocabulary) + 1, len(self.class_list)))
+                for column, label in enumerate(self.class_list):
+                    log_likelihoods[:, column] = unseen[label]
+                    for value, log_likelihood in tables[label].items():
+                        log_likelihoods[vocabulary[value], column] = log_likelihood
+                categorical.append((feature_idx, vocabulary, log_likelihoods))
+            else:
+                continuous.append(feature_idx)
+        
+        num_classes = len(self.class_list)
+        means = np.zeros((len(continuous), num_classes))
+        double_variances = np.ones((len(continuous), num_classes))
+        log_coefficients = np.zeros((len(continuous), num_classes))
+        has_data = np.zeros((len(continuous), num_classes), dtype=bool)
+        for row, feature_idx in enumerate(continuous):
+            for column, label in enumerate(self.class_list):
+                params = self.gaussian_tables[feature_idx][label]
+                if params is not None:
+                    means[row, column], double_variances[row, column], log_coefficients[row, column] = params
+                    has_data[row, column] = True
+        
+        self.arrays = {
+            'log_priors': np.array([self.log_priors[label] for label in self.class_list]),
+            'categorical': categorical,
+            'continuous': continuous,
+            'means': means,
+            'double_variances': double_variances,
+            'log_coefficients': log_coefficients,
+            'has_data': has_data,
+        }
+    
+    @staticmethod
+    def _encode_column(column, vocabulary):
+        """Códigos inteiros de uma coluna categórica (len(vocabulary) para valores não vistos)"""
+        lookup, unseen_code = vocabulary.get, len(vocabulary)
+        return np.fromiter((lookup(value, unseen_code) for value in column.tolist()),
+                           dtype=np.int64, count=len(column))
+    
+    @staticmethod
+    def _numeric_column(column):
+        """Converte uma coluna contínua para float (NaN para valores inválidos)"""
         try:
-            numeric_value = float(feature_value)
+            return column.astype(np.float64)
         except (ValueError, TypeError):
-            return 1e-10  # Probabilidade muito baixa para valores inválidos
+            values = np.empty(len(column))
+            for i, value in enumerate(column.tolist()):
+                try:
+                    values[i] = float(value)
+                except (ValueError, TypeError):
+                    values[i] = np.nan
+            return values
+    
+    def joint_log_likelihood_batch(self, X):
+        """
+        Log-probabilidade conjunta (não normalizada) de cada amostra em cada classe
+        
+        Categóricas viram códigos inteiros e somam linhas das tabelas
+        (gather); contínuas usam a log-densidade Gaussiana vetorizada.
+        
+        Args:
+            X (list | np.ndarray): Amostras (n × features)
+        
+        Returns:
+            np.ndarray: Matriz (n, classes) na ordem de class_list
+        """
+        if np is None:
+            raise ImportError("joint_log_likelihood_batch requer NumPy")
+        if not self.trained:
+            raise ValueError("Modelo deve ser treinado antes de fazer predições")
+        if self.arrays is None or not self.finalized:
+            self._build_arrays()
         
-        stats = self.feature_stats[feature_idx][class_label]
+        arrays = self.arrays
+        data = X if isinstance(X, np.ndarray) else np.array(X, dtype=object)
+        if data.ndim == 1:
+            data = data.reshape(1, -1)
         
-        if stats['count'] == 0:
-            return 1e-10
+        joint = np.tile(arrays['log_priors'], (len(data), 1))
+        
+        for feature_idx, vocabulary, log_likelihoods in arrays['categorical']:
+            joint += log_likelihoods[self._encode_column(data[:, feature_idx], vocabulary)]
+        
+        if arrays['continuous']:
+            values = np.column_stack([self._numeric_column(data[:, feature_idx])
+                                      for feature_idx in arrays['continuous']])
+            # (n, features, 1) contra (features, classes)
+            deviations = values[:, :, np.newaxis] - arrays['means']
+            log_densities = arrays['log_coefficients'] - deviations ** 2 / arrays['double_variances']
+            valid = arrays['has_data'] & ~np.isnan(values)[:, :, np.newaxis]
+            log_densities = np.where(valid, np.maximum(log_densities, MIN_LOG_LIKELIHOOD), MIN_LOG_LIKELIHOOD)
+            joint += log_densities.sum(axis=1)
+        
+        return joint
+    
+    def predict_proba_batch(self, X):
+        """
+        Probabilidades normalizadas (n, classes), colunas na ordem de class_list
+        
+        A normalização usa log-sum-exp: subtrai o máximo de cada linha
+        antes da exponencial para evitar underflow.
+        """
+        joint = self.joint_log_likelihood_batch(X)
+        joint -= joint.max(axis=1, keepdims=True)
+        probabilities = np.exp(joint)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+    
+    def _gaussian_params(self, feature_idx, class_label):
+        """Média e variância amostral de uma feature contínua na classe (None sem dados)"""
+        stats = self.feature_stats[feature_idx].get(class_label)
+        if not stats or stats['count'] == 0:
+            return None
         
-        # Calcula média e variância
-        mean = stats['sum'] / stats['count']
+        mean = stats['mean']
         if stats['count'] > 1:
-            variance = (stats['sum_sq'] - (stats['sum'] ** 2) / stats['count']) / (stats['count'] - 1)
+            variance = stats['m2'] / (stats['count'] - 1)
             variance = max(variance, 1e-10)  # Evita variância zero
         else:
             variance = 1.0  # Variância padrão para uma única amostra
-        
-        # Calcula densidade da distribuição Gaussiana
-        std_dev = math.sqrt(variance)
-        exponent = -((numeric_value - mean) ** 2) / (2 * variance)
-        coefficient = 1 / (std_dev * math.sqrt(2 * math.pi))
-        
-        return coefficient * math.exp(exponent)
+        return mean, variance
     
     def predict_proba(self, sample):
         """
@@ -133,25 +517,34 @@ class NaiveBayesClassifier:
         """
         if not self.trained:
             raise ValueError("Modelo deve ser treinado antes de fazer predições")
+        self._materialize()
+        if not self.finalized:
+            self.finalize()
         
-        class_probabilities = {}
+        # Probabilidade a priori
+        class_probabilities = dict(self.log_priors)
         
-        for class_label in self.classes:
-            # Probabilidade a priori
-            log_prob = math.log(self._calculate_prior(class_label))
+        # Multiplica likelihoods (soma em log-space) usando as tabelas pré-calculadas
+        for feature_idx, feature_value in enumerate(sample):
+            if self.feature_types[feature_idx] == 'categorical':
+                tables = self.log_likelihood_tables[feature_idx]
+                unseen = self.log_unseen[feature_idx]
+                for class_label in self.class_list:
+                    class_probabilities[class_label] += tables[class_label].get(feature_value, unseen[class_label])
+                continue
             
-            # Multiplica likelihoods (soma em log-space)
-            for feature_idx, feature_value in enumerate(sample):
-                if self.feature_types[feature_idx] == 'categorical':
-                    likelihood = self._calculate_categorical_likelihood(feature_idx, feature_value, class_label)
-                else:
-                    likelihood = self._calculate_gaussian_likelihood(feature_idx, feature_value, class_label)
-                
-                # Evita log(0)
-                likelihood = max(likelihood, 1e-10)
-                log_prob += math.log(likelihood)
+            try:
+                numeric_value = float(feature_value)
+            except (ValueError, TypeError):
+                numeric_value = None  # Valor inválido: likelihood mínima
             
-            class_probabilities[class_label] = log_prob
+            for class_label, params in self.gaussian_tables[feature_idx].items():
+                if numeric_value is None or params is None:
+                    class_probabilities[class_label] += MIN_LOG_LIKELIHOOD
+                    continue
+                mean, double_variance, log_coefficient = params
+                log_density = log_coefficient - (numeric_value - mean) ** 2 / double_variance
+                class_probabilities[class_label] += max(log_density, MIN_LOG_LIKELIHOOD)
         
         # Converte de log-space para probabilidades normalizadas
         max_log_prob = max(class_probabilities.values())
@@ -186,16 +579,27 @@ class NaiveBayesClassifier:
         
         return predicted_class, confidence
     
-    def predict_batch(self, X):
+    def predict_batch(self, X, vectorized=True):
         """
         Faz predições para múltiplas amostras
         
+        Com NumPy disponível (e vectorized=True) o lote inteiro é avaliado
+        de uma vez por predict_proba_batch; caso contrário, amostra a amostra.
+        
         Args:
             X (list): Lista de amostras
+            vectorized (bool): Se deve usar o caminho NumPy quando disponível
         
         Returns:
             list: Lista de predições
         """
+        if vectorized and np is not None and len(X) > 0:
+            probabilities = self.predict_proba_batch(X)
+            best = probabilities.argmax(axis=1)
+            confidences = probabilities[np.arange(len(best)), best]
+            return [{'class': self.class_list[column], 'confidence': float(confidence)}
+                    for column, confidence in zip(best.tolist(), confidences.tolist())]
+        
         predictions = []
         for sample in X:
             predicted_class, confidence = self.predict(sample)
@@ -207,6 +611,8 @@ class NaiveBayesClassifier:
         """Retorna importância das features baseada na variância entre classes"""
         if not self.trained:
             raise ValueError("Modelo deve ser treinado primeiro")
+        self._materialize()
+        self._resolve_feature_types()
         
         importance = {}
         
@@ -217,8 +623,7 @@ class NaiveBayesClassifier:
                 for class_label in self.classes:
                     stats = self.feature_stats[feature_idx][class_label]
                     if stats['count'] > 0:
-                        mean = stats['sum'] / stats['count']
-                        means.append(mean)
+                        means.append(stats['mean'])
                 
                 if len(means) > 1:
                     # Variância das médias como medida de importância
@@ -244,6 +649,643 @@ class NaiveBayesClassifier:
                 importance[f'feature_{feature_idx}'] = total_entropy
         
         return importance
+    
+    def save(self, path):
+        """
+        Salva o modelo em um diretório de arquivos .npy + JSON
+        
+        Grava as tabelas compiladas (as mesmas de predict_batch) e as
+        estatísticas suficientes como arrays, um .npy por array, e os
+        vocabulários categóricos como uma tabela JSON (valor na posição
+        do seu código). Arquivos .npy separados permitem carregar com mmap.
+        As classes vão para um .npy tipado (sem pickle), então voltam com o
+        mesmo tipo, inclusive escalares NumPy.
+        
+        Args:
+            path (str): Diretório de destino (criado se não existir)
+        
+        Raises:
+            ValueError: Classes que não cabem em um array tipado (tuplas,
+                tipos misturados) ou valores categóricos que mudariam de
+                tipo em JSON; nada é gravado
+        """
+        if np is None:
+            raise ImportError("save requer NumPy")
+        if not self.trained:
+            raise ValueError("Modelo deve ser treinado antes de ser salvo")
+        self._materialize()
+        if self.arrays is None or not self.finalized:
+            self._build_arrays()
+        labels, numpy_labels = self._class_list_array()
+        for feature_idx, vocabulary, _ in self.arrays['categorical']:
+            invalid = next((value for value in vocabulary if type(value) not in JSON_VALUE_TYPES), None)
+            if invalid is not None:
+                raise ValueError(f"Feature {feature_idx}: valor categórico {invalid!r} do tipo "
+                                 f"{type(invalid).__name__} não pode ser salvo em JSON sem mudar de tipo")
+        os.makedirs(path, exist_ok=True)
+        
+        arrays = {name: self.arrays[name] for name in self.SAVED_ARRAYS}
+        num_classes = len(self.class_list)
+        
+        vocabularies, categorical = {}, []
+        for feature_idx, vocabulary, log_likelihoods in self.arrays['categorical']:
+            counts = np.zeros((len(vocabulary), num_classes), dtype=np.int64)
+            for column, label in enumerate(self.class_list):
+                for value, count in self.feature_counts[feature_idx][label].items():
+                    counts[vocabulary[value], column] = count
+            arrays[f'categorical_{feature_idx}_log_likelihoods'] = log_likelihoods
+            arrays[f'categorical_{feature_idx}_counts'] = counts
+            vocabularies[str(feature_idx)] = list(vocabulary)  # dicts preservam a ordem dos códigos
+            categorical.append(feature_idx)
+        
+        continuous = self.arrays['continuous']
+        for field in ('count', 'mean', 'm2'):
+            arrays[f'stats_{field}'] = np.array(
+                [[self.feature_stats[feature_idx][label][field] if label in self.feature_stats[feature_idx] else 0
+                  for label in self.class_list] for feature_idx in continuous],
+                dtype=np.int64 if field == 'count' else np.float64,
+            ).reshape(len(continuous), num_classes)
+        
+        for name, values in arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), np.ascontiguousarray(values), allow_pickle=False)
+        np.save(os.path.join(path, CLASS_LIST_FILE), labels, allow_pickle=False)
+        
+        metadata = {
+            'version': FORMAT_VERSION,
+            'numpy_labels': numpy_labels,
+            'class_counts': [self.class_counts[label] for label in self.class_list],
+            'total_samples': self.total_samples,
+            'feature_types': [[feature_idx, feature_type] for feature_idx, feature_type in sorted(self.feature_types.items())],
+            'categorical': categorical,
+            'continuous': continuous,
+            'schema': [[feature_idx, feature_type] for feature_idx, feature_type in sorted(self.schema.items())],
+            'type_sample_size': self.type_sample_size,
+            'max_categories': self.max_categories,
+        }
+        with open(os.path.join(path, METADATA_FILE), 'w', encoding='utf-8') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2)
+        with open(os.path.join(path, VOCABULARY_FILE), 'w', encoding='utf-8') as vocabulary_file:
+            json.dump(vocabularies, vocabulary_file, ensure_ascii=False)
+    
+    def _class_list_array(self):
+        """
+        Classes como array NumPy tipado, para np.save sem pickle
+        
+        Todas as classes precisam ter o mesmo tipo: str, int, float, bool
+        ou um escalar NumPy. O array é conferido na volta (valores e tipos),
+        como load o lerá.
+        
+        Returns:
+            tuple: (array, se as classes são escalares NumPy)
+        """
+        label_types = {type(label) for label in self.class_list}
+        if len(label_types) != 1:
+            names = sorted(label_type.__name__ for label_type in label_types)
+            raise ValueError(f"Classes de tipos diferentes não podem ser salvas: {names}")
+        label_type = label_types.pop()
+        numpy_labels = issubclass(label_type, np.generic)
+        if not numpy_labels and label_type not in (str, int, float, bool):
+            raise ValueError(f"Classes do tipo {label_type.__name__} não podem ser salvas "
+                             f"(use str, int, float, bool ou escalares NumPy)")
+        
+        try:
+            labels = np.array(self.class_list)
+        except OverflowError:
+            labels = None
+        if labels is not None and labels.dtype != object and labels.ndim == 1:
+            restored = list(labels) if numpy_labels else labels.tolist()
+            if all(type(back) is label_type and back == label
+                   for back, label in zip(restored, self.class_list)):
+                return labels, numpy_labels
+        raise ValueError(f"Classes do tipo {label_type.__name__} não voltam idênticas de um array tipado")
+    
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Carrega um modelo gravado por save, sem retreinar
+        
+        As tabelas compiladas são usadas diretamente por predict_batch;
+        com mmap=True os arrays são mapeados em memória somente leitura,
+        e vários processos servindo o mesmo modelo compartilham as
+        páginas do sistema operacional. As tabelas em dicionário (predict,
+        partial_fit) só são reconstruídas no primeiro uso. Os tipos das
+        features ficam fixos no modelo carregado (sem período de prova:
+        valor não numérico em feature contínua gera ValueError).
+        
+        Args:
+            path (str): Diretório gravado por save
+            mmap (bool): Se deve mapear os arrays em vez de lê-los
+        
+        Returns:
+            NaiveBayesClassifier: Modelo pronto para predição
+        """
+        if np is None:
+            raise ImportError("load requer NumPy")
+        with open(os.path.join(path, METADATA_FILE), encoding='utf-8') as metadata_file:
+            metadata = json.load(metadata_file)
+        if metadata['version'] != FORMAT_VERSION:
+            raise ValueError(f"Versão de formato não suportada: {metadata['version']}")
+        with open(os.path.join(path, VOCABULARY_FILE), encoding='utf-8') as vocabulary_file:
+            vocabularies = json.load(vocabulary_file)
+        
+        def load_array(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None,
+                           allow_pickle=False)
+        
+        classifier = cls(dict(metadata['schema']), metadata['type_sample_size'], metadata['max_categories'])
+        labels = np.load(os.path.join(path, CLASS_LIST_FILE), allow_pickle=False)
+        classifier.class_list = list(labels) if metadata['numpy_labels'] else labels.tolist()
+        classifier.classes = set(classifier.class_list)
+        classifier.class_counts.update(zip(classifier.class_list, metadata['class_counts']))
+        classifier.total_samples = metadata['total_samples']
+        classifier.feature_types = {feature_idx: feature_type for feature_idx, feature_type in metadata['feature_types']}
+        
+        categorical, category_counts = [], {}
+        for feature_idx in metadata['categorical']:
+            values = vocabularies[str(feature_idx)]
+            vocabulary = {value: code for code, value in enumerate(values)}
+            categorical.append((feature_idx, vocabulary, load_array(f'categorical_{feature_idx}_log_likelihoods')))
+            category_counts[feature_idx] = load_array(f'categorical_{feature_idx}_counts')
+        
+        classifier.arrays = {name: load_array(name) for name in cls.SAVED_ARRAYS}
+        classifier.arrays['categorical'] = categorical
+        classifier.arrays['continuous'] = metadata['continuous']
+        classifier.loaded_arrays = {
+            'category_counts': category_counts,
+            'stats': {field: load_array(f'stats_{field}') for field in ('count', 'mean', 'm2')},
+        }
+        classifier.trained = classifier.total_samples > 0
+        classifier.finalized = True
+        return classifier
+    
+    def _materialize(self):
+        """
+        Reconstrói contagens, estatísticas e tabelas em dicionário de um modelo carregado
+        
+        Os valores coincidem com os de finalize(): a tabela de cada classe
+        só tem os valores vistos nela; os demais caem em log_unseen.
+        """
+        if self.loaded_arrays is None:
+            return
+        loaded, self.loaded_arrays = self.loaded_arrays, None
+        arrays = self.arrays
+        
+        self.log_priors = dict(zip(self.class_list, arrays['log_priors'].tolist()))
+        
+        for feature_idx, vocabulary, log_likelihoods in arrays['categorical']:
+            counts = loaded['category_counts'][feature_idx]
+            self.vocabulary_sizes[feature_idx] = len(vocabulary)
+            self.log_likelihood_tables[feature_idx] = {}
+            self.log_unseen[feature_idx] = {}
+            for column, label in enumerate(self.class_list):
+                class_counts = counts[:, column].tolist()
+                class_log_likelihoods = log_likelihoods[:, column].tolist()
+                seen = [(value, count, log_likelihood) for value, count, log_likelihood
+                        in zip(vocabulary, class_counts, class_log_likelihoods) if count]
+                self.feature_counts[feature_idx][label].update((value, count) for value, count, _ in seen)
+                self.log_likelihood_tables[feature_idx][label] = {value: ll for value, _, ll in seen}
+                self.log_unseen[feature_idx][label] = class_log_likelihoods[-1]
+        
+        stats = loaded['stats']
+        for row, feature_idx in enumerate(arrays['continuous']):
+            self.gaussian_tables[feature_idx] = {}
+            for column, label in enumerate(self.class_list):
+                count = int(stats['count'][row, column])
+                if count:
+                    self.feature_stats[feature_idx][label] = {
+                        'count': count,
+                        'mean': float(stats['mean'][row, column]),
+                        'm2': float(stats['m2'][row, column]),
+                    }
+                    self.gaussian_tables[feature_idx][label] = (
+                        float(arrays['means'][row, column]),
+                        float(arrays['double_variances'][row, column]),
+                        float(arrays['log_coefficients'][row, column]),
+                    )
+                else:
+                    self.gaussian_tables[feature_idx][label] = None
+
+
+class NaiveBayesStatistics:
+    """
+    Estatísticas suficientes do Naive Bayes, mergeáveis
+    
+    Contagens são somadas e as estatísticas Gaussianas (count, mean, m2)
+    são combinadas pela fórmula paralela de Chan. Usa apenas dicts
+    simples, então pode ser enviado entre processos (pickle).
+    """
+    
+    def __init__(self):
+        self.total_samples = 0
+        self.class_counts = {}  # classe -> contagem
+        self.feature_types = {}  # feature -> 'categorical' ou 'continuous'
+        self.feature_counts = {}  # feature -> classe -> {valor: contagem}
+        self.feature_stats = {}  # feature -> classe -> (count, mean, m2)
+        self.distinct_values = {}  # feature numérica indecisa -> valores distintos
+        self.probation = set()  # features numéricas inferidas que ainda contam valores
+    
+    @classmethod
+    def from_classifier(cls, classifier):
+        """Extrai as estatísticas de um classificador treinado"""
+        classifier._materialize()
+        statistics = cls()
+        statistics.total_samples = classifier.total_samples
+        statistics.class_counts = dict(classifier.class_counts)
+        statistics.feature_types = dict(classifier.feature_types)
+        statistics.feature_counts = {
+            feature_idx: {label: dict(counts) for label, counts in per_class.items()}
+            for feature_idx, per_class in classifier.feature_counts.items()
+        }
+        statistics.feature_stats = {
+            feature_idx: {label: (stats['count'], stats['mean'], stats['m2'])
+                          for label, stats in per_class.items() if stats['count'] > 0}
+            for feature_idx, per_class in classifier.feature_stats.items()
+        }
+        statistics.distinct_values = {feature_idx: set(values)
+                                      for feature_idx, values in classifier.distinct_values.items()}
+        statistics.probation = set(classifier.probation)
+        return statistics
+    
+    def merge(self, other):
+        """
+        Soma as estatísticas de outro objeto neste (in-place)
+        
+        Uma feature indecisa nas duas partes continua indecisa (união dos
+        valores distintos); decidida em uma delas, vale a decisão. Se foi
+        rebaixada para categórica em qualquer parte, fica categórica; só
+        continua em período de prova se estiver nele nas duas partes.
+        
+        Returns:
+            NaiveBayesStatistics: self, para encadear
+        """
+        self.total_samples += other.total_samples
+        for label, count in other.class_counts.items():
+            self.class_counts[label] = self.class_counts.get(label, 0) + count
+        
+        for feature_idx, feature_type in other.feature_types.items():
+            other_distinct = other.distinct_values.get(feature_idx)
+            if feature_idx not in self.feature_types:
+                self.feature_types[feature_idx] = feature_type
+                if other_distinct is not None:
+                    self.distinct_values[feature_idx] = set(other_distinct)
+                if feature_idx in other.probation:
+                    self.probation.add(feature_idx)
+                continue
+            if feature_idx not in other.probation:
+                self.probation.discard(feature_idx)
+            if feature_idx in self.distinct_values:
+                if other_distinct is not None:
+                    self.distinct_values[feature_idx] |= other_distinct
+                else:
+                    del self.distinct_values[feature_idx]
+                    self.feature_types[feature_idx] = feature_type
+            elif other_distinct is None and feature_type == 'categorical':
+                self.feature_types[feature_idx] = 'categorical'
+        
+        for feature_idx, per_class in other.feature_counts.items():
+            merged_feature = self.feature_counts.setdefault(feature_idx, {})
+            for label, counts in per_class.items():
+                merged_counts = merged_feature.setdefault(label, {})
+                for value, count in counts.items():
+                    merged_counts[value] = merged_counts.get(value, 0) + count
+        
+        for feature_idx, per_class in other.feature_stats.items():
+            merged_feature = self.feature_stats.setdefault(feature_idx, {})
+            for label, (count_b, mean_b, m2_b) in per_class.items():
+                if label not in merged_feature:
+                    merged_feature[label] = (count_b, mean_b, m2_b)
+                    continue
+                
+                # Chan et al.: combina (n_a, μ_a, M2_a) com (n_b, μ_b, M2_b)
+                count_a, mean_a, m2_a = merged_feature[label]
+                count = count_a + count_b
+                delta = mean_b - mean_a
+                mean = mean_a + delta * count_b / count
+                m2 = m2_a + m2_b + delta * delta * count_a * count_b / count
+                merged_feature[label] = (count, mean, m2)
+        
+        return self
+    
+    def apply_to(self, classifier):
+        """Carrega as estatísticas em um classificador (substituindo as dele)"""
+        classifier.total_samples = self.total_samples
+        classifier.classes = set(self.class_counts)
+        classifier.class_counts = defaultdict(int, self.class_counts)
+        classifier.feature_types = dict(self.feature_types)
+        
+        classifier.feature_counts = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        for feature_idx, per_class in self.feature_counts.items():
+            for label, counts in per_class.items():
+                classifier.feature_counts[feature_idx][label].update(counts)
+        
+        classifier.feature_stats = defaultdict(lambda: defaultdict(lambda: {'count': 0, 'mean': 0.0, 'm2': 0.0}))
+        for feature_idx, per_class in self.feature_stats.items():
+            for label, (count, mean, m2) in per_class.items():
+                classifier.feature_stats[feature_idx][label] = {'count': count, 'mean': mean, 'm2': m2}
+        
+        classifier.distinct_values = {feature_idx: set(values) for feature_idx, values in self.distinct_values.items()}
+        classifier.probation = set(self.probation)
+        classifier.trained = self.total_samples > 0
+        classifier.finalized = False
+
+
+def _fit_shard(X_shard, y_shard, feature_types, undecided, schema, max_categories):
+    """Etapa map do fit_parallel: treina um bloco e devolve estatísticas picklable"""
+    classifier = NaiveBayesClassifier(schema, max_categories=max_categories)
+    classifier.feature_types = feature_types
+    classifier.distinct_values = {feature_idx: set() for feature_idx in undecided}
+    classifier.probation = set(undecided)
+    classifier.partial_fit(X_shard, y_shard)
+    return NaiveBayesStatistics.from_classifier(classifier)
+
+
+class SparseMatrix:
+    """
+    Matriz esparsa em formato CSR (linhas comprimidas)
+    
+    Os termos da linha i são indices[indptr[i]:indptr[i+1]], com as
+    contagens correspondentes em data. Só os valores não nulos ocupam
+    memória, então o número de colunas pode ser da ordem de milhões.
+    """
+    
+    def __init__(self, data, indices, indptr, n_columns):
+        self.data = np.asarray(data, dtype=np.float64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.n_columns = n_columns
+    
+    @property
+    def shape(self):
+        return (len(self.indptr) - 1, self.n_columns)
+    
+    def __len__(self):
+        return len(self.indptr) - 1
+    
+    def row_ids(self):
+        """Linha de cada valor não nulo"""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+    
+    def binarize(self):
+        """Cópia com presença/ausência (1.0) no lugar das contagens"""
+        return SparseMatrix(np.ones_like(self.data), self.indices, self.indptr, self.n_columns)
+    
+    def dot(self, dense):
+        """
+        Produto esparso × denso
+        
+        Args:
+            dense (np.ndarray): Matriz (n_columns, k)
+        
+        Returns:
+            np.ndarray: Matriz (linhas, k)
+        """
+        # Cada não nulo contribui data × linha de dense; somamos por linha
+        contributions = dense[self.indices] * self.data[:, np.newaxis]
+        rows = self.row_ids()
+        return np.column_stack([np.bincount(rows, weights=contributions[:, column], minlength=len(self))
+                                for column in range(dense.shape[1])])
+
+
+class HashingVectorizer:
+    """
+    Converte documentos em contagens de termos com feature hashing
+    
+    Cada token vai para a coluna crc32(token) % n_features: não há
+    vocabulário para guardar e o hash é estável entre processos.
+    Colisões somam contagens de termos diferentes na mesma coluna.
+    """
+    
+    TOKEN_PATTERN = re.compile(r'\w+')
+    
+    def __init__(self, n_features=2 ** 20, lowercase=True):
+        self.n_features = n_features
+        self.lowercase = lowercase
+    
+    def tokenize(self, document):
+        """Divide um documento em tokens alfanuméricos"""
+        if self.lowercase:
+            document = document.lower()
+        return self.TOKEN_PATTERN.findall(document)
+    
+    def transform(self, documents):
+        """
+        Vetoriza uma lista de documentos
+        
+        Args:
+            documents (list): Textos (str) ou listas de tokens
+        
+        Returns:
+            SparseMatrix: Contagens (documentos × n_features)
+        """
+        data, indices, indptr = [], [], [0]
+        for document in documents:
+            tokens = self.tokenize(document) if isinstance(document, str) else document
+            counts = Counter(zlib.crc32(token.encode('utf-8')) % self.n_features for token in tokens)
+            columns = sorted(counts)
+            indices.extend(columns)
+            data.extend(counts[column] for column in columns)
+            indptr.append(len(indices))
+        
+        return SparseMatrix(data, indices, indptr, self.n_features)
+
+
+class MultinomialNB:
+    """
+    Naive Bayes multinomial para texto (bag-of-words esparso)
+    
+    Guarda apenas uma matriz densa (classes × n_features) de contagens de
+    termos; com n_features = 2^20 são 8 MB por classe, independente do
+    tamanho real do vocabulário. A log-verossimilhança de um lote é um
+    produto esparso X · log P(termo|classe)ᵀ.
+    """
+    
+    def __init__(self, alpha=1.0, n_features=2 ** 20, vectorizer=None):
+        """
+        Args:
+            alpha (float): Suavização de Laplace/Lidstone
+            n_features (int): Colunas do hashing (ignorado se vectorizer for dado)
+            vectorizer (HashingVectorizer): Vetorizador para entradas em texto
+        """
+        if np is None:
+            raise ImportError("MultinomialNB requer NumPy")
+        
+        self.alpha = alpha
+        self.vectorizer = vectorizer or HashingVectorizer(n_features)
+        self.n_features = self.vectorizer.n_features
+        self.class_list = []
+        self.class_counts = np.zeros(0, dtype=np.int64)
+        self.feature_counts = np.zeros((0, self.n_features))  # classe × termo
+        self.total_samples = 0
+        self.trained = False
+        
+        # Tabelas de predição montadas por finalize()
+        self.finalized = False
+        self.log_priors = None
+        self.feature_log_prob = None  # termo × classe (linhas contíguas para o gather)
+    
+    def _prepare(self, X):
+        """Converte a entrada em SparseMatrix de contagens"""
+        if isinstance(X, SparseMatrix):
+            if X.n_columns != self.n_features:
+                raise ValueError(f"Esperado {self.n_features} colunas, recebido {X.n_columns}")
+            return X
+        return self.vectorizer.transform(X)
+    
+    def fit(self, X, y):
+        """
+        Treina o modelo
+        
+        Args:
+            X (list | SparseMatrix): Documentos ou contagens já vetorizadas
+            y (list): Classes correspondentes
+        """
+        self.__init__(self.alpha, vectorizer=self.vectorizer)
+        self.partial_fit(X, y)
+        self.finalize()
+    
+    def partial_fit(self, X, y):
+        """
+        Acumula contagens de um lote (treino incremental)
+        
+        Classes novas ganham uma linha zerada na matriz de contagens.
+        """
+        matrix = self._prepare(X)
+        if len(matrix) != len(y):
+            raise ValueError("X e y devem ter o mesmo número de amostras")
+        
+        class_index = {label: column for column, label in enumerate(self.class_list)}
+        for label in y:
+            if label not in class_index:
+                class_index[label] = len(self.class_list)
+                self.class_list.append(label)
+        
+        n_classes = len(self.class_list)
+        if n_classes > len(self.class_counts):
+            new_rows = n_classes - len(self.class_counts)
+            self.class_counts = np.concatenate([self.class_counts, np.zeros(new_rows, dtype=np.int64)])
+            self.feature_counts = np.vstack([self.feature_counts, np.zeros((new_rows, self.n_features))])
+        
+        codes = np.fromiter((class_index[label] for label in y), dtype=np.int64, count=len(y))
+        self.class_counts += np.bincount(codes, minlength=n_classes)
+        
+        # Soma por (classe, termo) em uma única passada sobre os não nulos
+        flat = codes[matrix.row_ids()] * self.n_features + matrix.indices
+        self.feature_counts += np.bincount(flat, weights=matrix.data,
+                                           minlength=n_classes * self.n_features).reshape(n_classes, -1)
+        
+        self.total_samples += len(y)
+        if len(y):
+            self.trained = True
+            self.finalized = False
+    
+    def finalize(self):
+        """Monta log P(classe) e log P(termo|classe) suavizados"""
+        self.log_priors = np.log(self.class_counts) - math.log(self.total_samples)
+        smoothed = self.feature_counts + self.alpha
+        log_prob = np.log(smoothed) - np.log(smoothed.sum(axis=1, keepdims=True))
+        self.feature_log_prob = np.ascontiguousarray(log_prob.T)
+        self.finalized = True
+    
+    def joint_log_likelihood_batch(self, X):
+        """
+        Log-probabilidade conjunta (não normalizada) de cada documento
+        
+        Returns:
+            np.ndarray: Matriz (n, classes) na ordem de class_list
+        """
+        if not self.trained:
+            raise ValueError("Modelo deve ser treinado antes de fazer predições")
+        if not self.finalized:
+            self.finalize()
+        return self._prepare(X).dot(self.feature_log_prob) + self.log_priors
+    
+    def predict_proba_batch(self, X):
+        """Probabilidades normalizadas (n, classes) por log-sum-exp"""
+        joint = self.joint_log_likelihood_batch(X)
+        joint -= joint.max(axis=1, keepdims=True)
+        probabilities = np.exp(joint)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+    
+    def predict_batch(self, X):
+        """
+        Faz predições para múltiplos documentos
+        
+        Returns:
+            list: [{'class': ..., 'confidence': ...}]
+        """
+        probabilities = self.predict_proba_batch(X)
+        best = probabilities.argmax(axis=1)
+        confidences = probabilities[np.arange(len(best)), best]
+        return [{'class': self.class_list[column], 'confidence': float(confidence)}
+                for column, confidence in zip(best.tolist(), confidences.tolist())]
+    
+    def predict(self, document):
+        """
+        Faz predição para um documento
+        
+        Returns:
+            tuple: (classe_predita, confiança)
+        """
+        prediction = self.predict_batch([document])[0]
+        return prediction['class'], prediction['confidence']
+
+
+class BernoulliNB(MultinomialNB):
+    """
+    Naive Bayes de Bernoulli para texto: modela presença/ausência de termos
+    
+    Os termos ausentes também contam, mas sem densificar a entrada:
+    Σ log(1−p) por classe é pré-calculado e o produto esparso só corrige
+    os termos presentes com log p − log(1−p).
+    """
+    
+    def _prepare(self, X):
+        return super()._prepare(X).binarize()
+    
+    def finalize(self):
+        """Monta log P(classe), log p e a soma de log(1−p) por classe"""
+        self.log_priors = np.log(self.class_counts) - math.log(self.total_samples)
+        # feature_counts guarda em quantos documentos da classe o termo aparece
+        probabilities = (self.feature_counts + self.alpha) / (self.class_counts[:, np.newaxis] + 2 * self.alpha)
+        log_absent = np.log1p(-probabilities)
+        self.feature_log_prob = np.ascontiguousarray((np.log(probabilities) - log_absent).T)
+        self.log_absent_sum = log_absent.sum(axis=1)
+        self.finalized = True
+    
+    def joint_log_likelihood_batch(self, X):
+        return super().joint_log_likelihood_batch(X) + self.log_absent_sum
+
+
+def read_csv_chunks(path, chunk_size=10000, label_index=-1, has_header=True):
+    """
+    Lê um CSV em lotes para treino out-of-core com partial_fit
+    
+    Args:
+        path (str): Caminho do arquivo
+        chunk_size (int): Linhas por lote
+        label_index (int): Coluna da classe
+        has_header (bool): Se a primeira linha é cabeçalho
+    
+    Yields:
+        tuple: (X_chunk, y_chunk)
+    """
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        reader = csv.reader(csv_file)
+        if has_header:
+            next(reader, None)
+        
+        X_chunk, y_chunk = [], []
+        for row in reader:
+            label = row.pop(label_index)
+            X_chunk.append(row)
+            y_chunk.append(label)
+            if len(y_chunk) == chunk_size:
+                yield X_chunk, y_chunk
+                X_chunk, y_chunk = [], []
+        
+        if y_chunk:
+            yield X_chunk, y_chunk
 
 
 def load_iris_dataset():
@@ -428,3 +1470,14 @@ if __name__ == "__main__":
     print(f"  Total de amostras: {nb_text.total_samples}")
     print(f"  Número de classes: {len(nb_text.classes)}")
     print(f"  Número de features: {len(nb_text.feature_types)}")
+    
+    # Teste 3: Texto livre com bag-of-words esparso
+    print(f"\n=== Teste 3: MultinomialNB com Feature Hashing ===")
+    
+    documents = [' '.join(sample) for sample in X_text]
+    nb_sparse = MultinomialNB(n_features=2 ** 16)
+    nb_sparse.fit(documents, y_text)
+    
+    for document in ['filme bom e legal', 'final chato e terrível']:
+        predicted_class, confidence = nb_sparse.predict(document)
+        print(f"  '{document}' → {predicted_class} (confiança: {confidence:.3f})")
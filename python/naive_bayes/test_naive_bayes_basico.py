@@ -0,0 +1,171 @@
+"""
+Testes do classificador Naive Bayes básico
+Executar: python -m unittest test_naive_bayes_basico (a partir deste diretório)
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import numpy as np
+
+from naive_bayes_basico import NaiveBayesClassifier
+
+
+class TestFeatureTypeInference(unittest.TestCase):
+    def setUp(self):
+        # Coluna inteira de cardinalidade média (a classe depende do código) + ruído Gaussiano
+        rng = random.Random(0)
+        codes = [rng.randrange(2000) for _ in range(20000)]
+        self.X = [[code, rng.gauss(0, 1)] for code in codes]
+        self.y = ['impar' if code % 2 else 'par' for code in codes]
+
+    def test_mid_cardinality_integer_column_is_categorical(self):
+        # Na coluna inteira a razão de únicos é 0.1; numa amostra de 1000 linhas seria > 0.5
+        X, y = self.X, self.y
+        nb = NaiveBayesClassifier(type_sample_size=1000)
+        nb.fit(X, y)
+
+        self.assertEqual(nb.feature_types, {0: 'categorical', 1: 'continuous'})
+        accuracy = sum(nb.predict(x)[0] == label for x, label in zip(X[:500], y[:500])) / 500
+        self.assertEqual(accuracy, 1.0)
+
+    def test_types_do_not_depend_on_chunk_size(self):
+        X, y = self.X, self.y
+        for chunk_size in (500, 3000, len(X)):
+            nb = NaiveBayesClassifier()
+            for start in range(0, len(X), chunk_size):
+                nb.partial_fit(X[start:start + chunk_size], y[start:start + chunk_size])
+            nb.finalize()
+            self.assertEqual(nb.feature_types, {0: 'categorical', 1: 'continuous'}, chunk_size)
+
+    def test_max_categories_makes_feature_continuous(self):
+        X, y = self.X, self.y
+        nb = NaiveBayesClassifier(max_categories=100)
+        nb.fit(X, y)
+        self.assertEqual(nb.feature_types[0], 'continuous')
+        self.assertNotIn(0, nb.distinct_values)
+        # Em período de prova: as contagens continuam completas
+        self.assertEqual(sum(sum(counts.values()) for counts in nb.feature_counts[0].values()), len(X))
+
+    def test_late_non_numeric_value_demotes_without_losing_counts(self):
+        X, y = self.X, self.y
+        X[-1][0] = 'desconhecido'
+        nb = NaiveBayesClassifier()
+        nb.fit(X, y)
+        self.assertEqual(nb.feature_types[0], 'categorical')
+        self.assertEqual(sum(sum(counts.values()) for counts in nb.feature_counts[0].values()), len(X))
+
+    def test_non_numeric_value_after_first_chunk_keeps_earlier_chunks(self):
+        X, y = self.X, self.y
+        X[-1][0] = 'desconhecido'
+        # max_categories pequeno: a coluna já é contínua quando o valor não numérico chega
+        full = NaiveBayesClassifier(max_categories=100)
+        full.fit(X, y)
+        chunked = NaiveBayesClassifier(max_categories=100)
+        for start in range(0, len(X), 3000):
+            chunked.partial_fit(X[start:start + 3000], y[start:start + 3000])
+        chunked.finalize()
+
+        self.assertEqual(chunked.feature_types[0], 'categorical')
+        for label in full.classes:
+            self.assertEqual(chunked.feature_counts[0][label], full.feature_counts[0][label])
+        self.assertEqual(sum(sum(counts.values()) for counts in chunked.feature_counts[0].values()), len(X))
+        self.assertEqual([p['class'] for p in chunked.predict_batch(X[:500])],
+                         [p['class'] for p in full.predict_batch(X[:500])])
+
+    def test_schema_overrides_inference(self):
+        nb = NaiveBayesClassifier(schema={0: 'continuous'})
+        nb.fit(self.X[:2000], self.y[:2000])
+        self.assertEqual(nb.feature_types[0], 'continuous')
+
+
+class TestPartialFit(unittest.TestCase):
+    def setUp(self):
+        # Uma feature categórica em texto, um código numérico e uma Gaussiana deslocada pela classe
+        rng = random.Random(1)
+        self.y = [rng.choice(['a', 'b', 'c']) for _ in range(3000)]
+        self.X = [[rng.choice(['x', 'y', label]), rng.randrange(5), rng.gauss(ord(label) - ord('a'), 1)]
+                  for label in self.y]
+
+    def test_empty_batch_changes_nothing(self):
+        nb = NaiveBayesClassifier()
+        nb.fit(self.X, self.y)
+        before = nb.predict_batch(self.X[:200])
+
+        nb.partial_fit([], [])
+
+        self.assertTrue(nb.finalized)
+        self.assertEqual(nb.total_samples, len(self.y))
+        self.assertEqual(nb.predict_batch(self.X[:200]), before)
+
+    def test_partial_fit_after_fit_matches_fresh_retrain(self):
+        incremental = NaiveBayesClassifier()
+        incremental.fit(self.X[:1000], self.y[:1000])
+        incremental.predict_batch(self.X[:10])  # Tabelas compiladas antes do lote novo
+        for start in range(1000, len(self.y), 700):
+            incremental.partial_fit(self.X[start:start + 700], self.y[start:start + 700])
+        incremental.finalize()
+        fresh = NaiveBayesClassifier()
+        fresh.fit(self.X, self.y)
+
+        self.assertEqual(incremental.feature_types, fresh.feature_types)
+        self.assertEqual(dict(incremental.class_counts), dict(fresh.class_counts))
+        for feature_idx in (0, 1):
+            for label in fresh.classes:
+                self.assertEqual(incremental.feature_counts[feature_idx][label],
+                                 fresh.feature_counts[feature_idx][label])
+        for label in fresh.classes:
+            got, expected = incremental.feature_stats[2][label], fresh.feature_stats[2][label]
+            self.assertEqual(got['count'], expected['count'])
+            self.assertAlmostEqual(got['mean'], expected['mean'], places=10)
+            self.assertAlmostEqual(got['m2'], expected['m2'], places=6)
+        self.assertEqual([p['class'] for p in incremental.predict_batch(self.X)],
+                         [p['class'] for p in fresh.predict_batch(self.X)])
+
+
+class TestSaveLoad(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(2)
+        codes = [rng.randrange(20) for _ in range(2000)]
+        self.X = [[code, rng.gauss(0, 1)] for code in codes]
+        self.y = ['impar' if code % 2 else 'par' for code in codes]
+    def _round_trip(self, nb):
+        with tempfile.TemporaryDirectory() as path:
+            nb.save(path)
+            return NaiveBayesClassifier.load(path, mmap=False)
+
+    def test_numpy_labels_keep_their_type(self):
+        X, y = self.X, self.y
+        for labels in (np.array([len(label) for label in y]), np.array(y)):
+            nb = NaiveBayesClassifier()
+            nb.fit(X, list(labels))
+            loaded = self._round_trip(nb)
+            for expected, got in zip(nb.predict_batch(X[:200]), loaded.predict_batch(X[:200])):
+                self.assertEqual(got['class'], expected['class'])
+                self.assertIs(type(got['class']), type(expected['class']))
+            self.assertEqual(loaded.predict(X[0])[0], nb.predict(X[0])[0])
+
+    def test_labels_that_do_not_round_trip_are_rejected(self):
+        X, y = self.X[:500], self.y[:500]
+        for labels in ([(label, 0) for label in y], [label if i % 2 else len(label) for i, label in enumerate(y)]):
+            nb = NaiveBayesClassifier()
+            nb.fit(X, labels)
+            with tempfile.TemporaryDirectory() as path:
+                with self.assertRaisesRegex(ValueError, 'Classes'):
+                    nb.save(path)
+                self.assertEqual(os.listdir(path), [])
+
+    def test_categorical_values_that_change_type_in_json_are_rejected(self):
+        X = [[np.int64(code), noise] for code, noise in self.X[:500]]
+        y = self.y[:500]
+        nb = NaiveBayesClassifier(schema={0: 'categorical'})
+        nb.fit(X, y)
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaisesRegex(ValueError, 'Feature 0'):
+                nb.save(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
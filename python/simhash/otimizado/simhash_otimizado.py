@@ -0,0 +1,380 @@
+"""
+SimHash - Implementação Otimizada
+=================================
+
+Armazenamento compacto e busca vetorizada de fingerprints SimHash.
+
+Cada objeto `SimHash` da versão básica é um objeto Python completo
+(dicionário de atributos + inteiro de precisão arbitrária), ocupando
+mais de 100 bytes para guardar apenas 8 bytes de fingerprint. Esta
+versão guarda os fingerprints em formato colunar:
+
+- Arquivo append-only de fingerprints uint64 (8 bytes por documento;
+  fingerprints de 128/256 bits usam 2/4 palavras uint64 por documento)
+- Arquivo paralelo de IDs de documento int64
+- Leitura via memória mapeada (np.memmap), sem copiar os dados para o heap
+- Distância de Hamming vetorizada (XOR + popcount) contra todo o armazém
+  em uma única chamada
+
+Com 16 bytes por documento, 100M de fingerprints ocupam ~1.6 GB e a
+varredura por força bruta roda na velocidade da banda de memória.
+
+Autor: Algorithms Repository
+"""
+
+import os
+import numpy as np
+from typing import Iterable, List, Tuple
+
+
+# Tabela de popcount por byte, usada quando np.bitwise_count não existe (NumPy < 2.0)
+_POPCOUNT_TABELA = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(valores: np.ndarray) -> np.ndarray:
+    """
+    Conta os bits 1 de cada elemento de um array uint64.
+
+    Args:
+        valores: Array uint64 de qualquer formato
+
+    Returns:
+        Array uint8 com o número de bits 1 de cada elemento
+    """
+    valores = np.ascontiguousarray(valores, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(valores)
+
+    # Fallback: soma a contagem de cada um dos 8 bytes via tabela
+    por_byte = _POPCOUNT_TABELA[valores.view(np.uint8)]
+    return por_byte.reshape(valores.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+
+def _valor_fingerprint(fingerprint) -> int:
+    """Aceita um objeto SimHash ou um inteiro e retorna o fingerprint inteiro"""
+    return int(getattr(fingerprint, 'hash_value', fingerprint))
+
+
+def _palavras(hash_bits: int) -> int:
+    """Número de palavras uint64 de um fingerprint de hash_bits bits"""
+    if hash_bits <= 0 or hash_bits % 64 != 0:
+        raise ValueError("hash_bits deve ser um múltiplo positivo de 64")
+    return hash_bits // 64
+
+
+def fingerprint_to_words(fingerprint, words: int) -> np.ndarray:
+    """
+    Divide um fingerprint em palavras uint64 (palavra 0 = bits menos significativos).
+
+    Args:
+        fingerprint: Objeto SimHash ou inteiro
+        words: Número de palavras de 64 bits
+
+    Returns:
+        Array uint64 de formato (words,)
+    """
+    valor = _valor_fingerprint(fingerprint)
+    if valor < 0 or valor >= (1 << (64 * words)):
+        raise ValueError(f"Fingerprint não cabe em {64 * words} bits")
+
+    mascara = (1 << 64) - 1
+    return np.array([(valor >> (64 * i)) & mascara for i in range(words)], dtype=np.uint64)
+
+
+def fingerprints_to_array(fingerprints: Iterable, hash_bits: int = 64) -> np.ndarray:
+    """
+    Converte vários fingerprints em uma matriz (n, hash_bits // 64) de uint64.
+
+    Args:
+        fingerprints: Iterável de objetos SimHash ou inteiros
+        hash_bits: Largura dos fingerprints (múltiplo de 64)
+
+    Returns:
+        Matriz uint64 com uma linha por fingerprint
+    """
+    words = _palavras(hash_bits)
+    linhas = [fingerprint_to_words(fp, words) for fp in fingerprints]
+    if not linhas:
+        return np.empty((0, words), dtype=np.uint64)
+    return np.vstack(linhas)
+
+
+def hamming_distances_words(matriz: np.ndarray, consulta: np.ndarray) -> np.ndarray:
+    """
+    Distância de Hamming entre uma consulta e cada linha de uma matriz multi-palavra.
+
+    Args:
+        matriz: Array uint64 de formato (n, k)
+        consulta: Array uint64 de formato (k,)
+
+    Returns:
+        Array uint16 com a distância de cada linha (XOR + popcount somado nas k palavras)
+    """
+    return popcount64(matriz ^ consulta).sum(axis=-1, dtype=np.uint16)
+
+
+class FingerprintStore:
+    """
+    Armazém colunar e persistente de fingerprints SimHash de 64·k bits.
+
+    Os dados ficam em dois arquivos binários brutos, sem cabeçalho:
+    `<caminho>.fp` (k palavras uint64 por documento) e `<caminho>.ids`
+    (int64). A largura não é gravada: reabra com o mesmo hash_bits. Novos fingerprints
+    são acumulados em um buffer e anexados ao final dos arquivos em
+    `flush()`; as consultas leem os arquivos através de np.memmap.
+    """
+
+    def __init__(self, path: str, hash_bits: int = 64, chunk_size: int = 1 << 20):
+        """
+        Abre (ou cria) um armazém de fingerprints.
+
+        Args:
+            path: Caminho base dos arquivos (sem extensão)
+            hash_bits: Largura dos fingerprints (64, 128, 256, ...)
+            chunk_size: Número de fingerprints processados por bloco na
+                varredura (limita a memória temporária do XOR)
+        """
+        self.path = path
+        self.hash_bits = hash_bits
+        self.words = _palavras(hash_bits)
+        self.chunk_size = chunk_size
+        self._fp_path = path + '.fp'
+        self._ids_path = path + '.ids'
+
+        # Buffers de escrita (append-only)
+        self._buffer_fp = []
+        self._buffer_ids = []
+
+        # Garante que os dois arquivos existem
+        for arquivo in (self._fp_path, self._ids_path):
+            if not os.path.exists(arquivo):
+                open(arquivo, 'wb').close()
+
+        if os.path.getsize(self._fp_path) != os.path.getsize(self._ids_path) * self.words:
+            raise ValueError("Arquivos de fingerprints e IDs estão inconsistentes")
+
+        self._fingerprints = None
+        self._doc_ids = None
+        self.closed = False
+        self._mapear()
+
+    def _verificar_aberto(self):
+        """Impede o uso do armazém depois de close()"""
+        if self.closed:
+            raise ValueError("store is closed")
+
+    def _mapear(self):
+        """(Re)mapeia os arquivos em memória após novas escritas"""
+        total = os.path.getsize(self._ids_path) // 8
+        if total == 0:
+            # np.memmap não aceita arquivos vazios
+            self._fingerprints = np.empty((0, self.words), dtype=np.uint64)
+            self._doc_ids = np.empty(0, dtype=np.int64)
+        else:
+            self._fingerprints = np.memmap(self._fp_path, dtype=np.uint64, mode='r',
+                                           shape=(total, self.words))
+            self._doc_ids = np.memmap(self._ids_path, dtype=np.int64, mode='r', shape=(total,))
+
+    def add(self, fingerprint, doc_id: int):
+        """
+        Adiciona um fingerprint ao buffer de escrita.
+
+        Args:
+            fingerprint: Objeto SimHash ou inteiro de hash_bits bits
+            doc_id: ID inteiro do documento
+        """
+        self._verificar_aberto()
+        self._buffer_fp.append(fingerprint_to_words(fingerprint, self.words))
+        self._buffer_ids.append(doc_id)
+
+    def add_many(self, fingerprints: Iterable, doc_ids: Iterable[int]):
+        """
+        Anexa muitos fingerprints de uma vez, direto nos arquivos.
+
+        Args:
+            fingerprints: Array uint64 de formato (n,) ou (n, k), ou
+                iterável de SimHash/inteiros
+            doc_ids: IDs inteiros dos documentos, na mesma ordem
+        """
+        self._verificar_aberto()
+        if isinstance(fingerprints, np.ndarray):
+            fps = fingerprints.astype(np.uint64, copy=False).reshape(-1, self.words)
+        else:
+            fps = fingerprints_to_array(fingerprints, self.hash_bits)
+        ids = np.asarray(doc_ids, dtype=np.int64)
+
+        if len(fps) != len(ids):
+            raise ValueError("fingerprints e doc_ids devem ter o mesmo tamanho")
+
+        self.flush()
+        self._anexar(fps, ids)
+        self._mapear()
+
+    def _anexar(self, fps: np.ndarray, ids: np.ndarray):
+        """Escreve os arrays no final dos arquivos"""
+        with open(self._fp_path, 'ab') as arquivo:
+            arquivo.write(np.ascontiguousarray(fps).tobytes())
+        with open(self._ids_path, 'ab') as arquivo:
+            arquivo.write(ids.tobytes())
+
+    def flush(self):
+        """Grava o buffer pendente nos arquivos e atualiza o mapeamento"""
+        self._verificar_aberto()
+        if not self._buffer_fp:
+            return
+
+        fps = np.vstack(self._buffer_fp)
+        ids = np.array(self._buffer_ids, dtype=np.int64)
+        self._buffer_fp = []
+        self._buffer_ids = []
+
+        self._anexar(fps, ids)
+        self._mapear()
+
+    def __len__(self):
+        self._verificar_aberto()
+        return len(self._fingerprints) + len(self._buffer_fp)
+
+    @property
+    def doc_ids(self) -> np.ndarray:
+        """Array (somente leitura) com os IDs de todos os documentos"""
+        self.flush()
+        return self._doc_ids
+
+    def hamming_distances(self, fingerprint) -> np.ndarray:
+        """
+        Calcula a distância de Hamming da consulta para todo o armazém.
+
+        Args:
+            fingerprint: Objeto SimHash ou inteiro de hash_bits bits
+
+        Returns:
+            Array uint16 com uma distância por fingerprint armazenado
+        """
+        self.flush()
+        consulta = fingerprint_to_words(fingerprint, self.words)
+        total = len(self._fingerprints)
+        distancias = np.empty(total, dtype=np.uint16)
+
+        # Varre em blocos para não materializar um XOR do tamanho do armazém
+        for inicio in range(0, total, self.chunk_size):
+            fim = min(inicio + self.chunk_size, total)
+            distancias[inicio:fim] = hamming_distances_words(self._fingerprints[inicio:fim], consulta)
+
+        return distancias
+
+    def query(self, fingerprint, max_distance: int) -> List[Tuple[int, int]]:
+        """
+        Retorna todos os documentos a no máximo `max_distance` bits da consulta.
+
+        Args:
+            fingerprint: Objeto SimHash ou inteiro de hash_bits bits
+            max_distance: Distância de Hamming máxima (inclusiva)
+
+        Returns:
+            Lista de (doc_id, distância) ordenada por distância
+        """
+        distancias = self.hamming_distances(fingerprint)
+        posicoes = np.flatnonzero(distancias <= max_distance)
+        posicoes = posicoes[np.argsort(distancias[posicoes], kind='stable')]
+
+        return [(int(self._doc_ids[p]), int(distancias[p])) for p in posicoes]
+
+    def nearest(self, fingerprint, k: int = 1) -> List[Tuple[int, int]]:
+        """
+        Retorna os k documentos mais próximos da consulta.
+
+        Args:
+            fingerprint: Objeto SimHash ou inteiro de hash_bits bits
+            k: Número de vizinhos
+
+        Returns:
+            Lista de (doc_id, distância) ordenada por distância
+        """
+        distancias = self.hamming_distances(fingerprint)
+        if len(distancias) == 0:
+            return []
+
+        k = min(k, len(distancias))
+        posicoes = np.argpartition(distancias, k - 1)[:k]
+        posicoes = posicoes[np.argsort(distancias[posicoes], kind='stable')]
+
+        return [(int(self._doc_ids[p]), int(distancias[p])) for p in posicoes]
+
+    def memory_usage(self) -> int:
+        """Bytes ocupados pelos fingerprints e IDs armazenados"""
+        return len(self) * (8 * self.words + 8)
+
+    def close(self):
+        """Grava pendências e libera os mapeamentos de memória (chamadas repetidas não fazem nada)"""
+        if self.closed:
+            return
+        self.flush()
+        self._fingerprints = None
+        self._doc_ids = None
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+# Exemplo de uso
+if __name__ == "__main__":
+    import sys
+    import tempfile
+    import time
+
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from simhash_basico import SimHash
+
+    print("=== SimHash Otimizado - Armazém de Fingerprints ===")
+
+    textos = [
+        "O gato subiu no telhado para pegar o rato",
+        "O gato subiu no telhado para capturar o rato",
+        "O cachorro latiu para o carteiro na rua",
+        "Python é uma linguagem de programação versátil",
+    ]
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        caminho = os.path.join(diretorio, 'fingerprints')
+
+        with FingerprintStore(caminho) as store:
+            for doc_id, texto in enumerate(textos):
+                store.add(SimHash(texto), doc_id)
+
+            consulta = SimHash("O gato subiu no telhado para pegar um rato")
+            print(f"Consulta: {consulta}")
+            print(f"Vizinhos a até 10 bits: {store.query(consulta, max_distance=10)}")
+            print(f"2 mais próximos: {store.nearest(consulta, k=2)}")
+
+            # Varredura em massa com fingerprints aleatórios
+            n = 1_000_000
+            rng = np.random.default_rng(42)
+            aleatorios = rng.integers(0, 1 << 64, size=n, dtype=np.uint64)
+            store.add_many(aleatorios, np.arange(len(textos), len(textos) + n))
+
+            inicio = time.time()
+            distancias = store.hamming_distances(consulta)
+            tempo = time.time() - inicio
+
+            print(f"\nArmazém com {len(store):,} fingerprints ({store.memory_usage() / 1e6:.1f} MB)")
+            print(f"Varredura completa: {tempo * 1000:.1f} ms")
+            print(f"Distância mínima encontrada: {distancias.min()}")
+
+        # Reabre o armazém: os dados persistem em disco
+        with FingerprintStore(caminho) as store:
+            print(f"Fingerprints após reabrir: {len(store):,}")
+
+        # Fingerprints de 256 bits: 4 palavras uint64 por documento
+        print("\n=== Fingerprints de 256 bits ===")
+        with FingerprintStore(os.path.join(diretorio, 'fp256'), hash_bits=256) as store:
+            for doc_id, texto in enumerate(textos):
+                store.add(SimHash(texto, hash_bits=256), doc_id)
+
+            consulta = SimHash("O gato subiu no telhado para pegar um rato", hash_bits=256)
+            for doc_id, distancia in store.nearest(consulta, k=len(textos)):
+                print(f"  doc {doc_id}: {distancia} bits diferentes")
@@ -1,12 +1,16 @@
 """
 SimHash - Algoritmo para detecção de documentos similares
 Implementação básica que gera fingerprints de 64-bit para textos
+(larguras maiores, como 128 ou 256 bits, também são suportadas)
 """
 
 import hashlib
 import re
 from collections import defaultdict
 
+# Cada bloco MD5 fornece 128 bits; larguras maiores concatenam vários blocos
+MD5_BITS = 128
+
 
 class SimHash:
     def __init__(self, text, hash_bits=64):
@@ -17,6 +21,8 @@ class SimHash:
             text (str): Texto para gerar o hash
             hash_bits (int): Número de bits do hash (padrão 64)
         """
+        if hash_bits <= 0:
+            raise ValueError("hash_bits deve ser positivo")
         self.hash_bits = hash_bits
         self.hash_value = self._compute_simhash(text)
     
@@ -26,20 +32,54 @@ class SimHash:
         text = re.sub(r'[^\w\s]', '', text.lower())
         return text.split()
     
+    @classmethod
+    def from_tokens(cls, tokens, hash_bits=64):
+        """
+        Cria um SimHash a partir de tokens já extraídos
+        
+        Útil quando o texto já foi tokenizado por outra etapa (ex: um
+        índice invertido), evitando tokenizar o mesmo texto duas vezes.
+        
+        Args:
+            tokens (list): Lista de tokens
+            hash_bits (int): Número de bits do hash (padrão 64)
+        """
+        if hash_bits <= 0:
+            raise ValueError("hash_bits deve ser positivo")
+        simhash = cls.__new__(cls)
+        simhash.hash_bits = hash_bits
+        simhash.hash_value = simhash._compute_from_tokens(tokens)
+        return simhash
+    
+    def _token_hash(self, token):
+        """
+        Gera um hash de hash_bits bits para o token
+        
+        O primeiro bloco é o MD5 do token (mesmo resultado da versão de
+        64 bits); os blocos seguintes são MD5s do token com um prefixo de
+        índice, concatenados acima dos bits já gerados.
+        """
+        data = token.encode('utf-8')
+        hash_int = int(hashlib.md5(data).hexdigest(), 16)
+        
+        for block in range(1, -(-self.hash_bits // MD5_BITS)):
+            block_hash = hashlib.md5(block.to_bytes(4, 'little') + data).hexdigest()
+            hash_int |= int(block_hash, 16) << (block * MD5_BITS)
+        
+        return hash_int
+    
     def _compute_simhash(self, text):
         """Computa o SimHash do texto"""
-        tokens = self._tokenize(text)
-        
+        return self._compute_from_tokens(self._tokenize(text))
+    
+    def _compute_from_tokens(self, tokens):
+        """Computa o SimHash de uma lista de tokens"""
         # Inicializa vetor de características
         vector = [0] * self.hash_bits
         
         for token in tokens:
-            # Gera hash MD5 do token
-            hash_obj = hashlib.md5(token.encode('utf-8'))
-            hash_hex = hash_obj.hexdigest()
-            
-            # Converte para binário
-            hash_int = int(hash_hex, 16)
+            # Gera hash do token (MD5, concatenado para mais de 128 bits)
+            hash_int = self._token_hash(token)
             
             # Para cada bit do hash
             for i in range(self.hash_bits):
@@ -61,10 +101,11 @@ class SimHash:
         """Calcula a distância de Hamming entre dois SimHashes"""
         if not isinstance(other, SimHash):
             raise ValueError("Comparação deve ser com outro objeto SimHash")
+        if self.hash_bits != other.hash_bits:
+            raise ValueError("SimHashes devem ter o mesmo número de bits")
         
         xor_result = self.hash_value ^ other.hash_value
-        distance = bin(xor_result).count('1')
-        return distance
+        return xor_result.bit_count()  # popcount nativo (Python 3.10+)
     
     def similarity(self, other):
         """Calcula similaridade como porcentagem (0-100)"""
@@ -76,6 +117,80 @@ class SimHash:
         return f"SimHash({self.hash_value:0{self.hash_bits//4}x})"
 
 
+class SimHashIndex:
+    """
+    Índice de vizinhos próximos para fingerprints SimHash
+    
+    Usa o princípio da casa dos pombos: se dois fingerprints diferem em no
+    máximo k bits, ao dividi-los em k+1 blocos pelo menos um bloco é
+    idêntico. Cada bloco vira a chave de uma tabela hash, e só os
+    documentos que compartilham algum bloco com a consulta são comparados.
+    """
+    
+    def __init__(self, hash_bits=64, max_distance=3):
+        """
+        Inicializa o índice
+        
+        Args:
+            hash_bits (int): Número de bits dos fingerprints
+            max_distance (int): Maior distância de Hamming suportada nas consultas
+        """
+        if not 0 <= max_distance < hash_bits:
+            raise ValueError("max_distance deve estar entre 0 e hash_bits - 1")
+        
+        self.hash_bits = hash_bits
+        self.max_distance = max_distance
+        
+        # Divide os bits em max_distance + 1 blocos (offset, largura)
+        num_blocks = max_distance + 1
+        self.blocks = []
+        offset = 0
+        for i in range(num_blocks):
+            width = hash_bits // num_blocks + (1 if i < hash_bits % num_blocks else 0)
+            self.blocks.append((offset, width))
+            offset += width
+        
+        self.tables = [defaultdict(list) for _ in self.blocks]  # bloco -> [(fingerprint, doc_id)]
+        self.size = 0
+    
+    def _block_keys(self, fingerprint):
+        """Extrai o valor de cada bloco do fingerprint"""
+        return [(fingerprint >> offset) & ((1 << width) - 1) for offset, width in self.blocks]
+    
+    def add(self, fingerprint, doc_id):
+        """Adiciona um fingerprint (int ou SimHash) ao índice"""
+        fingerprint = getattr(fingerprint, 'hash_value', fingerprint)
+        for table, key in zip(self.tables, self._block_keys(fingerprint)):
+            table[key].append((fingerprint, doc_id))
+        self.size += 1
+    
+    def query(self, fingerprint, max_distance=None):
+        """
+        Busca documentos a no máximo max_distance bits do fingerprint
+        
+        Returns:
+            list: Lista de (doc_id, distância) ordenada por distância
+        """
+        fingerprint = getattr(fingerprint, 'hash_value', fingerprint)
+        if max_distance is None:
+            max_distance = self.max_distance
+        if max_distance > self.max_distance:
+            raise ValueError(f"Índice suporta distância máxima {self.max_distance}")
+        
+        results = {}
+        for table, key in zip(self.tables, self._block_keys(fingerprint)):
+            for candidate, doc_id in table.get(key, ()):
+                if doc_id not in results:
+                    distance = (candidate ^ fingerprint).bit_count()
+                    if distance <= max_distance:
+                        results[doc_id] = distance
+        
+        return sorted(results.items(), key=lambda x: x[1])
+    
+    def __len__(self):
+        return self.size
+
+
 # Exemplo de uso
 if __name__ == "__main__":
     # Textos de exemplo